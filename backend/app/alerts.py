@@ -0,0 +1,306 @@
+# backend/app/alerts.py
+"""
+Fraud alert delivery, off the request path.
+
+  - queue_alert(db, ...)  => adds an alert_outbox row to the caller's transaction, so
+                             the alert is committed together with the statement's
+                             transactions (and lost with them on a rollback)
+  - AlertDispatcher       => a background thread that emails due outbox rows through
+                             one transport (app/send_email.py, ALERT_TRANSPORT),
+                             reusing its client / connection
+
+Coalescing: an alert is due ALERT_DIGEST_SECONDS after it is queued, and when a
+recipient has a due alert, everything pending for them goes out as one digest, so
+a burst of flagged statements is one email instead of N.
+
+Retries: a failed send is retried after ALERT_RETRY_SECONDS, doubling up to
+ALERT_RETRY_MAX_SECONDS, ALERT_MAX_ATTEMPTS times; then the rows are marked failed.
+
+notify() wakes the dispatcher through an in-process queue when its alert is due;
+the outbox is also polled every ALERT_POLL_SECONDS, which picks up rows queued by
+other API replicas or before a restart. Rows are claimed (status sending, with
+FOR UPDATE SKIP LOCKED on PostgreSQL) before the send, so replicas do not send the
+same alert twice; a claim left by a crashed process expires after ALERT_CLAIM_SECONDS.
+"""
+import heapq
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from html import escape
+
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import AlertOutbox
+from app.send_email import make_transport
+
+# sendgrid | smtp | file (see app/send_email.py)
+ALERT_TRANSPORT = os.getenv("ALERT_TRANSPORT", "sendgrid")
+# Alerts for the same recipient within this window are sent as one digest
+ALERT_DIGEST_SECONDS = float(os.getenv("ALERT_DIGEST_SECONDS", "30"))
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "5"))
+ALERT_RETRY_SECONDS = float(os.getenv("ALERT_RETRY_SECONDS", "5"))
+ALERT_RETRY_MAX_SECONDS = float(os.getenv("ALERT_RETRY_MAX_SECONDS", "600"))
+ALERT_POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", "10"))
+ALERT_CLAIM_SECONDS = float(os.getenv("ALERT_CLAIM_SECONDS", "120"))
+# Recipients handled per dispatch round
+ALERT_BATCH_RECIPIENTS = int(os.getenv("ALERT_BATCH_RECIPIENTS", "100"))
+
+_STOP = object()
+
+
+def queue_alert(db: Session, contact_email: str, fraud_details: list, file_name: str = None,
+                digest_seconds: float = ALERT_DIGEST_SECONDS) -> bool:
+    """
+    Add the alert of one statement to the outbox (committed by the caller).
+    Returns False when there is nothing to send.
+    """
+    if not fraud_details or not contact_email or not contact_email.strip():
+        return False
+    now = datetime.utcnow()
+    db.add(AlertOutbox(
+        recipient=contact_email.strip(),
+        file_name=file_name,
+        details="\n".join(fraud_details),
+        status="pending",
+        attempts=0,
+        next_attempt_at=now + timedelta(seconds=digest_seconds),
+        created_at=now,
+    ))
+    return True
+
+
+def digest_message(alerts: list):
+    """
+    (subject, html) of one email for a recipient's alerts (dicts with file_name,
+    details, created_at), oldest first.
+    """
+    flagged = sum(len(alert["details"].splitlines()) for alert in alerts)
+    if flagged == 1:
+        subject = "[FRAUD ALERT] Suspicious Transaction Detected"
+    else:
+        subject = f"[FRAUD ALERT] {flagged} Suspicious Transactions Detected"
+    sections = []
+    for alert in alerts:
+        title = escape(alert["file_name"] or "Statement")
+        lines = "<br>".join(escape(line) for line in alert["details"].splitlines())
+        sections.append(f"<h3>{title} ({alert['created_at']:%Y-%m-%d %H:%M} UTC)</h3>\n<p>{lines}</p>")
+    return subject, "<h1>Fraud Alert</h1>\n" + "\n".join(sections)
+
+
+def retry_delay(attempts: int, base: float = ALERT_RETRY_SECONDS, cap: float = ALERT_RETRY_MAX_SECONDS) -> float:
+    """
+    Exponential backoff with jitter (so replicas do not retry in lockstep).
+    """
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class AlertDispatcher:
+    """
+    Sends the outbox as per-recipient digests from one background thread (see
+    module docstring).
+    """
+
+    def __init__(self, transport=None, digest_seconds: float = ALERT_DIGEST_SECONDS,
+                 max_attempts: int = ALERT_MAX_ATTEMPTS, retry_seconds: float = ALERT_RETRY_SECONDS,
+                 retry_max_seconds: float = ALERT_RETRY_MAX_SECONDS, poll_seconds: float = ALERT_POLL_SECONDS,
+                 claim_seconds: float = ALERT_CLAIM_SECONDS, batch_recipients: int = ALERT_BATCH_RECIPIENTS,
+                 session_factory=SessionLocal):
+        self.transport = transport if transport is not None else make_transport(ALERT_TRANSPORT)
+        self.digest_seconds = digest_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.poll_seconds = poll_seconds
+        self.claim_seconds = claim_seconds
+        self.batch_recipients = max(1, batch_recipients)
+        self.session_factory = session_factory
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "queued": 0, "digests_sent": 0, "alerts_sent": 0, "alerts_skipped": 0,
+            "send_errors": 0, "alerts_failed": 0, "dispatch_errors": 0, "send_seconds": 0.0,
+            "last_error": None,
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        """
+        Stop the thread; alerts not sent yet stay in the outbox for the next start.
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.transport.close()
+
+    def notify(self, delay: float = None):
+        """
+        Call after committing a queue_alert(): wakes the dispatcher when it is due.
+        """
+        due = time.monotonic() + (self.digest_seconds if delay is None else delay)
+        self._queue.put(due)
+        with self._lock:
+            self._stats["queued"] += 1
+
+    def _loop(self):
+        wakeups = []  # heap of monotonic due times
+        next_poll = time.monotonic()
+        while True:
+            now = time.monotonic()
+            timeout = max(0.0, min([next_poll] + wakeups[:1]) - now)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                return
+            if item is not None:
+                heapq.heappush(wakeups, item)
+                continue
+
+            now = time.monotonic()
+            if now < next_poll and not (wakeups and wakeups[0] <= now):
+                continue
+            while wakeups and wakeups[0] <= now:
+                heapq.heappop(wakeups)
+            try:
+                # A full round => more may be due right away
+                more = self.dispatch_due() >= self.batch_recipients
+            except Exception as e:
+                print(f"[alerts] Dispatch failed, will retry: {e}")
+                with self._lock:
+                    self._stats["dispatch_errors"] += 1
+                    self._stats["last_error"] = str(e)
+                more = False
+            next_poll = time.monotonic() + (0.0 if more else self.poll_seconds)
+
+    def _claim(self, db: Session, now: datetime) -> list:
+        """
+        Lock + mark as sending everything pending for recipients with a due alert
+        (plus expired claims). Returns plain dicts, oldest first.
+        """
+        claimable = or_(
+            AlertOutbox.status == "pending",
+            and_(AlertOutbox.status == "sending", AlertOutbox.next_attempt_at <= now),
+        )
+        recipients = db.execute(
+            select(AlertOutbox.recipient)
+            .where(AlertOutbox.status.in_(("pending", "sending")), AlertOutbox.next_attempt_at <= now)
+            .distinct()
+            .limit(self.batch_recipients)
+        ).scalars().all()
+        if not recipients:
+            return []
+        rows = db.execute(
+            select(AlertOutbox)
+            .where(AlertOutbox.recipient.in_(recipients), claimable)
+            .order_by(AlertOutbox.id)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        claimed = [
+            {
+                "id": row.id, "recipient": row.recipient, "file_name": row.file_name,
+                "details": row.details, "created_at": row.created_at, "attempts": row.attempts,
+            }
+            for row in rows
+        ]
+        if claimed:
+            db.execute(
+                update(AlertOutbox)
+                .where(AlertOutbox.id.in_([alert["id"] for alert in claimed]))
+                .values(status="sending", next_attempt_at=now + timedelta(seconds=self.claim_seconds))
+            )
+        db.commit()
+        return claimed
+
+    def dispatch_due(self, now: datetime = None) -> int:
+        """
+        Send one digest per recipient with a due alert. Returns the number of
+        recipients handled.
+        """
+        db = self.session_factory()
+        try:
+            claimed = self._claim(db, now or datetime.utcnow())
+            digests = {}
+            for alert in claimed:
+                digests.setdefault(alert["recipient"], []).append(alert)
+            for recipient, alerts in digests.items():
+                self._send_digest(db, recipient, alerts)
+            return len(digests)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _send_digest(self, db: Session, recipient: str, alerts: list):
+        ids = [alert["id"] for alert in alerts]
+        rows = AlertOutbox.id.in_(ids)
+        if not self.transport.configured:
+            print(f"[alerts] Transport {self.transport.name} is not configured, skipping {len(ids)} alert(s).")
+            db.execute(update(AlertOutbox).where(rows).values(status="skipped", last_error="transport not configured"))
+            db.commit()
+            with self._lock:
+                self._stats["alerts_skipped"] += len(ids)
+            return
+
+        subject, html = digest_message(alerts)
+        start = time.perf_counter()
+        try:
+            self.transport.send(recipient, subject, html)
+        except Exception as e:
+            attempts = max(alert["attempts"] for alert in alerts) + 1
+            gave_up = sum(1 for alert in alerts if alert["attempts"] + 1 >= self.max_attempts)
+            retry_at = datetime.utcnow() + timedelta(
+                seconds=retry_delay(attempts, self.retry_seconds, self.retry_max_seconds),
+            )
+            db.execute(update(AlertOutbox).where(rows).values(
+                attempts=AlertOutbox.attempts + 1,
+                status=case((AlertOutbox.attempts + 1 >= self.max_attempts, "failed"), else_="pending"),
+                next_attempt_at=retry_at,
+                last_error=str(e)[:1000],
+            ))
+            db.commit()
+            print(f"[alerts] Sending {len(ids)} alert(s) via {self.transport.name} failed "
+                  f"(attempt {attempts}, {gave_up} given up): {e}")
+            with self._lock:
+                self._stats["send_errors"] += 1
+                self._stats["alerts_failed"] += gave_up
+                self._stats["last_error"] = str(e)
+            return
+
+        elapsed = time.perf_counter() - start
+        db.execute(update(AlertOutbox).where(rows).values(
+            status="sent", sent_at=datetime.utcnow(), digest_id=uuid.uuid4().hex, last_error=None,
+        ))
+        db.commit()
+        with self._lock:
+            self._stats["digests_sent"] += 1
+            self._stats["alerts_sent"] += len(ids)
+            self._stats["send_seconds"] += elapsed
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        send_seconds = stats.pop("send_seconds")
+        stats["avg_send_ms"] = round(send_seconds / stats["digests_sent"] * 1000, 3) if stats["digests_sent"] else None
+        stats["alerts_per_digest"] = (
+            round(stats["alerts_sent"] / stats["digests_sent"], 2) if stats["digests_sent"] else None
+        )
+        stats["transport"] = self.transport.name
+        stats["connections"] = getattr(self.transport, "connections", None)
+        stats["digest_seconds"] = self.digest_seconds
+        return stats
@@ -0,0 +1,301 @@
+# backend/app/behavior.py
+"""
+Per-customer behavioral features, computed the same way for training and scoring.
+
+Every row gets aggregates over the same customer's *earlier* transactions only:
+  - customer_tx_count   => transactions before this one
+  - merchant_tx_count   => of those, at this merchant
+  - amt_mean            => their average amount (0 without history)
+  - amt_zscore          => (amount - amt_mean) / their standard deviation
+                           (0 with fewer than 2 earlier amounts or no spread)
+  - seconds_since_last  => time since the previous transaction (-1 if none / unknown)
+  - category_share      => share of earlier transactions in this category
+
+Only the first BEHAVIOR_MAX_KEYS merchants / categories of a customer (in time
+order) are counted, so stored profiles stay bounded; later ones always count as
+never seen (merchant_tx_count 0, category_share 0), in training too.
+
+Training computes them over the whole dataset grouped by card (cc_num). At scoring
+time a statement belongs to one customer; the customer's history before the
+statement comes in as a profile (app/feature_store.py keeps them), so the
+features of a row are the same whether its history was in the training CSV,
+an earlier statement or earlier rows of the same statement.
+
+A profile is a plain dict (it is sent to worker processes):
+    {"tx_count", "amount_sum", "amount_sq_sum", "last_seen" (epoch seconds or None),
+     "merchants": {merchant: count}, "categories": {category: count}}
+"""
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+BEHAVIOR_FEATURES = [
+    "customer_tx_count",
+    "merchant_tx_count",
+    "amt_mean",
+    "amt_zscore",
+    "seconds_since_last",
+    "category_share",
+]
+
+# What a row without any history gets (also the API's fill value for old frames)
+BEHAVIOR_DEFAULTS = {
+    "customer_tx_count": 0.0,
+    "merchant_tx_count": 0.0,
+    "amt_mean": 0.0,
+    "amt_zscore": 0.0,
+    "seconds_since_last": -1.0,
+    "category_share": 0.0,
+}
+
+# |z| above this is clipped (a first large purchase after a few identical ones)
+MAX_ZSCORE = 50.0
+# Merchants / categories counted per customer (the first ones seen, see module docstring)
+BEHAVIOR_MAX_KEYS = int(os.getenv("FEATURE_STORE_MAX_KEYS", "200"))
+
+
+def empty_profile() -> dict:
+    return {
+        "tx_count": 0,
+        "amount_sum": 0.0,
+        "amount_sq_sum": 0.0,
+        "last_seen": None,
+        "merchants": {},
+        "categories": {},
+    }
+
+
+def normalize_keys(values) -> np.ndarray:
+    """
+    Merchant / category names as compared across statements: trimmed, lowercase,
+    spaces => underscores (same as the category feature in app/scoring.py).
+    Categorical input (training) is normalized once per category.
+    """
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        categories = normalize_keys(np.asarray(values.cat.categories, dtype=object))
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, categories[codes], "")
+    # A plain loop beats the .str accessors on statement-sized inputs
+    return np.array(
+        ["" if value is None or value != value else str(value).strip().lower().replace(" ", "_") for value in values],
+        dtype=object,
+    )
+
+
+def epoch_seconds(timestamps) -> np.ndarray:
+    """
+    Timestamps (anything pd.to_datetime reads) as float seconds, NaN where unknown.
+    """
+    ts = pd.to_datetime(pd.Series(timestamps), errors="coerce")
+    seconds = ts.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    seconds[ts.isna().to_numpy()] = np.nan
+    return seconds
+
+
+def _profile_counts(profile: dict, field: str, keys: np.ndarray) -> np.ndarray:
+    counts = profile[field]
+    if not counts:
+        return np.zeros(len(keys))
+    return np.fromiter((counts.get(key, 0) for key in keys.tolist()), dtype=np.float64, count=len(keys))
+
+
+def _time_order(seconds: np.ndarray) -> np.ndarray:
+    """
+    Row order by time, unknown times last, ties in input order.
+    """
+    return np.argsort(np.where(np.isnan(seconds), np.inf, seconds), kind="stable")
+
+
+def _cumcount(codes: np.ndarray) -> np.ndarray:
+    """
+    For each position, how many earlier positions have the same code.
+    """
+    n = len(codes)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if n else np.zeros(0, dtype=np.intp)
+    run_start = np.repeat(starts, np.diff(np.r_[starts, n]))
+    counts = np.empty(n)
+    counts[order] = np.arange(n) - run_start
+    return counts
+
+
+def _cumsum_before(values: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """
+    Sum of the earlier values of the same group (rows sorted by group; first marks
+    each group's first row).
+    """
+    total = np.cumsum(values) - values
+    starts = np.flatnonzero(first)
+    return total - np.repeat(total[starts], np.diff(np.r_[starts, len(values)]))
+
+
+def _tracked(keys: np.ndarray, pair_codes: np.ndarray, seen: np.ndarray, first: np.ndarray, known: dict,
+             max_keys: int) -> np.ndarray:
+    """
+    Which rows have a merchant / category the customer's profile counts: the keys
+    already in `known` (the profile's), then new keys in order of their first row
+    while fewer than max_keys are counted. Rows sorted by customer, then time;
+    pair_codes: one code per (customer, key), seen: its earlier rows.
+    """
+    is_known = np.fromiter((key in known for key in keys.tolist()), dtype=bool, count=len(keys)) \
+        if known else np.zeros(len(keys), dtype=bool)
+    new_key = (seen == 0) & ~is_known
+    # New keys of the same customer before this row
+    rank = _cumsum_before(new_key.astype(np.float64), first)
+    tracked = np.ones(int(pair_codes.max(initial=-1)) + 1, dtype=bool)
+    tracked[pair_codes[new_key]] = rank[new_key] < max_keys - len(known)
+    return tracked[pair_codes]
+
+
+def behavior_features(timestamps, merchants, categories, amounts, customers=None, profile: dict = None,
+                      max_keys: int = BEHAVIOR_MAX_KEYS) -> pd.DataFrame:
+    """
+    BEHAVIOR_FEATURES for every row, aligned with the input order.
+    Rows are taken in time order within each customer (unknown times last, ties in
+    input order). customers=None => all rows are one customer, whose earlier
+    history is `profile`; with customers given, profile must be None. max_keys:
+    merchants / categories counted per customer (None => all).
+    """
+    n = len(amounts)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    seconds = epoch_seconds(timestamps)
+    merchants = normalize_keys(merchants)
+    categories = normalize_keys(categories)
+    if customers is None:
+        groups = np.zeros(n, dtype=np.int64)
+    else:
+        if profile is not None:
+            raise ValueError("A profile only applies to a single customer (customers=None)")
+        groups = pd.factorize(pd.Series(customers), use_na_sentinel=False)[0]
+    profile = profile or empty_profile()
+
+    order = np.lexsort((np.where(np.isnan(seconds), np.inf, seconds), groups))
+    groups, seconds, amounts = groups[order], seconds[order], amounts[order]
+    merchants, categories = merchants[order], categories[order]
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+
+    # Earlier rows of the same customer within these rows
+    seen = _cumcount(groups)
+    amount_sum = _cumsum_before(amounts, first)
+    amount_sq_sum = _cumsum_before(amounts * amounts, first)
+    merchant_codes = pd.factorize(merchants)[0]
+    category_codes = pd.factorize(categories)[0]
+    merchant_pairs = groups * (merchant_codes.max(initial=0) + 1) + merchant_codes
+    category_pairs = groups * (category_codes.max(initial=0) + 1) + category_codes
+    merchant_seen = _cumcount(merchant_pairs)
+    category_seen = _cumcount(category_pairs)
+
+    # ... plus the history before them
+    count = seen + profile["tx_count"]
+    amount_sum += profile["amount_sum"]
+    amount_sq_sum += profile["amount_sq_sum"]
+    merchant_count = merchant_seen + _profile_counts(profile, "merchants", merchants)
+    category_count = category_seen + _profile_counts(profile, "categories", categories)
+    if max_keys is not None:
+        for counts, keys, pairs, seen_keys, field in (
+            (merchant_count, merchants, merchant_pairs, merchant_seen, "merchants"),
+            (category_count, categories, category_pairs, category_seen, "categories"),
+        ):
+            pair_codes = pd.factorize(pairs)[0]
+            counts[~_tracked(keys, pair_codes, seen_keys, first, profile[field], max_keys)] = 0.0
+
+    previous = np.empty(n)
+    if n:
+        previous[1:] = seconds[:-1]
+        last_seen = profile["last_seen"]
+        previous[first] = np.nan if last_seen is None else last_seen
+    since_last = seconds - previous
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, amount_sum / count, 0.0)
+        std = np.sqrt(np.maximum(np.where(count > 0, amount_sq_sum / count, 0.0) - mean * mean, 0.0))
+        zscore = np.where((count >= 2) & (std > 1e-9), (amounts - mean) / std, 0.0)
+        share = np.where(count > 0, category_count / count, 0.0)
+
+    features = np.empty((n, len(BEHAVIOR_FEATURES)))
+    features[order] = np.column_stack([
+        count,
+        merchant_count,
+        mean,
+        np.clip(zscore, -MAX_ZSCORE, MAX_ZSCORE),
+        np.where(np.isnan(since_last), -1.0, np.maximum(since_last, 0.0)),
+        share,
+    ])
+    return pd.DataFrame(features, columns=BEHAVIOR_FEATURES)
+
+
+def statement_behavior(df: pd.DataFrame, profile: dict = None, max_keys: int = BEHAVIOR_MAX_KEYS) -> pd.DataFrame:
+    """
+    behavior_features of a parsed statement (one customer; profile = their history).
+    """
+    return behavior_features(
+        df["trans_date_trans_time"] if "trans_date_trans_time" in df.columns else [None] * len(df),
+        df["merchant"] if "merchant" in df.columns else [""] * len(df),
+        df["category"] if "category" in df.columns else [""] * len(df),
+        pd.to_numeric(df["amt"], errors="coerce").fillna(0.0).to_numpy() if "amt" in df.columns else np.zeros(len(df)),
+        profile=profile,
+        max_keys=max_keys,
+    )
+
+
+def add_behavior_features(df: pd.DataFrame, profile: dict = None, max_keys: int = BEHAVIOR_MAX_KEYS) -> pd.DataFrame:
+    """
+    The parsed statement with the BEHAVIOR_FEATURES columns added (a new frame;
+    one concat instead of a column insert per feature).
+    """
+    features = statement_behavior(df, profile, max_keys)
+    features.index = df.index
+    return pd.concat([df.drop(columns=BEHAVIOR_FEATURES, errors="ignore"), features], axis=1)
+
+
+def statement_profile(df: pd.DataFrame) -> dict:
+    """
+    A parsed statement summarized as a profile (to merge into the customer's).
+    """
+    amounts = pd.to_numeric(df["amt"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64) \
+        if "amt" in df.columns else np.zeros(len(df))
+    seconds = epoch_seconds(df["trans_date_trans_time"]) if "trans_date_trans_time" in df.columns else np.array([])
+    known = seconds[~np.isnan(seconds)]
+    # Keys in order of their first row in time, for merge_profiles' max_keys
+    order = _time_order(seconds) if len(seconds) else np.arange(len(df))
+    profile = empty_profile()
+    profile.update({
+        "tx_count": int(len(df)),
+        "amount_sum": float(amounts.sum()),
+        "amount_sq_sum": float((amounts * amounts).sum()),
+        "last_seen": float(known.max()) if len(known) else None,
+    })
+    for field, column in (("merchants", "merchant"), ("categories", "category")):
+        if column in df.columns:
+            profile[field] = dict(Counter(normalize_keys(df[column])[order].tolist()))
+    return profile
+
+
+def merge_profiles(base: dict, delta: dict, max_keys: int = None) -> dict:
+    """
+    New profile = base history followed by delta's. With max_keys, merchants /
+    categories new to base are only added while fewer than max_keys are kept (in
+    delta's order, i.e. of their first transaction), as behavior_features counts them.
+    """
+    merged = {
+        "tx_count": base["tx_count"] + delta["tx_count"],
+        "amount_sum": base["amount_sum"] + delta["amount_sum"],
+        "amount_sq_sum": base["amount_sq_sum"] + delta["amount_sq_sum"],
+        "last_seen": max(
+            (t for t in (base["last_seen"], delta["last_seen"]) if t is not None), default=None,
+        ),
+    }
+    for field in ("merchants", "categories"):
+        counts = dict(base[field])
+        for key, count in delta[field].items():
+            if key in counts:
+                counts[key] += count
+            elif max_keys is None or len(counts) < max_keys:
+                counts[key] = count
+        merged[field] = counts
+    return merged
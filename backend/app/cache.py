@@ -0,0 +1,151 @@
+# backend/app/cache.py
+import asyncio
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+from app.database import SessionLocal
+from app.models import StatementCacheEntry
+from app.responses import dumps
+
+# In-memory budget for cached statements (parsed frame + scores + output rows)
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# "1" => also persist results in the statement_cache table (shared across replicas/restarts)
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "0") == "1"
+
+
+def cache_key(content_sha256: str, model_version: str, customer: str = None) -> str:
+    """
+    customer (a short hash, see feature_store.customer_tag): the same statement
+    scores differently with another customer's history.
+    """
+    key = f"{content_sha256}:{model_version}"
+    return f"{key}:{customer}" if customer else key
+
+
+def _entry_size(df, scores, output_rows) -> int:
+    """
+    Approximate memory held by one entry, used against the byte budget.
+    """
+    size = len(dumps(output_rows))
+    if df is not None:
+        size += int(df.memory_usage(deep=True).sum())
+    if scores is not None:
+        size += sum(getattr(v, "nbytes", 0) for v in scores.values())
+        size += sum(len(e) for e in scores.get("explanations", []))
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache of analysed statements keyed by SHA-256 of the upload + model version
+    (+ customer).
+    A hit returns the rows (with their transaction ids) from the first analysis, so
+    re-uploads skip parsing, scoring and inserting duplicate rows. With a customer
+    the entry also holds the rows reported as duplicates (see
+    pipeline.cached_statement).
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, use_db: bool = RESULT_CACHE_DB):
+        self.max_bytes = max_bytes
+        self.use_db = use_db
+        self._entries = OrderedDict()  # key => (size, entry)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._key_locks = weakref.WeakValueDictionary()
+        self._stats = {"hits": 0, "db_hits": 0, "misses": 0, "evictions": 0, "puts": 0}
+
+    def lock_for(self, key: str) -> asyncio.Lock:
+        """
+        One asyncio lock per key, so a double-tapped upload waits for the first
+        analysis instead of running it twice.
+        """
+        lock = self._key_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._key_locks[key] = lock
+        return lock
+
+    def get(self, key: str):
+        """
+        Return the cached entry dict ({"df", "scores", "rows"}) or None.
+        Falls back to the statement_cache table when RESULT_CACHE_DB is enabled.
+        """
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return item[1]
+
+        if self.use_db:
+            rows = self._db_get(key)
+            if rows is not None:
+                with self._lock:
+                    self._stats["db_hits"] += 1
+                self._put_memory(key, None, None, rows)
+                return {"df": None, "scores": None, "rows": rows}
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, df, scores, output_rows: list):
+        self._put_memory(key, df, scores, output_rows)
+        if self.use_db:
+            self._db_put(key, output_rows)
+        with self._lock:
+            self._stats["puts"] += 1
+
+    def _put_memory(self, key, df, scores, output_rows):
+        size = _entry_size(df, scores, output_rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[0]
+            self._entries[key] = (size, {"df": df, "scores": scores, "rows": output_rows})
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def _db_get(self, key):
+        db = SessionLocal()
+        try:
+            entry = db.get(StatementCacheEntry, key)
+            return json.loads(entry.result) if entry is not None else None
+        except Exception as e:
+            print(f"[cache] DB lookup failed for {key}: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _db_put(self, key, output_rows):
+        db = SessionLocal()
+        try:
+            db.merge(StatementCacheEntry(key=key, result=dumps(output_rows).decode("utf-8")))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"[cache] DB store failed for {key}: {e}")
+        finally:
+            db.close()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        stats["db_backed"] = self.use_db
+        return stats
@@ -0,0 +1,203 @@
+# backend/app/compiled_model.py
+"""
+Vectorized inference for the RandomForest pipeline, without sklearn.
+
+Works on the arrays written by app/ml/train_model.py (export_forest_arrays /
+save_compiled_model): scale + one-hot the features, then walk every tree for the
+whole batch at once, one depth level per step. The saved arrays are memory-mapped
+read-only, so every worker process shares the same pages instead of unpickling
+its own copy of the forest. Probabilities match the pipeline's
+predict_proba (features are cast to float32 and compared against float64
+thresholds exactly like sklearn's trees do).
+"""
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Rows evaluated per step; bounds the (n_trees x rows) node-index matrix
+COMPILED_CHUNK_ROWS = int(os.getenv("COMPILED_CHUNK_ROWS", "8192"))
+# Bigger batches go to the sklearn pipeline (if available), whose C tree walk wins there
+COMPILED_MAX_ROWS = int(os.getenv("COMPILED_MAX_ROWS", "256"))
+# Pairs that reached a leaf are dropped every this many levels
+COMPACT_EVERY = 4
+
+
+def compiled_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + "_compiled"
+
+
+class LazyPipeline:
+    """
+    The pickled sklearn pipeline, unpickled on the first predict_proba call.
+    """
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def predict_proba(self, X):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import joblib
+
+                    self._model = joblib.load(self.model_path)["model"]
+        return self._model.predict_proba(X)
+
+
+class CompiledForest:
+    """
+    Drop-in replacement for the fitted pipeline's predict_proba. Batches above
+    max_rows are handed to `fallback` (the sklearn pipeline) when one is set.
+    """
+
+    def __init__(self, arrays: dict, source_version: str = None, fallback=None,
+                 max_rows: int = COMPILED_MAX_ROWS):
+        self.source_version = source_version
+        self.fallback = fallback
+        self.max_rows = max_rows
+        self.numeric_columns = [str(c) for c in arrays["numeric_columns"]]
+        self.numeric_positions = arrays["numeric_positions"]
+        self.numeric_mean = arrays["numeric_mean"]
+        self.numeric_scale = arrays["numeric_scale"]
+        self.n_features = int(arrays["n_features"])
+        self.classes_ = arrays["classes"]
+
+        # One {category: output position} lookup per categorical column
+        offsets = arrays["category_offsets"]
+        values = arrays["category_values"]
+        positions = arrays["category_positions"]
+        self.categorical = [
+            (str(column), dict(zip(values[start:stop].tolist(), positions[start:stop].tolist())))
+            for column, start, stop in zip(arrays["categorical_columns"], offsets[:-1], offsets[1:])
+        ]
+
+        self.feature = arrays["node_feature"]
+        self.threshold = arrays["node_threshold"]
+        # children[2 * node] => left child, children[2 * node + 1] => right child
+        self.children = arrays["node_children"]
+        self.is_leaf = arrays["node_is_leaf"]
+        self.missing_left = arrays["node_missing_left"]
+        self.has_missing_left = bool(self.missing_left.any())
+        self.leaf_value = arrays["leaf_value"]
+        self.roots = arrays["tree_roots"]
+        self.max_depth = int(arrays["max_depth"])
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """
+        Load a directory written by save_compiled_model. Returns (engine, threshold).
+        """
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {}
+        for file_name in os.listdir(path):
+            name, ext = os.path.splitext(file_name)
+            if ext == ".npy":
+                # np.asarray drops the memmap subclass but keeps the mapping
+                arrays[name] = np.asarray(np.load(
+                    os.path.join(path, file_name), mmap_mode="r" if mmap else None, allow_pickle=False,
+                ))
+        return cls(arrays, source_version=meta.get("source_version")), meta.get("threshold")
+
+    @classmethod
+    def from_pipeline(cls, model, source_version: str = None):
+        from app.ml.train_model import export_forest_arrays
+
+        return cls(export_forest_arrays(model), source_version=source_version, fallback=model)
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        ColumnTransformer equivalent: float32 matrix of scaled numeric + one-hot columns.
+        Unknown categories get all zeros (handle_unknown="ignore").
+        """
+        n = len(X)
+        out = np.zeros((n, self.n_features), dtype=np.float32)
+        if self.numeric_columns:
+            numeric = X[self.numeric_columns].to_numpy(dtype=np.float64)
+            numeric -= self.numeric_mean
+            numeric /= self.numeric_scale
+            out[:, self.numeric_positions] = numeric
+        rows = np.arange(n)
+        for column, lookup in self.categorical:
+            positions = np.fromiter(
+                (lookup.get(value, -1) for value in X[column].tolist()), dtype=np.intp, count=n
+            )
+            known = positions >= 0
+            out[rows[known], positions[known]] = 1.0
+        return out
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf node index for every (tree, row): shape (n_trees, n_rows).
+        All pairs descend one level per step (leaves point to themselves); pairs that
+        reached a leaf are dropped every COMPACT_EVERY levels.
+        """
+        n_rows, n_features = X.shape
+        n_pairs = len(self.roots) * n_rows
+        flat = X.ravel()
+        leaves = np.empty(n_pairs, dtype=np.intp)
+        pair = np.arange(n_pairs, dtype=np.intp)
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, len(self.roots))
+        for depth in range(self.max_depth + 1):
+            if depth % COMPACT_EVERY == 0 or depth == self.max_depth:
+                done = self.is_leaf[node]
+                if done.any():
+                    leaves[pair[done]] = node[done]
+                    left = ~done
+                    pair, node, row_offset = pair[left], node[left], row_offset[left]
+                if not node.size:
+                    break
+            values = flat[row_offset + self.feature[node]]
+            go_right = ~(values <= self.threshold[node])
+            if self.has_missing_left:
+                go_right &= ~(np.isnan(values) & self.missing_left[node])
+            node = self.children[2 * node + go_right]
+        return leaves.reshape(len(self.roots), n_rows)
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        if self.fallback is not None and len(X) > self.max_rows:
+            return self.fallback.predict_proba(X)
+        features = self.transform(X)
+        n_trees = len(self.roots)
+        proba = np.empty((len(features), self.leaf_value.shape[1]), dtype=np.float64)
+        for start in range(0, len(features), COMPILED_CHUNK_ROWS):
+            chunk = features[start:start + COMPILED_CHUNK_ROWS]
+            proba[start:start + len(chunk)] = self.leaf_value[self._leaves(chunk)].sum(axis=0)
+        proba /= n_trees
+        return proba
+
+
+def load_model(model_path: str, engine: str, source_version: str):
+    """
+    (model, threshold) for a worker.
+      - engine "compiled" + an exported directory from this exact pickle => memory-mapped
+        CompiledForest; the pickle is only unpickled if a batch needs the fallback
+      - engine "compiled" without it => unpickle and compile in memory
+      - engine "sklearn" (or a pipeline that cannot be exported) => the pickled pipeline
+    """
+    path = compiled_path(model_path)
+    if engine == "compiled" and os.path.isdir(path):
+        try:
+            compiled, threshold = CompiledForest.load(path)
+            if compiled.source_version == source_version:
+                compiled.fallback = LazyPipeline(model_path)
+                return compiled, threshold
+        except Exception as e:
+            print(f"[model] Could not load {path} ({e}); compiling from the pickle.")
+
+    import joblib
+
+    model_data = joblib.load(model_path)
+    model, threshold = model_data["model"], model_data["threshold"]
+    if engine == "compiled":
+        try:
+            return CompiledForest.from_pipeline(model, source_version=source_version), threshold
+        except Exception as e:
+            print(f"[model] Compiled inference unavailable ({e}); using the sklearn pipeline.")
+    return model, threshold
@@ -1,7 +1,13 @@
 # backend/app/database.py
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, exc, inspect, text
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
@@ -10,13 +16,190 @@ DB_PASS = os.getenv("DB_PASS", "mypassword")
 DB_NAME = os.getenv("DB_NAME", "frauddb")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Connection pool (per process): kept-open connections + extra ones under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Connections older than this are replaced (server / proxy idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 1 => test each connection on checkout (survives DB restarts / dropped connections)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# 1 => API writes go through an asyncio engine (asyncpg) instead of the thread pool
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+
+class _CheckoutTiming:
+    """
+    Pool mixin: counts checkouts and the time spent waiting for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._timing_lock = threading.Lock()
+        self.reset_checkout_stats()
+
+    def reset_checkout_stats(self):
+        with self._timing_lock:
+            self.checkout_stats = {"checkouts": 0, "timeouts": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with self._timing_lock:
+                self.checkout_stats["timeouts"] += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._timing_lock:
+            stats = self.checkout_stats
+            stats["checkouts"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        return conn
+
+
+class TimedQueuePool(_CheckoutTiming, QueuePool):
+    pass
+
 
-engine = create_engine(DATABASE_URL, echo=False)
+class TimedAsyncQueuePool(_CheckoutTiming, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def create_pooled_engine(url: str = DATABASE_URL, **options):
+    """
+    Engine with the DB_POOL_* settings (overridable) and checkout timing.
+    """
+    return create_engine(url, echo=False, poolclass=TimedQueuePool, **{**_pool_options(), **options})
+
+
+engine = create_pooled_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Created on first use (DB_ASYNC=1), so the asyncpg driver is only needed then
+async_engine = None
+AsyncSessionLocal = None
+_async_lock = threading.Lock()
+
+
+def get_async_sessionmaker():
+    global async_engine, AsyncSessionLocal
+    with _async_lock:
+        if AsyncSessionLocal is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            async_engine = create_async_engine(
+                ASYNC_DATABASE_URL, echo=False, poolclass=TimedAsyncQueuePool, **_pool_options(),
+            )
+            AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return AsyncSessionLocal
+
+
+async def close_async_engine():
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    A session for one short unit of work (closed, i.e. its connection returned, on exit).
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _call_with_session(fn, *args):
+    with session_scope() as db:
+        return fn(db, *args)
+
+
+async def run_write(fn, *args):
+    """
+    Run fn(db, *args) with a session that exists only for this call, so a request
+    holds a pooled connection for its writes, not while its upload is parsed.
+    DB_ASYNC=1 => on the asyncio engine (fn runs via AsyncSession.run_sync, no
+    thread hop); otherwise in the thread pool with a regular session.
+    """
+    if DB_ASYNC:
+        async with get_async_sessionmaker()() as db:
+            return await db.run_sync(fn, *args)
+    return await run_in_threadpool(_call_with_session, fn, *args)
+
+
+def pool_metrics(bind) -> dict:
+    """
+    Size and checkout counters of an engine's pool (sync or async engine).
+    """
+    pool = getattr(bind, "sync_engine", bind).pool
+    metrics = {"pool": type(pool).__name__}
+    for name in ("size", "checkedout", "checkedin", "overflow"):
+        if hasattr(pool, name):
+            metrics[name] = getattr(pool, name)()
+    if hasattr(pool, "_max_overflow"):
+        metrics["max_overflow"] = pool._max_overflow
+    stats = getattr(pool, "checkout_stats", None)
+    if stats is not None:
+        with pool._timing_lock:
+            stats = dict(stats)
+        wait_seconds = stats.pop("wait_seconds")
+        stats["avg_wait_ms"] = round(wait_seconds / stats["checkouts"] * 1000, 4) if stats["checkouts"] else None
+        stats["max_wait_ms"] = round(stats.pop("max_wait_seconds") * 1000, 4)
+        metrics.update(stats)
+    return metrics
+
+
+def database_metrics() -> dict:
+    return {
+        "async": DB_ASYNC,
+        "sync_pool": pool_metrics(engine),
+        "async_pool": pool_metrics(async_engine) if async_engine is not None else None,
+    }
+
+
+def add_missing_columns(metadata, bind=None):
+    """
+    create_all() never alters existing tables: add the nullable columns (and the
+    indexes) a model gained since the table was created (e.g. transactions.model_version).
+    """
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    quote = bind.dialect.identifier_preparer.quote
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+                print(f"[database] Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
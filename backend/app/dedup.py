@@ -0,0 +1,302 @@
+# backend/app/dedup.py
+"""
+Duplicate transactions across statements.
+
+Consecutive monthly statements overlap and partial statements get re-uploaded, so
+the same transaction arrives more than once. Every row of a customer's statement
+gets a fingerprint: a hash of the customer key, the transaction time (to the
+second), the merchant (lowercase, whitespace collapsed), the amount (to the cent)
+and its occurrence within the statement (the 2nd identical row is a different
+fingerprint from the 1st, so two real identical purchases are both kept, while
+uploading the statement again matches both).
+
+  - StatementDeduplicator.split(chunk)  => in the worker, right after parsing: the
+        rows already stored are split off and reported (with the id of the stored
+        transaction) instead of being featurized, scored and stored again
+  - FingerprintIndex                    => lookups of stored fingerprints: an LRU of
+        fingerprints known to be stored (FingerprintCache) answers most repeats
+        without the database; the rest are looked up with one query per statement
+        chunk. Process workers share one cache with the API (shared_cache).
+  - claim_fingerprints(db, ...)         => in the write transaction: inserts the new
+        fingerprints into transaction_fingerprints (unique) with ON CONFLICT DO
+        NOTHING; rows whose fingerprint a concurrent upload stored first are removed
+
+The cache only holds fingerprints that are in the database (a Bloom filter would
+also answer "definitely new", but only if it saw every insert, which no single
+process does with several workers / replicas). Statements without a contact email
+are not deduplicated, and rows stored before fingerprints existed are not matched.
+"""
+import hashlib
+import os
+import threading
+from collections import Counter, OrderedDict
+from multiprocessing.managers import BaseManager
+
+import pandas as pd
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Transaction, TransactionFingerprint
+
+# 0 => every row is scored and stored, even if it was seen before
+DEDUP = os.getenv("DEDUP", "1") == "1"
+# Fingerprints known to be stored, per process
+DEDUP_CACHE_SIZE = int(os.getenv("DEDUP_CACHE_SIZE", "200000"))
+# Fingerprints per IN (...) lookup
+DEDUP_LOOKUP_BATCH = 500
+
+
+def _normalized_time(value) -> str:
+    if isinstance(value, pd.Timestamp):
+        return str(value.value // 1_000_000_000)  # epoch seconds, UTC
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value is pd.NaT:
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _normalized_amount(value) -> str:
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return ""
+    return "" if pd.isna(amount) else f"{amount:.2f}"
+
+
+def _normalized(occurred_at, merchant, amount) -> tuple:
+    return _normalized_time(occurred_at), " ".join(str(merchant or "").lower().split()), _normalized_amount(amount)
+
+
+def _fingerprint(customer: str, key: tuple, occurrence: int) -> str:
+    parts = (customer or "", *key, str(occurrence))
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def transaction_fingerprint(customer: str, occurred_at, merchant, amount, occurrence: int = 1) -> str:
+    return _fingerprint(customer, _normalized(occurred_at, merchant, amount), occurrence)
+
+
+class FingerprintCache:
+    """
+    LRU of fingerprint => transaction id of rows known to be stored, and the lookup
+    counters. Thread-safe. With process workers a single one lives in a manager
+    process (shared_cache) and is called through a proxy, once per chunk.
+    """
+
+    def __init__(self, cache_size: int = DEDUP_CACHE_SIZE):
+        self.cache_size = max(0, cache_size)
+        self._cache = OrderedDict()  # fingerprint => transaction id, least recently used first
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "cache_hits": 0, "db_lookups": 0, "db_hits": 0, "remembered": 0}
+
+    def get_many(self, fingerprints: list) -> dict:
+        found = {}
+        with self._lock:
+            for fingerprint in fingerprints:
+                tx_id = self._cache.get(fingerprint)
+                if tx_id is not None:
+                    self._cache.move_to_end(fingerprint)
+                    found[fingerprint] = tx_id
+            self._stats["lookups"] += len(fingerprints)
+            self._stats["cache_hits"] += len(found)
+        return found
+
+    def remember(self, stored: dict, db_lookups: int = 0):
+        """
+        Add {fingerprint: transaction id} of stored rows: just committed ones, or
+        (db_lookups > 0) the hits of that many database lookups.
+        """
+        with self._lock:
+            if db_lookups:
+                self._stats["db_lookups"] += db_lookups
+                self._stats["db_hits"] += len(stored)
+            else:
+                self._stats["remembered"] += len(stored)
+            if not self.cache_size:
+                return
+            for fingerprint, tx_id in stored.items():
+                self._cache[fingerprint] = tx_id
+                self._cache.move_to_end(fingerprint)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached"] = len(self._cache)
+        stats["hit_rate"] = round(stats["cache_hits"] / stats["lookups"], 4) if stats["lookups"] else None
+        return stats
+
+
+class _CacheManager(BaseManager):
+    pass
+
+
+_CacheManager.register("FingerprintCache", FingerprintCache)
+_manager = None
+_shared_cache = None
+_manager_lock = threading.Lock()
+
+
+def shared_cache():
+    """
+    Proxy to the FingerprintCache of a manager process (started on first call), so
+    process workers look up in the cache the API fills with what it stores.
+    """
+    global _manager, _shared_cache
+    with _manager_lock:
+        if _manager is None:
+            _manager = _CacheManager()
+            _manager.start()
+            _shared_cache = _manager.FingerprintCache(DEDUP_CACHE_SIZE)
+        return _shared_cache
+
+
+class FingerprintIndex:
+    """
+    Which fingerprints are stored, and the id of their transaction (see module
+    docstring): the cache first, the database for the misses. One per process;
+    use_cache points it at a shared cache (process workers, see app/workers.py).
+    """
+
+    def __init__(self, cache_size: int = DEDUP_CACHE_SIZE, session_factory=SessionLocal, cache=None):
+        self.cache = cache if cache is not None else FingerprintCache(cache_size)
+        self.session_factory = session_factory
+
+    def use_cache(self, cache):
+        self.cache = cache
+
+    def _cache_call(self, method: str, *args):
+        # The manager process of a shared cache may be gone; dedup then goes to the database
+        try:
+            return getattr(self.cache, method)(*args)
+        except (OSError, EOFError) as e:
+            print(f"[dedup] Fingerprint cache unavailable: {e}")
+            return None
+
+    def lookup(self, fingerprints: list) -> dict:
+        """
+        {fingerprint: transaction id} of the stored ones among `fingerprints`.
+        """
+        found = self._cache_call("get_many", fingerprints) or {}
+        missing = [fingerprint for fingerprint in fingerprints if fingerprint not in found]
+        if missing:
+            hits = {}
+            db = self.session_factory()
+            try:
+                for start in range(0, len(missing), DEDUP_LOOKUP_BATCH):
+                    batch = missing[start:start + DEDUP_LOOKUP_BATCH]
+                    rows = db.execute(
+                        select(TransactionFingerprint.fingerprint, TransactionFingerprint.transaction_id)
+                        .where(TransactionFingerprint.fingerprint.in_(batch))
+                    ).all()
+                    hits.update({fingerprint: tx_id for fingerprint, tx_id in rows})
+            finally:
+                db.close()
+            self._cache_call("remember", hits, 1)
+            found.update(hits)
+        return found
+
+    def remember(self, stored: dict):
+        """
+        Add {fingerprint: transaction id} of committed rows to the cache.
+        """
+        if stored:
+            self._cache_call("remember", stored)
+
+    def metrics(self) -> dict:
+        stats = self._cache_call("metrics") or {}
+        stats["enabled"] = DEDUP
+        stats["shared"] = not isinstance(self.cache, FingerprintCache)
+        return stats
+
+
+fingerprint_index = FingerprintIndex()
+
+
+class StatementDeduplicator:
+    """
+    Splits the already stored rows off one statement's chunks (occurrences are
+    counted across chunks). No customer (or DEDUP=0) => nothing is split off.
+    """
+
+    def __init__(self, customer: str = None, index: FingerprintIndex = None, enabled: bool = DEDUP):
+        self.customer = customer
+        self.index = index if index is not None else fingerprint_index
+        self.enabled = enabled and bool(customer)
+        self._seen = Counter()
+
+    def split(self, chunk: pd.DataFrame):
+        """
+        Returns (new rows, their fingerprints, duplicates); duplicates are
+        {"date", "merchant", "amount", "duplicate_of"} for the response. Without
+        dedup: (chunk, None, []).
+        """
+        if not self.enabled or chunk.empty:
+            return chunk, None, []
+        columns = chunk.columns
+        times = chunk["trans_date_trans_time"].tolist() if "trans_date_trans_time" in columns else [None] * len(chunk)
+        merchants = chunk["merchant"].tolist() if "merchant" in columns else [None] * len(chunk)
+        amounts = chunk["amt"].tolist() if "amt" in columns else [None] * len(chunk)
+
+        fingerprints = []
+        for occurred_at, merchant, amount in zip(times, merchants, amounts):
+            key = _normalized(occurred_at, merchant, amount)
+            self._seen[key] += 1
+            fingerprints.append(_fingerprint(self.customer, key, self._seen[key]))
+
+        stored = self.index.lookup(fingerprints)
+        if not stored:
+            return chunk, fingerprints, []
+        is_new = [fingerprint not in stored for fingerprint in fingerprints]
+        duplicates = [
+            {
+                "date": str(occurred_at),
+                "merchant": str(merchant),
+                "amount": float(amount) if _normalized_amount(amount) else None,
+                "duplicate_of": stored[fingerprint],
+            }
+            for occurred_at, merchant, amount, fingerprint, new in zip(times, merchants, amounts, fingerprints, is_new)
+            if not new
+        ]
+        new_rows = chunk[is_new].reset_index(drop=True)
+        return new_rows, [fingerprint for fingerprint, new in zip(fingerprints, is_new) if new], duplicates
+
+
+def claim_fingerprints(db: Session, fingerprints: list, tx_ids: list, db_rows: list) -> dict:
+    """
+    Store the fingerprints of just inserted rows (same transaction as the insert,
+    committed by the caller). A fingerprint that is already taken (a concurrent
+    upload of the same transactions committed first) keeps its transaction: the
+    new row is deleted. Returns {index in db_rows: id of the stored duplicate}.
+    """
+    if not fingerprints:
+        return {}
+    table = TransactionFingerprint.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    values = [
+        {
+            "fingerprint": fingerprint,
+            "transaction_id": tx_id,
+            "customer_key": row.get("customer_key"),
+            "created_at": row.get("created_at"),
+        }
+        for fingerprint, tx_id, row in zip(fingerprints, tx_ids, db_rows)
+    ]
+    claimed = set(db.execute(
+        insert(table).on_conflict_do_nothing(index_elements=["fingerprint"]).returning(table.c.fingerprint),
+        values,
+    ).scalars().all())
+    if len(claimed) == len(values):
+        return {}
+
+    lost = {i: value["fingerprint"] for i, value in enumerate(values) if value["fingerprint"] not in claimed}
+    existing = dict(db.execute(
+        select(TransactionFingerprint.fingerprint, TransactionFingerprint.transaction_id)
+        .where(TransactionFingerprint.fingerprint.in_(list(lost.values())))
+    ).all())
+    db.execute(delete(Transaction).where(Transaction.id.in_([tx_ids[i] for i in lost])))
+    return {i: existing.get(fingerprint) for i, fingerprint in lost.items()}
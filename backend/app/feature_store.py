@@ -0,0 +1,253 @@
+# backend/app/feature_store.py
+"""
+Per-customer feature store: the profile (rolling history, see app/behavior.py) of
+every customer, keyed by their normalized contact email.
+
+  - get(key)          => the customer's profile; an LRU cache answers repeat lookups
+                         without the database (entries are re-read after
+                         FEATURE_STORE_CACHE_TTL, so other API replicas' updates show up)
+  - record(key, df)   => fold a stored statement into the cached profile right away,
+                         and queue it for the database
+  - flush()           => write every queued statement in one transaction; runs every
+                         FEATURE_STORE_FLUSH_SECONDS, as soon as FEATURE_STORE_FLUSH_ROWS
+                         rows are queued, and at shutdown
+
+Queued updates are deltas added to the stored row (under a row lock), so replicas
+flushing the same customer do not overwrite each other.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.behavior import BEHAVIOR_MAX_KEYS, empty_profile, merge_profiles, statement_profile
+from app.database import SessionLocal
+from app.models import CustomerProfile
+
+# 0 => no customer history: every statement is scored as a new customer's
+FEATURE_STORE = os.getenv("FEATURE_STORE", "1") == "1"
+FEATURE_STORE_CACHE_SIZE = int(os.getenv("FEATURE_STORE_CACHE_SIZE", "10000"))
+FEATURE_STORE_CACHE_TTL = float(os.getenv("FEATURE_STORE_CACHE_TTL", "60"))
+FEATURE_STORE_FLUSH_ROWS = int(os.getenv("FEATURE_STORE_FLUSH_ROWS", "1000"))
+FEATURE_STORE_FLUSH_SECONDS = float(os.getenv("FEATURE_STORE_FLUSH_SECONDS", "2"))
+# Merchants / categories remembered per customer (the first ones seen; same cap as
+# the features in training, see app/behavior.py)
+FEATURE_STORE_MAX_KEYS = BEHAVIOR_MAX_KEYS
+
+
+def customer_key(contact_email: str):
+    """
+    The store key of a contact email (trimmed, lowercase), or None without one.
+    """
+    if not contact_email or not contact_email.strip():
+        return None
+    return contact_email.strip().lower()
+
+
+def customer_tag(key: str):
+    """
+    Short stable hash of a customer key (for cache keys; keeps emails out of them).
+    """
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12] if key else None
+
+
+def _row_to_profile(row: CustomerProfile) -> dict:
+    return {
+        "tx_count": row.tx_count or 0,
+        "amount_sum": row.amount_sum or 0.0,
+        "amount_sq_sum": row.amount_sq_sum or 0.0,
+        "last_seen": row.last_seen,
+        "merchants": dict(row.merchant_counts or {}),
+        "categories": dict(row.category_counts or {}),
+    }
+
+
+class CustomerFeatureStore:
+    """
+    Cached, write-behind access to customer_profiles (see module docstring).
+    """
+
+    def __init__(self, enabled: bool = FEATURE_STORE, cache_size: int = FEATURE_STORE_CACHE_SIZE,
+                 cache_ttl: float = FEATURE_STORE_CACHE_TTL, flush_rows: int = FEATURE_STORE_FLUSH_ROWS,
+                 flush_seconds: float = FEATURE_STORE_FLUSH_SECONDS, max_keys: int = FEATURE_STORE_MAX_KEYS,
+                 session_factory=SessionLocal):
+        self.enabled = enabled
+        self.cache_size = max(1, cache_size)
+        self.cache_ttl = cache_ttl
+        self.flush_rows = max(1, flush_rows)
+        self.flush_seconds = flush_seconds
+        self.max_keys = max_keys
+        self.session_factory = session_factory
+        self._cache = OrderedDict()  # key => (loaded_at, profile incl. pending)
+        self._pending = {}  # key => delta not yet in the database
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            "hits": 0, "misses": 0, "evictions": 0, "lookup_seconds": 0.0,
+            "statements_recorded": 0, "rows_recorded": 0,
+            "flushes": 0, "flush_errors": 0, "flush_seconds": 0.0,
+        }
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="feature-store", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_seconds + 5)
+            self._thread = None
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def get(self, key: str):
+        """
+        The customer's profile (history before now), an empty one for a new customer,
+        or None without a key / with the store disabled. Do not modify the result.
+        """
+        if not self.enabled or key is None:
+            return None
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["lookup_seconds"] += time.perf_counter() - start
+                return entry[1]
+
+        # Not during a flush: its deltas are neither queued nor (yet) in the database
+        with self._flush_lock:
+            stored = self._load(key)
+            with self._lock:
+                pending = self._pending.get(key)
+                profile = merge_profiles(stored, pending, self.max_keys) if pending is not None else stored
+                self._cache_put(key, profile)
+                self._stats["misses"] += 1
+                self._stats["lookup_seconds"] += time.perf_counter() - start
+        return profile
+
+    def _load(self, key: str) -> dict:
+        db = self.session_factory()
+        try:
+            row = db.get(CustomerProfile, key)
+            return _row_to_profile(row) if row is not None else empty_profile()
+        except Exception as e:
+            print(f"[feature_store] Lookup failed for a customer ({e}); scoring without history")
+            return empty_profile()
+        finally:
+            db.close()
+
+    def _cache_put(self, key, profile):
+        self._cache[key] = (time.monotonic(), profile)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def record(self, key: str, df):
+        """
+        Add a stored statement's rows to the customer's history.
+        """
+        if not self.enabled or key is None or df is None or df.empty:
+            return
+        delta = statement_profile(df)
+        with self._lock:
+            pending = self._pending.get(key)
+            self._pending[key] = merge_profiles(pending, delta, self.max_keys) if pending is not None else delta
+            self._pending_rows += delta["tx_count"]
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache[key] = (entry[0], merge_profiles(entry[1], delta, self.max_keys))
+            self._stats["statements_recorded"] += 1
+            self._stats["rows_recorded"] += delta["tx_count"]
+            flush_now = self._pending_rows >= self.flush_rows
+        if flush_now:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write the queued deltas in one transaction. Returns how many customers were
+        written; on failure the deltas stay queued for the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                rows, self._pending_rows = self._pending_rows, 0
+            if not pending:
+                return 0
+
+            start = time.perf_counter()
+            db = self.session_factory()
+            try:
+                keys = sorted(pending)  # same lock order in every replica
+                stored = {
+                    row.customer_key: row
+                    for row in db.execute(
+                        select(CustomerProfile).where(CustomerProfile.customer_key.in_(keys)).with_for_update()
+                    ).scalars()
+                }
+                now = datetime.utcnow()
+                for key in keys:
+                    row = stored.get(key)
+                    if row is None:
+                        row = CustomerProfile(customer_key=key)
+                        db.add(row)
+                    merged = merge_profiles(
+                        _row_to_profile(row) if key in stored else empty_profile(), pending[key], self.max_keys,
+                    )
+                    row.tx_count = merged["tx_count"]
+                    row.amount_sum = merged["amount_sum"]
+                    row.amount_sq_sum = merged["amount_sq_sum"]
+                    row.last_seen = merged["last_seen"]
+                    row.merchant_counts = merged["merchants"]
+                    row.category_counts = merged["categories"]
+                    row.updated_at = now
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                with self._lock:
+                    for key, delta in pending.items():
+                        newer = self._pending.get(key)
+                        self._pending[key] = merge_profiles(delta, newer, self.max_keys) if newer is not None else delta
+                    self._pending_rows += rows
+                    self._stats["flush_errors"] += 1
+                print(f"[feature_store] Flush of {len(pending)} customers failed, will retry: {e}")
+                return 0
+            finally:
+                db.close()
+
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["flush_seconds"] += time.perf_counter() - start
+            return len(pending)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_customers"] = len(self._cache)
+            stats["pending_customers"] = len(self._pending)
+            stats["pending_rows"] = self._pending_rows
+        lookups = stats["hits"] + stats["misses"]
+        lookup_seconds = stats.pop("lookup_seconds")
+        stats["avg_lookup_ms"] = round(lookup_seconds / lookups * 1000, 4) if lookups else None
+        stats["flush_seconds"] = round(stats["flush_seconds"], 4)
+        stats["enabled"] = self.enabled
+        return stats
@@ -0,0 +1,214 @@
+# backend/app/jobs.py
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.alerts import AlertDispatcher
+from app.cache import ResultCache
+from app.database import SessionLocal
+from app.feature_store import CustomerFeatureStore, customer_key
+from app.models import AnalysisJob
+from app.persistence import fail_stale_jobs, start_job, update_job
+from app.pipeline import build_result_rows, cached_statement, store_and_notify
+from app.responses import dumps
+from app.shadow import ShadowScorer
+from app.uploads import SpooledUpload
+from app.workers import ModelRef, PoolFullError, WorkerPool, parse_and_score
+
+# How many jobs are driven concurrently (each one mostly waits on the worker pool)
+JOB_EXECUTOR_THREADS = int(os.getenv("JOB_EXECUTOR_THREADS", "4"))
+# How long a job waits before retrying when the worker pool is full
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "0.5"))
+# A queued / running job not updated for this long is failed (the API process running it is gone)
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "900"))
+
+STALE_JOB_ERROR = "The server stopped before the job finished; upload the statement again."
+
+
+class JobRunner:
+    """
+    Runs the statement pipeline (parse => score => persist => email) in the background.
+    All job state lives in the analysis_jobs table, so any API replica can answer a poll.
+    Jobs left queued / running by a process that is gone are failed once they have
+    not been updated for stale_seconds (at start-up, and when polled).
+    """
+
+    def __init__(self, worker_pool: WorkerPool, result_cache: ResultCache = None,
+                 max_threads: int = JOB_EXECUTOR_THREADS, shadow: ShadowScorer = None,
+                 feature_store: CustomerFeatureStore = None, alerts: AlertDispatcher = None,
+                 stale_seconds: float = JOB_STALE_SECONDS):
+        self.worker_pool = worker_pool
+        self.result_cache = result_cache
+        self.shadow = shadow
+        self.feature_store = feature_store
+        self.alerts = alerts
+        self.max_threads = max_threads
+        self.stale_seconds = stale_seconds
+        self._executor = None
+        self._pending = {}  # job id => (future, upload), until the job ends
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix="job")
+        db = SessionLocal()
+        try:
+            failed = self.fail_stale(db)
+        finally:
+            db.close()
+        if failed:
+            print(f"[jobs] Failed {failed} stale job(s) left queued / running")
+
+    def fail_stale(self, db, job_id: str = None) -> int:
+        """
+        Fail the queued / running jobs (or only job_id) not updated for stale_seconds.
+        """
+        updated_before = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        return fail_stale_jobs(db, updated_before, STALE_JOB_ERROR, job_id)
+
+    def shutdown(self):
+        """
+        Jobs that have not started are cancelled: failed, and their uploads removed.
+        Running ones are left to finish (or to be failed as stale after a restart).
+        """
+        if self._executor is None:
+            return
+        with self._lock:
+            pending = list(self._pending.items())
+        cancelled = [(job_id, upload) for job_id, (future, upload) in pending if future.cancel()]
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        if not cancelled:
+            return
+        db = SessionLocal()
+        try:
+            for job_id, upload in cancelled:
+                upload.cleanup()
+                update_job(db, job_id, status="failed", error=STALE_JOB_ERROR)
+        finally:
+            db.close()
+        print(f"[jobs] Cancelled {len(cancelled)} queued job(s) at shutdown")
+
+    def submit(self, job_id: str, upload: SpooledUpload, contact_email: str = None, cache_key: str = None,
+               model_ref: ModelRef = None):
+        """
+        Queue a job. The runner takes ownership of `upload` and cleans it up when done.
+        model_ref (default: the pool's active model now) is the model the job is scored with.
+        """
+        if self._executor is None:
+            raise RuntimeError("JobRunner is not started")
+        model_ref = model_ref or self.worker_pool.active_model
+        with self._lock:
+            future = self._executor.submit(self._run, job_id, upload, contact_email, cache_key, model_ref)
+            self._pending[job_id] = (future, upload)
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._pending.pop(job_id, None)
+
+    def _parse_and_score(self, upload: SpooledUpload, job_id: str, model_ref: ModelRef = None, profile: dict = None,
+                         customer: str = None):
+        """
+        Submit to the worker pool, waiting (instead of failing) while it is full; the
+        job's updated_at is bumped meanwhile, so a long wait is not taken as stale.
+        """
+        challenger_ref = self.shadow.inline_ref(model_ref) if self.shadow is not None and model_ref else None
+        touched_at = time.monotonic()
+        while True:
+            try:
+                return self.worker_pool.submit(
+                    parse_and_score, upload.source, upload.file_type, job_id, model_ref, challenger_ref, profile,
+                    customer,
+                ).result()
+            except PoolFullError:
+                time.sleep(JOB_RETRY_DELAY)
+                if time.monotonic() - touched_at > self.stale_seconds / 3:
+                    db = SessionLocal()
+                    try:
+                        update_job(db, job_id)
+                    finally:
+                        db.close()
+                    touched_at = time.monotonic()
+
+    def _finish(self, db, job_id: str, output_rows: list, duplicates: list = None):
+        update_job(
+            db,
+            job_id,
+            status="done",
+            rows_scored=len(output_rows),
+            rows_total=len(output_rows),
+            result=dumps(output_rows).decode("utf-8"),
+            duplicates=dumps(duplicates).decode("utf-8") if duplicates else None,
+        )
+
+    def _run(self, job_id: str, upload: SpooledUpload, contact_email: str = None, cache_key: str = None,
+             model_ref: ModelRef = None):
+        db = SessionLocal()
+        try:
+            # Same upload already analysed with this model => reuse its rows
+            if cache_key is not None and self.result_cache is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    self._finish(db, job_id, *cached_statement(cached["rows"], customer_key(contact_email)))
+                    return
+
+            if not start_job(db, job_id):
+                return  # failed as stale meanwhile
+
+            customer = customer_key(contact_email)
+            profile = self.feature_store.get(customer) if self.feature_store is not None else None
+            df, scores = self._parse_and_score(upload, job_id, model_ref, profile, customer)
+            duplicates = scores.get("duplicates", []) if scores is not None else []
+            if df.empty and not duplicates:
+                update_job(db, job_id, status="failed", error="No transactions found or parse error.")
+                return
+
+            # The job id doubles as the statement id of its rows; rows the customer
+            # already stored are only reported (job.duplicates)
+            output_rows, db_rows, fraud_details = build_result_rows(df, scores, job_id, customer)
+            if db_rows:
+                store_and_notify(
+                    db, output_rows, db_rows, fraud_details, contact_email, self.alerts, upload.file_name,
+                    scores.get("fingerprints"),
+                )
+                if self.feature_store is not None:
+                    self.feature_store.record(customer, df)
+                if self.shadow is not None:
+                    self.shadow.record(df, scores, output_rows)
+            if cache_key is not None and self.result_cache is not None:
+                self.result_cache.put(cache_key, df, scores, output_rows + duplicates)
+
+            self._finish(db, job_id, output_rows, duplicates)
+        except Exception as e:
+            traceback.print_exc()
+            db.rollback()
+            update_job(db, job_id, status="failed", error=str(e))
+        finally:
+            upload.cleanup()
+            db.close()
+
+
+def job_to_dict(job: AnalysisJob) -> dict:
+    """
+    Response body for GET /jobs/{id}.
+    """
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "fileName": job.file_name,
+        "progress": {
+            "pages_parsed": job.pages_parsed or 0,
+            "pages_total": job.pages_total,
+            "rows_scored": job.rows_scored or 0,
+            "rows_total": job.rows_total,
+        },
+        "rows": json.loads(job.result) if job.result else None,
+        "duplicates": json.loads(job.duplicates) if job.duplicates else [],
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
@@ -1,28 +1,48 @@
 # main.py
 
+import hmac
 import os
 import uuid
-import shutil
+from datetime import datetime
 
-from fastapi import FastAPI, File, UploadFile, Form, Depends
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI, File, UploadFile, Form, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-import joblib
-import pandas as pd
-
-from app.database import engine, get_db
-from app.models import Base, Transaction
-from app.parse_statement import parse_statement
-from app.send_email import send_fraud_alert
+from app.alerts import AlertDispatcher
+from app.cache import ResultCache, cache_key
+from app.database import add_missing_columns, close_async_engine, database_metrics, engine, get_db, run_write
+from app.dedup import fingerprint_index
+from app.feature_store import CustomerFeatureStore, customer_key, customer_tag
+from app.jobs import JobRunner, job_to_dict
+from app.models import Base
+from app.partitions import PartitionMaintainer, create_transactions_table
+from app.persistence import create_job, get_job, label_transaction
+from app.pipeline import build_result_rows, cached_statement, store_and_notify
+from app.queries import InvalidQueryError, list_transactions, summarize_transactions
+from app.registry import ModelNotFoundError, ModelRegistry, ModelWatcher
+from app.responses import (
+    NDJSON_MEDIA_TYPE,
+    FastJSONResponse,
+    no_transactions_response,
+    pool_full_response,
+)
+from app.schemas import OperatingPointRequest, TransactionLabelRequest
+from app.shadow import ShadowScorer, shadow_report
+from app.streaming import stream_analysis
+from app.uploads import UploadSizeLimitMiddleware, UploadTooLargeError, spool_upload, upload_too_large_response
+from app.workers import PoolFullError, WorkerPool, parse_and_score
 
-# Create all tables if needed
-Base.metadata.create_all(bind=engine)
+# Required in the X-Admin-Token header of /admin endpoints and /transactions (unset => denied)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 app = FastAPI(title="Fraud Detection API", version="1.0.0")
 
+# UPLOAD SIZE GUARD (rejects oversized uploads before the body is parsed)
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS MIDDLEWARE (adjust allowed_origins as needed)
 allowed_origins = ["*"]
 app.add_middleware(
@@ -33,137 +53,458 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# LOAD MODEL
-model_data = joblib.load("app/ml/rf_model.pkl")
-rf_model = model_data["model"]
-threshold = model_data["threshold"]
+# WORKER POOL (parsing + scoring run here; each worker loads the model once)
+worker_pool = WorkerPool()
+# RESULT CACHE (same upload + same model => reuse the first analysis)
+result_cache = ResultCache()
+# SHADOW SCORING (registry CHALLENGER scores the same batches; compared in /admin/shadow)
+shadow_scorer = ShadowScorer(worker_pool)
+# FEATURE STORE (per-customer history => behavioral features; keyed by contact email)
+feature_store = CustomerFeatureStore()
+# FRAUD ALERTS (outbox => per-recipient digests, sent in the background)
+alert_dispatcher = AlertDispatcher()
+# BACKGROUND JOBS (POST /jobs => poll GET /jobs/{id})
+job_runner = JobRunner(worker_pool, result_cache, shadow=shadow_scorer, feature_store=feature_store,
+                       alerts=alert_dispatcher)
+# MODEL REGISTRY (versioned models; the watcher hot-swaps the pool to the ACTIVE one)
+model_registry = ModelRegistry()
+model_watcher = ModelWatcher(model_registry, worker_pool, shadow=shadow_scorer)
+# TRANSACTION PARTITIONS (monthly partitions ahead of time + retention, see app/partitions.py)
+partition_maintainer = PartitionMaintainer()
+
+
+@app.on_event("startup")
+def start_worker_pool():
+    # Create all tables if needed (at startup, not import, so importing the app needs no DB);
+    # on PostgreSQL a new transactions table is partitioned by month
+    create_transactions_table(engine)
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(Base.metadata, engine)
+    # Serve the registry's active version; an empty registry => MODEL_PATH
+    active = model_registry.active_ref()
+    if active is not None:
+        worker_pool.set_active_model(active)
+    challenger = model_registry.challenger_version()
+    if challenger is not None:
+        shadow_scorer.set_challenger(model_registry.ref(challenger))
+    worker_pool.start()
+    shadow_scorer.start()
+    feature_store.start()
+    alert_dispatcher.start()
+    job_runner.start()
+    model_watcher.start()
+    partition_maintainer.start()
+
+
+@app.on_event("shutdown")
+def stop_worker_pool():
+    partition_maintainer.shutdown()
+    model_watcher.shutdown()
+    job_runner.shutdown()
+    alert_dispatcher.shutdown()
+    feature_store.shutdown()
+    shadow_scorer.shutdown()
+    worker_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_database():
+    await close_async_engine()
+
 
 @app.post("/analyze-statement")
 async def analyze_statement(
+    request: Request,
     file: UploadFile = File(...),
     contact_email: str = Form(None),
-    db: Session = Depends(get_db),
+    stream: bool = False,
 ):
     """
     1. Receive an uploaded PDF/Image of a credit card statement.
-    2. Parse statement => DataFrame.
-    3. For each row => run model => store => if fraud => notify.
+    2. Parse statement => DataFrame and score all rows (in the worker pool).
+    3. Store => if fraud => queue an alert (emailed in the background, see app/alerts.py).
+    With ?stream=true (or Accept: application/x-ndjson) the rows are streamed as
+    NDJSON batches while the statement is being parsed, followed by a summary record.
+    A DB session is only opened for the writes (after parsing), not for the whole request.
+    """
+    # 1) Read the upload (in memory, or spooled to disk when large), hashing the bytes
+    try:
+        upload = await run_in_threadpool(spool_upload, file)
+    except UploadTooLargeError:
+        return upload_too_large_response(file.filename)
+
+    # The whole request uses the model active now, even if a new one is swapped in meanwhile
+    model_ref = worker_pool.active_model
+    customer = customer_key(contact_email)
+    key = cache_key(upload.sha256, model_ref.tag, customer_tag(customer))
+
+    if stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return await stream_analysis(
+            upload, file.filename, contact_email, worker_pool, result_cache, key, model_ref, shadow_scorer,
+            feature_store, customer, alert_dispatcher,
+        )
+
+    try:
+        # Identical uploads wait for each other, so a retry never re-parses or re-inserts
+        async with result_cache.lock_for(key):
+            cached = await run_in_threadpool(result_cache.get, key)
+            if cached is not None:
+                # A customer's re-upload is stored already: all of it comes back as duplicates
+                rows, duplicates = cached_statement(cached["rows"], customer)
+                return FastJSONResponse({
+                    "status": "ok",
+                    "fileName": file.filename,
+                    "rows": rows,
+                    "modelVersion": model_ref.version,
+                    "statementId": None,
+                    "duplicates": duplicates,
+                    "cached": True,
+                })
+
+            # 2) Parse + score transactions off the event loop (with the customer's history)
+            profile = await run_in_threadpool(feature_store.get, customer)
+            try:
+                df, scores = await worker_pool.run(
+                    parse_and_score, upload.source, upload.file_type, None, model_ref,
+                    shadow_scorer.inline_ref(model_ref), profile, customer,
+                )
+            except PoolFullError as e:
+                return pool_full_response(file.filename, e)
+
+            # If no rows found, return early
+            duplicates = scores.get("duplicates", []) if scores is not None else []
+            if df.empty and not duplicates:
+                return no_transactions_response(file.filename)
+
+            # 3) Build rows => DB (one bulk insert + the alert, if fraud, in one commit);
+            #    rows the customer already stored are only reported, under "duplicates"
+            statement_id = uuid.uuid4().hex
+            output_rows, db_rows, fraud_details = build_result_rows(df, scores, statement_id, customer)
+            if db_rows:
+                await run_write(
+                    store_and_notify, output_rows, db_rows, fraud_details, contact_email, alert_dispatcher,
+                    file.filename, scores.get("fingerprints"),
+                )
+                await run_in_threadpool(shadow_scorer.record, df, scores, output_rows)
+                await run_in_threadpool(feature_store.record, customer, df)
+            await run_in_threadpool(result_cache.put, key, df, scores, output_rows + duplicates)
+    finally:
+        upload.cleanup()
+
+    # 4) Return JSON (rows are plain Python values, so skip jsonable_encoder)
+    return FastJSONResponse({
+        "status": "ok",
+        "fileName": file.filename,
+        "rows": output_rows,
+        "modelVersion": model_ref.version,
+        "statementId": statement_id,
+        "duplicates": duplicates,
+        "cached": False,
+    })
+
+
+@app.post("/jobs", status_code=202)
+async def create_analysis_job(
+    file: UploadFile = File(...),
+    contact_email: str = Form(None),
+):
+    """
+    Job mode of /analyze-statement: accept the upload, return a job id immediately,
+    and run the pipeline in the background. Poll GET /jobs/{job_id} for the result.
+    """
+    try:
+        upload = await run_in_threadpool(spool_upload, file)
+    except UploadTooLargeError:
+        return upload_too_large_response(file.filename)
+
+    job_id = str(uuid.uuid4())
+    try:
+        await run_write(create_job, job_id, file.filename, contact_email)
+        model_ref = worker_pool.active_model
+        key = cache_key(upload.sha256, model_ref.tag, customer_tag(customer_key(contact_email)))
+        job_runner.submit(job_id, upload, contact_email, key, model_ref)
+    except Exception:
+        upload.cleanup()
+        raise
+
+    return JSONResponse(
+        {"job_id": job_id, "status": "queued", "fileName": file.filename},
+        status_code=202,
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_analysis_job(job_id: str, db: Session = Depends(get_db)):
+    """
+    Status, progress (pages parsed, rows scored) and, once done, the scored rows.
+    A job its API process left unfinished is reported as failed (JobRunner.fail_stale).
+    """
+    job = get_job(db, job_id)
+    if job is None:
+        return JSONResponse({"error": "Job not found.", "job_id": job_id}, status_code=404)
+    if job.status in ("queued", "running") and job_runner.fail_stale(db, job_id):
+        db.refresh(job)
+    return job_to_dict(job)
+
+
+@app.post("/transactions/{tx_id}/label")
+def set_transaction_label(tx_id: int, body: TransactionLabelRequest, db: Session = Depends(get_db)):
+    """
+    Confirm whether a scored transaction really was fraud. Labeled rows feed the
+    incremental training (python -m app.ml.incremental).
+    """
+    if not label_transaction(db, tx_id, body.is_fraud):
+        return JSONResponse({"error": "Transaction not found.", "id": tx_id}, status_code=404)
+    return {"status": "ok", "id": tx_id, "label": body.is_fraud}
+
+
+def _admin_denied(token, unset_error: str = "Admin endpoints need ADMIN_TOKEN to be configured."):
+    """
+    403 unless the X-Admin-Token header matches ADMIN_TOKEN; denied while no
+    token is configured.
     """
-    # 1) Save to a temp file
-    ext = os.path.splitext(file.filename)[1].lower()
-    temp_filename = f"{uuid.uuid4()}{ext}"
-    temp_path = f"/tmp/{temp_filename}"
+    if not ADMIN_TOKEN:
+        return JSONResponse({"error": unset_error}, status_code=403)
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        return JSONResponse({"error": "Invalid admin token."}, status_code=403)
+    return None
 
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
-    # 2) Parse transactions
-    df = parse_statement(temp_path)
+def _customer_data_denied(token):
+    """
+    Customer transaction history needs the admin token, like the /admin endpoints.
+    """
+    return _admin_denied(token, "Customer data needs ADMIN_TOKEN to be configured.")
+
 
-    # If no rows found, return early
-    if df.empty:
+@app.get("/transactions")
+def get_customer_transactions(
+    contact_email: str,
+    flagged: bool = False,
+    limit: int = None,
+    cursor: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    x_admin_token: str = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    A customer's scored transactions (by contact email), newest first; flagged=true
+    => flagged rows only. Pass next_cursor back as cursor for the next page.
+    """
+    denied = _customer_data_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    customer = customer_key(contact_email)
+    try:
+        page = list_transactions(db, customer, limit, cursor, flagged, since, until)
+    except InvalidQueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return FastJSONResponse({"customer": customer, **page})
+
+
+@app.get("/transactions/summary")
+def get_customer_summary(
+    contact_email: str,
+    group_by: str = "month",
+    flagged: bool = False,
+    limit: int = None,
+    cursor: str = None,
+    since: datetime = None,
+    until: datetime = None,
+    x_admin_token: str = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Totals (transactions, flagged, amounts, average probability) of a customer's
+    transactions, and the same per month / merchant / category, one page at a time.
+    """
+    denied = _customer_data_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    customer = customer_key(contact_email)
+    try:
+        summary = summarize_transactions(db, customer, group_by, limit, cursor, flagged, since, until)
+    except InvalidQueryError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return FastJSONResponse({"customer": customer, **summary})
+
+
+@app.get("/admin/models")
+def list_models(x_admin_token: str = Header(None)):
+    """
+    Registry versions (metadata: threshold, metrics, features, params), the version
+    ACTIVE names and the version this process is serving.
+    """
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    return {
+        "active": model_registry.active_version(),
+        "serving": worker_pool.model_version,
+        "versions": model_registry.versions(),
+    }
+
+
+@app.post("/admin/models/{version}/activate")
+async def activate_model(version: str, x_admin_token: str = Header(None)):
+    """
+    Activate (or roll back to) a registry version: warm it up in the worker pool,
+    then swap it in. Other API processes pick it up from ACTIVE within
+    MODEL_REGISTRY_POLL_SECONDS. If the warm-up fails, ACTIVE is restored as it
+    was (removed again if there was none).
+    """
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+
+    previous = model_registry.active_version()
+    pointer = model_registry.active_pointer()
+    try:
+        model_registry.activate(version)
+    except ModelNotFoundError as e:
+        return JSONResponse({"error": str(e), "version": version}, status_code=404)
+    model_watcher.forget_failure(version)
+
+    result = await run_in_threadpool(model_watcher.sync, version)
+    if result["error"] is not None:
+        model_registry.restore_active(pointer)
         return JSONResponse(
-            {
-                "error": "No transactions found or parse error.",
-                "fileName": file.filename,
-            },
-            status_code=400,
+            {"error": result["error"], "version": version, "serving": result["version"]},
+            status_code=500,
         )
+    return {"status": "ok", "active": version, "previous": previous, "swapped": result["swapped"]}
 
-    # 3) Convert any boolean or numpy dtypes if needed
-    for col in df.columns:
-        if pd.api.types.is_bool_dtype(df[col]):
-            df[col] = df[col].astype(bool)
-
-    # 4) Evaluate each row => model => DB => detect fraud
-    output_rows = []
-    any_fraud_detected = False
-    fraud_details = []
-
-    for idx, row in df.iterrows():
-        date_str = str(row.get("trans_date_trans_time", ""))
-        merchant_str = str(row.get("merchant", ""))
-        category_str = str(row.get("category", ""))
-        # handle amount
-        try:
-            amount_val = float(row.get("amt", 0.0))
-        except ValueError:
-            amount_val = 0.0
-        currency_str = str(row.get("currency", ""))
-        transaction_type = str(row.get("transaction_type", ""))
-
-        # Build a single-row DF with the columns your model expects
-        # In your training pipeline, you used: ["amt","category","gender","state","city_pop","hour","day_of_week","distance"]
-        X_sample = pd.DataFrame([{
-            "amt": amount_val,
-            "category": category_str.lower().replace(" ", "_"),
-            "gender": row.get("gender", "U"),
-            "state": row.get("state", "XX"),
-            "city_pop": row.get("city_pop", 1000.0),
-            "hour": row.get("hour", 0),
-            "day_of_week": row.get("day_of_week", 0),
-            "distance": row.get("distance", 0.5),
-        }])
-
-        # Predict probability
-        prob = rf_model.predict_proba(X_sample)[0, 1]
-        is_fraud = (prob >= threshold)
-        explanation = (
-            f"Fraud probability={prob:.2f} >= threshold={threshold:.2f}"
-            if is_fraud
-            else f"No fraud (prob={prob:.2f} < threshold={threshold:.2f})"
-        )
 
-        if is_fraud:
-            any_fraud_detected = True
-            fraud_details.append(
-                f"Merchant={merchant_str}, Amount={amount_val}, Prob={prob:.2f}"
-            )
-
-        # Save to DB
-        tx = Transaction(
-            date=date_str,
-            merchant_name=merchant_str,
-            merchant_category=category_str,
-            transaction_amount=amount_val,
-            currency=currency_str,
-            transaction_type=transaction_type,
-            remaining_credit_limit=9999.0,  # placeholder
-            fraud_detected=is_fraud,
-            explanation=explanation,
-            probability=prob,
-        )
-        db.add(tx)
-        db.commit()
-        db.refresh(tx)
-
-        output_rows.append({
-            "date": date_str,
-            "merchant": merchant_str,
-            "category": category_str,
-            "amount": amount_val,
-            "currency": currency_str,
-            "type": transaction_type,
-            "fraud_detected": bool(is_fraud),
-            "explanation": explanation,
-            "probability": prob,
-        })
-
-    # 5) Send email if fraud
-    if any_fraud_detected and contact_email:
-        detail_msg = "\n".join(fraud_details)
-        send_fraud_alert(contact_email, detail_msg)
-
-    # 6) Return JSON
-    return JSONResponse(
-        content=jsonable_encoder({
-            "status": "ok",
-            "fileName": file.filename,
-            "rows": output_rows,
-        })
+@app.get("/admin/models/{version}/thresholds")
+def get_threshold_curve(
+    version: str,
+    alert_cost: float = None,
+    fraud_cost: float = None,
+    points: int = 101,
+    x_admin_token: str = Header(None),
+):
+    """
+    The version's test-set threshold curve: best F1 and lowest-cost operating points
+    (for the given costs), the current operating point, and up to `points` samples.
+    """
+    from app.ml import thresholds
+
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    try:
+        curve = model_registry.threshold_curve(version)
+    except ModelNotFoundError as e:
+        return JSONResponse({"error": str(e), "version": version}, status_code=404)
+    if curve is None:
+        return JSONResponse({"error": "No threshold curve saved for this version.", "version": version}, status_code=404)
+
+    metrics = thresholds.curve_metrics(
+        curve,
+        alert_cost=thresholds.ALERT_COST if alert_cost is None else alert_cost,
+        fraud_cost=thresholds.FRAUD_COST if fraud_cost is None else fraud_cost,
     )
+    return {
+        "version": version,
+        "thresholds_evaluated": len(metrics["thresholds"]),
+        "best": {objective: thresholds.point(metrics, thresholds.best_index(metrics, objective))
+                 for objective in thresholds.OBJECTIVES},
+        "operating_point": model_registry.operating_point(version),
+        "curve": thresholds.sample_points(metrics, max(2, points)),
+    }
+
+
+@app.put("/admin/models/{version}/operating-point")
+async def set_operating_point(version: str, body: OperatingPointRequest, x_admin_token: str = Header(None)):
+    """
+    Change the version's threshold without retraining. Serving processes pick it
+    up on their next registry check (this one right away).
+    """
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    try:
+        chosen = model_registry.set_operating_point(
+            version, body.threshold, body.objective, body.alert_cost, body.fraud_cost,
+        )
+    except ModelNotFoundError as e:
+        return JSONResponse({"error": str(e), "version": version}, status_code=404)
+    except ValueError as e:
+        return JSONResponse({"error": str(e), "version": version}, status_code=400)
+
+    await run_in_threadpool(model_watcher.sync)
+    if shadow_scorer.challenger is not None:
+        await run_in_threadpool(model_watcher.sync_challenger)
+    return {"status": "ok", "version": version, "operating_point": chosen}
+
+
+@app.post("/admin/models/{version}/challenger")
+async def set_challenger(version: str, x_admin_token: str = Header(None)):
+    """
+    Shadow-score live traffic with `version` (SHADOW_MODE decides background or inline).
+    """
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+
+    previous = model_registry.challenger_version()
+    try:
+        model_registry.set_challenger(version)
+    except ModelNotFoundError as e:
+        return JSONResponse({"error": str(e), "version": version}, status_code=404)
+    model_watcher.forget_failure(version)
+
+    result = await run_in_threadpool(model_watcher.sync_challenger, version)
+    if result["error"] is not None:
+        model_registry.set_challenger(previous)
+        return JSONResponse({"error": result["error"], "version": version}, status_code=500)
+    return {"status": "ok", "challenger": version, "previous": previous, "mode": shadow_scorer.mode}
+
+
+@app.delete("/admin/challenger")
+async def clear_challenger(x_admin_token: str = Header(None)):
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    previous = model_registry.challenger_version()
+    model_registry.set_challenger(None)
+    await run_in_threadpool(model_watcher.sync_challenger, None)
+    return {"status": "ok", "challenger": None, "previous": previous}
+
+
+@app.get("/admin/shadow")
+def get_shadow_report(challenger: str = None, x_admin_token: str = Header(None), db: Session = Depends(get_db)):
+    """
+    Champion vs. challenger on live traffic: agreement rate, probability deltas and
+    scoring latency per model pair, plus the shadow scorer's counters.
+    """
+    denied = _admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    return {"shadow": shadow_scorer.metrics(), "comparisons": shadow_report(db, challenger)}
 
 
 @app.get("/health")
 def health():
     return {"status": "running", "version": "1.0.0"}
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Worker pool metrics (queue depth, in-flight tasks, wait/run times), result cache
+    counters (hits, misses, evictions), feature store counters (lookups, flushes),
+    alert delivery counters (digests, retries, failures), DB pool size / checkout waits
+    partition maintenance (partitions created, months archived / dropped) and the
+    duplicate index (fingerprint cache hit rate).
+    """
+    return {
+        "worker_pool": worker_pool.metrics(),
+        "result_cache": result_cache.metrics(),
+        "feature_store": feature_store.metrics(),
+        "alerts": alert_dispatcher.metrics(),
+        "database": database_metrics(),
+        "partitions": partition_maintainer.metrics(),
+        "dedup": fingerprint_index.metrics(),
+    }
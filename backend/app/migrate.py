@@ -0,0 +1,171 @@
+# backend/app/migrate.py
+"""
+Schema migration for existing databases (new databases get everything from
+create_all at API start-up):
+  1) create missing tables, add the nullable columns and indexes models gained
+     (same as the API does at start-up, see database.add_missing_columns)
+  2) backfill transactions.occurred_at from the free-form `date` strings, in
+     batches of MIGRATE_BATCH_ROWS ids (one short transaction each, so the API
+     keeps inserting meanwhile); unreadable dates stay NULL
+  3) compact stored explanations: the threshold is parsed out of the text and the
+     text dropped, where rendering it back (scoring.render_explanation) gives the
+     same sentence
+  4) with --partition (PostgreSQL, API stopped): convert transactions into a table
+     partitioned by month (partitions.convert_to_partitioned)
+
+Rows stored before the migration have no customer_key / statement_id (the upload
+was not linked to them), so they do not show up in the per-customer queries.
+
+Run from backend/ (safe to re-run):
+    python -m app.migrate [--batch-rows 10000] [--partition]
+"""
+import argparse
+import os
+import re
+import time
+
+import pandas as pd
+from sqlalchemy import bindparam, select, update
+
+from app.database import SessionLocal, add_missing_columns, engine
+from app.models import Base, Transaction
+from app.partitions import convert_to_partitioned, create_transactions_table
+from app.scoring import render_explanation
+
+MIGRATE_BATCH_ROWS = int(os.getenv("MIGRATE_BATCH_ROWS", "10000"))
+
+_THRESHOLD = re.compile(r"threshold=([0-9.]+)")
+
+
+def parse_dates(values) -> list:
+    """
+    `date` strings as naive UTC datetimes (None where unreadable).
+    """
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", format="mixed")
+    if getattr(parsed.dt, "tz", None) is not None:
+        parsed = parsed.dt.tz_convert(None)
+    return [None if pd.isna(value) else value.to_pydatetime() for value in parsed]
+
+
+def backfill_occurred_at(batch_rows: int = MIGRATE_BATCH_ROWS, session_factory=SessionLocal) -> dict:
+    """
+    Fill occurred_at of rows that have none, walking the table by id.
+    """
+    stats = {"rows_read": 0, "rows_updated": 0, "unreadable": 0, "batches": 0}
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(Transaction.id, Transaction.date)
+                .where(Transaction.id > last_id, Transaction.occurred_at.is_(None))
+                .order_by(Transaction.id)
+                .limit(batch_rows)
+            ).all()
+            if not rows:
+                return stats
+            last_id = rows[-1].id
+            values = [
+                {"tx_id": row.id, "occurred_at": occurred_at}
+                for row, occurred_at in zip(rows, parse_dates([row.date for row in rows]))
+                if occurred_at is not None
+            ]
+            if values:
+                db.connection().execute(
+                    update(Transaction.__table__)
+                    .where(Transaction.__table__.c.id == bindparam("tx_id"))
+                    .values(occurred_at=bindparam("occurred_at")),
+                    values,
+                )
+            db.commit()
+        finally:
+            db.close()
+        stats["rows_read"] += len(rows)
+        stats["rows_updated"] += len(values)
+        stats["unreadable"] += len(rows) - len(values)
+        stats["batches"] += 1
+
+
+def compact_threshold(explanation: str, probability: float, flagged: bool):
+    """
+    Threshold of a stored explanation, or None if the text cannot be rendered back
+    exactly from probability + threshold (then it is kept as is).
+    """
+    match = _THRESHOLD.search(explanation or "")
+    if match is None or probability is None:
+        return None
+    threshold = float(match.group(1).rstrip("."))
+    if render_explanation(probability, threshold, bool(flagged)) != explanation:
+        return None
+    return threshold
+
+
+def compact_explanations(batch_rows: int = MIGRATE_BATCH_ROWS, session_factory=SessionLocal) -> dict:
+    """
+    Replace stored explanation texts by their threshold, walking the table by id.
+    """
+    stats = {"rows_read": 0, "rows_compacted": 0, "kept": 0, "batches": 0}
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(Transaction.id, Transaction.explanation, Transaction.probability, Transaction.fraud_detected)
+                .where(Transaction.id > last_id, Transaction.explanation.is_not(None))
+                .order_by(Transaction.id)
+                .limit(batch_rows)
+            ).all()
+            if not rows:
+                return stats
+            last_id = rows[-1].id
+            values = []
+            for row in rows:
+                threshold = compact_threshold(row.explanation, row.probability, row.fraud_detected)
+                if threshold is not None:
+                    values.append({"tx_id": row.id, "threshold": threshold})
+            if values:
+                db.connection().execute(
+                    update(Transaction.__table__)
+                    .where(Transaction.__table__.c.id == bindparam("tx_id"))
+                    .values(threshold=bindparam("threshold"), explanation=None),
+                    values,
+                )
+            db.commit()
+        finally:
+            db.close()
+        stats["rows_read"] += len(rows)
+        stats["rows_compacted"] += len(values)
+        stats["kept"] += len(rows) - len(values)
+        stats["batches"] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-rows", type=int, default=MIGRATE_BATCH_ROWS)
+    parser.add_argument("--partition", action="store_true",
+                        help="convert transactions into a table partitioned by month (PostgreSQL)")
+    args = parser.parse_args()
+    batch_rows = max(1, args.batch_rows)
+
+    start = time.perf_counter()
+    create_transactions_table(engine)
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(Base.metadata, engine)
+    print(f"[migrate] Schema up to date ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    stats = backfill_occurred_at(batch_rows)
+    print(f"[migrate] Backfilled occurred_at: {stats} ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    stats = compact_explanations(batch_rows)
+    print(f"[migrate] Compacted explanations: {stats} ({time.perf_counter() - start:.1f}s)")
+
+    if args.partition:
+        start = time.perf_counter()
+        stats = convert_to_partitioned(engine, batch_rows)
+        print(f"[migrate] Partitioned transactions: {stats} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# app/ml/incremental.py
+"""
+Incremental training from labeled transactions.
+
+Reads the transactions labeled since the last run (POST /transactions/{id}/label)
+in keyset-paginated batches, after the high-water mark (labeled_at, id) stored in
+training_checkpoints, so the history is never re-read. Every batch grows the
+forest of the base model (the version the last run published, else the
+registry's active one) by a few
+trees fitted on that batch only (warm start; the fitted preprocessor is kept, so
+the existing trees stay valid). The result is published as a new registry version
+and only then the high-water mark moves.
+
+Before a batch is trained on, the current model scores it (test-then-train), so
+the published metrics and threshold curve describe unseen data.
+
+The behavioral features of a labeled row are rebuilt from the stored history of
+its customer (history_behavior), as the API computed them when scoring it, so the
+new trees split on them instead of on constant defaults.
+
+Run from backend/:
+    python -m app.ml.incremental [--activate | --challenger] [--base VERSION]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, tuple_
+from sklearn.utils.class_weight import compute_sample_weight
+
+from app.behavior import BEHAVIOR_DEFAULTS, BEHAVIOR_FEATURES, behavior_features
+from app.database import SessionLocal
+from app.migrate import parse_dates
+from app.ml.thresholds import curve_metrics, index_for_threshold, point, threshold_curve
+from app.models import TrainingCheckpoint, Transaction
+from app.scoring import FEATURE_COLUMNS, build_feature_frame
+
+# Rows per database read (and per set of new trees)
+INCREMENTAL_BATCH_ROWS = int(os.getenv("INCREMENTAL_BATCH_ROWS", "5000"))
+# Rows per run; the rest is picked up by the next run
+INCREMENTAL_MAX_ROWS = int(os.getenv("INCREMENTAL_MAX_ROWS", "100000"))
+# Fewer new labeled rows than this => no new version, the rows wait for the next run
+INCREMENTAL_MIN_ROWS = int(os.getenv("INCREMENTAL_MIN_ROWS", "200"))
+INCREMENTAL_TREES_PER_BATCH = int(os.getenv("INCREMENTAL_TREES_PER_BATCH", "10"))
+# Oldest trees are dropped beyond this, so the forest follows recent data
+INCREMENTAL_MAX_TREES = int(os.getenv("INCREMENTAL_MAX_TREES", "300"))
+
+CHECKPOINT_NAME = "transactions"
+LABELED_COLUMNS = [
+    Transaction.id,
+    Transaction.labeled_at,
+    Transaction.date,
+    Transaction.occurred_at,
+    Transaction.merchant_category,
+    Transaction.transaction_amount,
+    Transaction.label,
+    Transaction.customer_key,
+    Transaction.statement_id,
+]
+# `date` of a row whose time the API could not read (str() of a missing value);
+# it was scored with hour / day_of_week 0 and stored with the scoring time as occurred_at
+UNREADABLE_DATES = {"", "NaT", "None", "nan"}
+HISTORY_COLUMNS = [
+    Transaction.id,
+    Transaction.occurred_at,
+    Transaction.merchant_name,
+    Transaction.merchant_category,
+    Transaction.transaction_amount,
+    Transaction.customer_key,
+    Transaction.statement_id,
+]
+# Customers / statements per IN (...) history query
+HISTORY_LOOKUP_BATCH = 500
+
+
+def iter_labeled_batches(db, after=None, batch_rows=INCREMENTAL_BATCH_ROWS, max_rows=INCREMENTAL_MAX_ROWS):
+    """
+    Labeled transactions after `after` = (labeled_at, id), oldest label first, as
+    lists of at most batch_rows rows. Each page starts where the last one ended
+    (keyset pagination on ix_transactions_labeled_at_id), so no OFFSET scans.
+    """
+    remaining = max_rows
+    while remaining > 0:
+        query = select(*LABELED_COLUMNS).where(Transaction.label.isnot(None), Transaction.labeled_at.isnot(None))
+        if after is not None and after[0] is not None:
+            query = query.where(tuple_(Transaction.labeled_at, Transaction.id) > tuple_(*after))
+        query = query.order_by(Transaction.labeled_at, Transaction.id).limit(min(batch_rows, remaining))
+        rows = db.execute(query).all()
+        if not rows:
+            return
+        yield rows
+        remaining -= len(rows)
+        after = (rows[-1].labeled_at, rows[-1].id)
+
+
+def _history_key(customer_key, statement_id, tx_id) -> str:
+    # Whose earlier transactions a row was scored against: its customer's, or only
+    # its statement's when the upload had no contact email
+    if customer_key:
+        return f"customer:{customer_key}"
+    if statement_id:
+        return f"statement:{statement_id}"
+    return f"row:{tx_id}"
+
+
+def history_behavior(db, rows) -> pd.DataFrame:
+    """
+    BEHAVIOR_FEATURES of labeled rows (aligned with `rows`): behavior_features over
+    the stored transactions of each row's customer (or statement, see
+    _history_key), in occurred_at order. Rows without either get BEHAVIOR_DEFAULTS.
+    """
+    customers = sorted({row.customer_key for row in rows if row.customer_key})
+    statements = sorted({row.statement_id for row in rows if not row.customer_key and row.statement_id})
+    history = []
+    for column, keys in ((Transaction.customer_key, customers), (Transaction.statement_id, statements)):
+        for start in range(0, len(keys), HISTORY_LOOKUP_BATCH):
+            query = select(*HISTORY_COLUMNS).where(column.in_(keys[start:start + HISTORY_LOOKUP_BATCH]))
+            if column is Transaction.statement_id:
+                query = query.where(Transaction.customer_key.is_(None))
+            history.extend(db.execute(query).all())
+
+    ids = [row.id for row in rows]
+    if not history:
+        return pd.DataFrame([BEHAVIOR_DEFAULTS] * len(ids), columns=BEHAVIOR_FEATURES)
+    df = pd.DataFrame(history, columns=[column.key for column in HISTORY_COLUMNS]).drop_duplicates("id")
+    features = behavior_features(
+        df["occurred_at"],
+        df["merchant_name"].fillna(""),
+        df["merchant_category"].fillna(""),
+        df["transaction_amount"].fillna(0.0).to_numpy(),
+        customers=[_history_key(*key) for key in zip(df["customer_key"], df["statement_id"], df["id"])],
+    )
+    features.index = df["id"].to_numpy()
+    return features.reindex(ids).fillna(BEHAVIOR_DEFAULTS).reset_index(drop=True)
+
+
+def labeled_times(df: pd.DataFrame) -> pd.Series:
+    """
+    The transaction time each row was scored with: occurred_at (the API's own
+    parse), else the `date` string parsed like app.migrate backfills it; NaT for
+    rows whose time the API could not read.
+    """
+    timestamps = pd.to_datetime(df["occurred_at"], errors="coerce")
+    missing = timestamps.isna().to_numpy()
+    if missing.any():
+        parsed = parse_dates(df["date"][missing].tolist())
+        timestamps[missing] = pd.to_datetime(pd.Series(parsed, index=df.index[missing], dtype=object))
+    unreadable = df["date"].isna() | df["date"].astype(str).str.strip().isin(UNREADABLE_DATES)
+    return timestamps.mask(unreadable)
+
+
+def labeled_features(rows, behavior: pd.DataFrame = None):
+    """
+    Model input + labels for transaction rows, built like the API builds them
+    from a parsed statement (hour / day_of_week from labeled_times, behavioral
+    features from `behavior` (history_behavior), other features defaulted).
+    """
+    df = pd.DataFrame(rows, columns=[column.key for column in LABELED_COLUMNS])
+    timestamps = labeled_times(df)
+    frame = pd.DataFrame({
+        "amt": df["transaction_amount"].fillna(0.0),
+        "category": df["merchant_category"].fillna(""),
+        "hour": timestamps.dt.hour.fillna(0).astype(int),
+        "day_of_week": timestamps.dt.dayofweek.fillna(0).astype(int),
+    })
+    if behavior is not None:
+        frame = pd.concat([frame, behavior.reset_index(drop=True)], axis=1)
+    X = build_feature_frame(frame)
+    return X, df["label"].astype(int).to_numpy()
+
+
+def grow_forest(model, X, y, n_trees=INCREMENTAL_TREES_PER_BATCH, max_trees=INCREMENTAL_MAX_TREES):
+    """
+    Add n_trees trees fitted on (X, y) to the pipeline's forest. X goes through the
+    already fitted preprocessor; classes are balanced with sample weights (a batch
+    has too few fraud rows for SMOTE). Keeps at most max_trees, newest last.
+    """
+    forest = model.named_steps["rf"]
+    features = model.named_steps["preprocessor"].transform(X)
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_trees)
+    try:
+        forest.fit(features, y, sample_weight=compute_sample_weight("balanced", y))
+    finally:
+        forest.set_params(warm_start=False)
+    if len(forest.estimators_) > max_trees:
+        forest.estimators_ = forest.estimators_[-max_trees:]
+        forest.set_params(n_estimators=max_trees)
+
+
+def load_base_model(registry, version=None):
+    """
+    (model, threshold, version) to continue from: `version`, else the registry's
+    active version, else the MODEL_PATH pickle.
+    """
+    from app.workers import MODEL_PATH, model_version
+
+    if version is not None and registry.get(version) is None:
+        print(f"[incremental] Version {version} is not in the registry, using the active one")
+        version = None
+    version = version or registry.active_version()
+    if version is not None:
+        path = registry.ref(version).path
+    else:
+        path, version = MODEL_PATH, model_version(MODEL_PATH)
+    model_data = joblib.load(path)
+    return model_data["model"], model_data["threshold"], version
+
+
+def run(name=CHECKPOINT_NAME, base_version=None, batch_rows=INCREMENTAL_BATCH_ROWS, max_rows=INCREMENTAL_MAX_ROWS,
+        min_rows=INCREMENTAL_MIN_ROWS, trees_per_batch=INCREMENTAL_TREES_PER_BATCH,
+        max_trees=INCREMENTAL_MAX_TREES, activate=False, challenger=False, registry=None) -> dict:
+    """
+    One incremental training run. Returns a report dict ("status": published /
+    waiting / no_new_rows).
+    """
+    from app.registry import ModelRegistry
+
+    started = time.perf_counter()
+    registry = registry or ModelRegistry()
+    db = SessionLocal()
+    try:
+        checkpoint = db.get(TrainingCheckpoint, name)
+        after = (checkpoint.labeled_at, checkpoint.transaction_id) if checkpoint is not None else None
+
+        # Continue the chain even when its versions were not activated
+        if base_version is None and checkpoint is not None:
+            base_version = checkpoint.model_version
+        model, threshold, base = load_base_model(registry, base_version)
+        trees_before = len(model.named_steps["rf"].estimators_)
+
+        # Single-class batches cannot be fitted; they are carried into the next batch
+        pending_X, pending_y = [], []
+        seen_probs, seen_labels, seen_amounts = [], [], []
+        trained_rows, batches, trees_added = 0, 0, 0
+        high_water = after
+        for rows in iter_labeled_batches(db, after, batch_rows, max_rows):
+            X, y = labeled_features(rows, history_behavior(db, rows))
+            pending_X.append(X)
+            pending_y.append(y)
+            y_all = np.concatenate(pending_y)
+            if len(np.unique(y_all)) < 2:
+                continue
+            X_all = pd.concat(pending_X, ignore_index=True)
+
+            # Test, then train
+            seen_probs.append(model.predict_proba(X_all)[:, 1])
+            seen_labels.append(y_all)
+            seen_amounts.append(X_all["amt"].to_numpy())
+            grow_forest(model, X_all, y_all, trees_per_batch, max_trees)
+
+            trained_rows += len(y_all)
+            batches += 1
+            trees_added += trees_per_batch
+            high_water = (rows[-1].labeled_at, rows[-1].id)
+            pending_X, pending_y = [], []
+
+        report = {
+            "base_version": base,
+            "rows_trained": trained_rows,
+            "rows_waiting": int(sum(len(y) for y in pending_y)),
+            "batches": batches,
+            "trees_before": trees_before,
+            "trees_after": len(model.named_steps["rf"].estimators_),
+        }
+        if trained_rows == 0 or trained_rows < min_rows:
+            report["status"] = "no_new_rows" if trained_rows == 0 and not pending_y else "waiting"
+            report["seconds"] = round(time.perf_counter() - started, 2)
+            return report
+
+        # Prequential metrics at the base threshold + the curve for operating points
+        y_seen = np.concatenate(seen_labels)
+        curve = threshold_curve(y_seen, np.concatenate(seen_probs), amounts=np.concatenate(seen_amounts))
+        metrics = curve_metrics(curve)
+        at_threshold = point(metrics, index_for_threshold(curve, threshold))
+        version = registry.publish(
+            model,
+            threshold,
+            metrics={
+                "prequential_f1": at_threshold["f1"],
+                "prequential_precision": at_threshold["precision"],
+                "prequential_recall": at_threshold["recall"],
+                "rows": trained_rows,
+                "fraud_rows": int(y_seen.sum()),
+            },
+            features=list(getattr(model, "feature_names_in_", FEATURE_COLUMNS)),
+            params={
+                "incremental": True,
+                "base_version": base,
+                "trees_per_batch": trees_per_batch,
+                "max_trees": max_trees,
+                "high_water_mark": [high_water[0].isoformat(), high_water[1]],
+            },
+            threshold_curve=curve,
+            activate=activate,
+        )
+        if challenger:
+            registry.set_challenger(version)
+
+        # Only now (the version exists) do these rows count as trained on
+        if checkpoint is None:
+            checkpoint = TrainingCheckpoint(name=name, rows_total=0)
+            db.add(checkpoint)
+        checkpoint.labeled_at, checkpoint.transaction_id = high_water
+        checkpoint.rows_total = (checkpoint.rows_total or 0) + trained_rows
+        checkpoint.model_version = version
+        checkpoint.updated_at = datetime.utcnow()
+        db.commit()
+
+        report.update({
+            "status": "published",
+            "version": version,
+            "activated": activate,
+            "challenger": challenger,
+            "prequential": at_threshold,
+            "seconds": round(time.perf_counter() - started, 2),
+        })
+        return report
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grow the model with newly labeled transactions.")
+    parser.add_argument("--name", default=CHECKPOINT_NAME, help="checkpoint (high-water mark) name")
+    parser.add_argument("--base", default=None, help="registry version to continue from (default: the last run's, else active)")
+    parser.add_argument("--batch-rows", type=int, default=INCREMENTAL_BATCH_ROWS)
+    parser.add_argument("--max-rows", type=int, default=INCREMENTAL_MAX_ROWS)
+    parser.add_argument("--min-rows", type=int, default=INCREMENTAL_MIN_ROWS)
+    parser.add_argument("--trees-per-batch", type=int, default=INCREMENTAL_TREES_PER_BATCH)
+    parser.add_argument("--max-trees", type=int, default=INCREMENTAL_MAX_TREES)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--activate", action="store_true", help="serve the new version right away")
+    target.add_argument("--challenger", action="store_true", help="shadow-score with the new version")
+    args = parser.parse_args()
+
+    report = run(
+        name=args.name,
+        base_version=args.base,
+        batch_rows=args.batch_rows,
+        max_rows=args.max_rows,
+        min_rows=args.min_rows,
+        trees_per_batch=args.trees_per_batch,
+        max_trees=args.max_trees,
+        activate=args.activate,
+        challenger=args.challenger,
+    )
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# app/ml/thresholds.py
+"""
+Threshold tuning in one pass.
+
+threshold_curve sorts the probabilities once and, with cumulative sums, counts
+true/false positives for every distinct probability used as the threshold
+(a row is flagged when probability >= threshold). Precision, recall, F1 and an
+expected cost are then plain array arithmetic over that curve, so any operating
+point can be picked later (e.g. by the API) without the labels or the model.
+
+Cost of an operating point (lower is better):
+    alert_cost * alerts + missed fraud
+where missed fraud is fraud_cost per missed fraud, or - with fraud_cost None and
+amounts given - the amount of the missed transactions.
+"""
+import os
+
+import numpy as np
+
+THRESHOLD_OBJECTIVE = os.getenv("THRESHOLD_OBJECTIVE", "f1")  # f1 / cost
+# Cost of reviewing one alert, in the same unit as transaction amounts
+ALERT_COST = float(os.getenv("ALERT_COST", "5.0"))
+# Cost of one missed fraud; unset => the missed transaction's amount
+FRAUD_COST = float(os.environ["FRAUD_COST"]) if os.getenv("FRAUD_COST") else None
+
+OBJECTIVES = ("f1", "cost")
+
+
+def threshold_curve(y_true, probs, amounts=None) -> dict:
+    """
+    Counts at every distinct threshold, highest first. Index 0 is threshold=inf
+    (nothing flagged); index i > 0 flags every row with probability >= thresholds[i].
+    Returns arrays thresholds, tp, fp (and fraud_amount_caught if amounts is given)
+    plus the totals positives, negatives (and fraud_amount).
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    probs = np.asarray(probs, dtype=np.float64)
+    order = np.argsort(probs, kind="stable")[::-1]
+    sorted_probs = probs[order]
+    sorted_true = y_true[order]
+
+    # Last position of every run of equal probabilities = everything >= that value
+    run_ends = np.flatnonzero(np.diff(sorted_probs)) if len(sorted_probs) else np.zeros(0, dtype=np.intp)
+    run_ends = np.append(run_ends, len(sorted_probs) - 1) if len(sorted_probs) else run_ends
+
+    tp = np.cumsum(sorted_true)[run_ends]
+    fp = (run_ends + 1) - tp
+    curve = {
+        "thresholds": np.concatenate([[np.inf], sorted_probs[run_ends]]),
+        "tp": np.concatenate([[0], tp]).astype(np.int64),
+        "fp": np.concatenate([[0], fp]).astype(np.int64),
+        "positives": np.int64(y_true.sum()),
+        "negatives": np.int64(len(y_true) - y_true.sum()),
+    }
+    if amounts is not None:
+        fraud_amounts = np.where(sorted_true, np.asarray(amounts, dtype=np.float64)[order], 0.0)
+        curve["fraud_amount_caught"] = np.concatenate([[0.0], np.cumsum(fraud_amounts)[run_ends]])
+        curve["fraud_amount"] = np.float64(fraud_amounts.sum())
+    return curve
+
+
+def curve_metrics(curve: dict, alert_cost: float = ALERT_COST, fraud_cost: float = FRAUD_COST) -> dict:
+    """
+    precision, recall, f1, alerts and cost at every point of the curve.
+    """
+    tp = curve["tp"].astype(np.float64)
+    fp = curve["fp"].astype(np.float64)
+    positives = float(curve["positives"])
+    fn = positives - tp
+    alerts = tp + fp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(alerts > 0, tp / alerts, 0.0)
+        recall = np.where(positives > 0, tp / positives, 0.0)
+        f1 = np.where(2 * tp + fp + fn > 0, 2 * tp / (2 * tp + fp + fn), 0.0)
+
+    if fraud_cost is None and "fraud_amount_caught" in curve:
+        missed = float(curve["fraud_amount"]) - curve["fraud_amount_caught"]
+    else:
+        missed = fn * (1.0 if fraud_cost is None else fraud_cost)
+    return {
+        "thresholds": curve["thresholds"],
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "alerts": alerts,
+        "cost": alert_cost * alerts + missed,
+    }
+
+
+def best_index(metrics: dict, objective: str = THRESHOLD_OBJECTIVE) -> int:
+    """
+    Curve index of the best operating point: highest F1, or lowest cost.
+    The nothing-flagged point (threshold inf) only wins on cost.
+    """
+    if objective == "f1":
+        return int(np.argmax(metrics["f1"][1:])) + 1 if len(metrics["f1"]) > 1 else 0
+    if objective == "cost":
+        return int(np.argmin(metrics["cost"]))
+    raise ValueError(f"Unknown threshold objective {objective!r} (expected one of {OBJECTIVES})")
+
+
+def index_for_threshold(curve: dict, threshold: float) -> int:
+    """
+    Curve index whose flagged set equals "probability >= threshold".
+    """
+    # thresholds are descending: count the ones >= threshold
+    return max(0, int(np.searchsorted(-curve["thresholds"], -threshold, side="right")) - 1)
+
+
+def point(metrics: dict, index: int) -> dict:
+    """
+    One operating point as plain floats (threshold None for "flag nothing").
+    """
+    threshold = float(metrics["thresholds"][index])
+    return {
+        "threshold": threshold if np.isfinite(threshold) else None,
+        **{name: float(metrics[name][index]) for name in ("precision", "recall", "f1", "alerts", "cost")},
+    }
+
+
+def sample_points(metrics: dict, max_points: int = 101) -> list:
+    """
+    Up to max_points operating points spread evenly over recall, for plotting.
+    """
+    recall = metrics["recall"]
+    targets = np.linspace(0.0, recall[-1], max_points)
+    indices = np.unique(np.searchsorted(recall, targets, side="left").clip(0, len(recall) - 1))
+    return [point(metrics, int(i)) for i in indices]
+
+
+def save_threshold_curve(curve: dict, path: str) -> str:
+    with open(path, "wb") as f:
+        np.savez(f, **curve)
+    return path
+
+
+def load_threshold_curve(path: str) -> dict:
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
@@ -1,89 +1,241 @@
 # app/ml/train_model.py
+import hashlib
+import json
+import os
+import resource
+import shutil
+import time
+import uuid
+
 import pandas as pd
 import numpy as np
 import joblib
 
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, f1_score
+from sklearn.metrics import classification_report
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 from sklearn.compose import ColumnTransformer
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 
-def load_data(csv_path="app/ml/credit_card_transactions.csv"):
+from app.behavior import BEHAVIOR_FEATURES, BEHAVIOR_MAX_KEYS, behavior_features
+from app.ml.thresholds import THRESHOLD_OBJECTIVE, best_index, curve_metrics, point, threshold_curve
+
+# Rows per read_csv chunk (peak memory ~ one raw chunk + the compact feature frame)
+TRAIN_CSV_CHUNK_ROWS = int(os.getenv("TRAIN_CSV_CHUNK_ROWS", "200000"))
+# 1 => keep the engineered features next to the CSV (<csv>.features.npz) and reuse them
+TRAIN_FEATURE_CACHE = os.getenv("TRAIN_FEATURE_CACHE", "1") == "1"
+# Cores for training (search x forest); default: all
+TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", str(os.cpu_count() or 1)))
+
+# Bump when the feature engineering changes, so old caches are ignored
+FEATURE_CACHE_VERSION = 3
+
+# Only these CSV columns are read; the dataset has ~20 more (names, addresses, ...)
+RAW_COLUMNS = [
+    "trans_date_trans_time", "cc_num", "merchant", "amt", "category", "gender", "state", "city_pop",
+    "lat", "long", "merch_lat", "merch_long", "is_fraud",
+]
+CATEGORICAL_FEATURES = {"category": "other", "gender": "U", "state": "XX"}  # column => fill value
+FEATURE_COLUMNS = [
+    "amt",         # transaction amount
+    "category",
+    "gender",
+    "state",
+    "city_pop",
+    "hour",
+    "day_of_week",
+    "distance",
+    *BEHAVIOR_FEATURES,  # card's history before the transaction (app/behavior.py)
+    "is_fraud"     # target
+]
+# Only needed for the behavioral features, which are computed after all chunks are read
+HISTORY_COLUMNS = ["cc_num", "merchant", "timestamp"]
+CHUNK_COLUMNS = [c for c in FEATURE_COLUMNS if c not in BEHAVIOR_FEATURES] + HISTORY_COLUMNS
+
+
+def _engineer_features(chunk, last_timestamp=None):
     """
-    1) Load CSV
-    2) Parse trans_date_trans_time
-    3) Create hour, day_of_week
-    4) Compute naive distance (fill missing lat/long with 0, so we don't drop rows)
-    5) Keep relevant columns only
+    Feature engineering for one chunk of raw rows (see load_data).
+    last_timestamp carries the forward fill of missing timestamps across chunks.
+    """
+    # 2) Parse datetime (your data is YYYY-MM-DD HH:MM:SS); missing => previous row's
+    timestamps = pd.to_datetime(chunk["trans_date_trans_time"], errors="coerce").ffill()
+    if last_timestamp is not None:
+        timestamps = timestamps.fillna(last_timestamp)
+
+    # 4) naive Euclidean distance in lat/long degrees, missing coordinates => 0.0
+    lat, long, merch_lat, merch_long = (
+        pd.to_numeric(chunk[c], errors="coerce").fillna(0.0).to_numpy()
+        for c in ["lat", "long", "merch_lat", "merch_long"]
+    )
+
+    features = pd.DataFrame({
+        "amt": chunk["amt"],
+        # 3) Extract hour & day_of_week
+        "hour": timestamps.dt.hour,
+        "day_of_week": timestamps.dt.dayofweek,
+        "distance": np.sqrt((lat - merch_lat) ** 2 + (long - merch_long) ** 2),
+        "city_pop": pd.to_numeric(chunk["city_pop"], errors="coerce").fillna(0.0),
+        "is_fraud": chunk["is_fraud"].astype(int),
+        "cc_num": chunk["cc_num"],
+        "merchant": chunk["merchant"].astype("category"),
+        "timestamp": timestamps,
+    }, index=chunk.index)
+    for column, fill_value in CATEGORICAL_FEATURES.items():
+        values = chunk[column].astype("category")
+        if fill_value not in values.cat.categories:
+            values = values.cat.add_categories([fill_value])
+        features[column] = values.fillna(fill_value)
+
+    valid = timestamps.dropna()
+    return features[CHUNK_COLUMNS], (valid.iloc[-1] if len(valid) else last_timestamp)
+
+
+def _concat_features(chunks):
     """
+    Concatenate chunk frames; categorical columns are merged with union_categoricals
+    (plain concat would fall back to object dtype when chunk categories differ).
+    """
+    categorical = [*CATEGORICAL_FEATURES, "merchant"]
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for column in categorical:
+        df[column] = pd.api.types.union_categoricals([chunk[column] for chunk in chunks])
+    return df[CHUNK_COLUMNS]
 
-    # 1) Load
-    df = pd.read_csv(csv_path)
-    print("Initial CSV shape:", df.shape)
 
-    # 2) Parse datetime (your data is YYYY-MM-DD HH:MM:SS)
-    df["trans_date_trans_time"] = pd.to_datetime(
-        df["trans_date_trans_time"], 
-        errors="coerce"
-    )
+def _add_behavior_features(df):
+    """
+    Per-card rolling features (app/behavior.py), the same ones the API computes from
+    a customer's stored history. Returns the frame with FEATURE_COLUMNS only.
+    """
+    behavior = behavior_features(df["timestamp"], df["merchant"], df["category"], df["amt"], customers=df["cc_num"])
+    for column in BEHAVIOR_FEATURES:
+        df[column] = behavior[column].to_numpy()
+    return df[FEATURE_COLUMNS]
 
-    # If we want to ensure we have some valid timestamps, fill NaT => drop or fill
-    # We'll just fill them with a default so we don't drop everything
-    df["trans_date_trans_time"] = df["trans_date_trans_time"].fillna(method="ffill")
 
-    # 3) Extract hour & day_of_week
-    df["hour"] = df["trans_date_trans_time"].dt.hour
-    df["day_of_week"] = df["trans_date_trans_time"].dt.dayofweek
+def _feature_cache_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".features.npz"
 
-    # 4) Compute distance: fill missing lat/long with 0.0
-    for c in ["lat", "long", "merch_lat", "merch_long"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
 
-    # naive Euclidean distance in lat/long degrees
-    df["distance"] = np.sqrt(
-        (df["lat"] - df["merch_lat"])**2 + 
-        (df["long"] - df["merch_long"])**2
-    )
+def _csv_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"csv_size": stat.st_size, "csv_mtime_ns": stat.st_mtime_ns, "version": FEATURE_CACHE_VERSION,
+            "max_keys": BEHAVIOR_MAX_KEYS}
+
 
-    # Make sure is_fraud is int
-    df["is_fraud"] = df["is_fraud"].astype(int)
-
-    # 5) Keep columns that actually exist & won't yield empty data
-    # We'll skip 'dob' to avoid missing data issues
-    keep_cols = [
-        "amt",         # transaction amount
-        "category",
-        "gender",
-        "state",
-        "city_pop",
-        "hour",
-        "day_of_week",
-        "distance",
-        "is_fraud"     # target
-    ]
-    df = df[keep_cols]
-    # If any row is missing in these columns, we can fill or drop. We'll fill numeric with 0
-    df["city_pop"] = pd.to_numeric(df["city_pop"], errors="coerce").fillna(0.0)
-    df["gender"] = df["gender"].fillna("U")   # unknown
-    df["state"]  = df["state"].fillna("XX")   # unknown
-    df["category"] = df["category"].fillna("other")
-
-    # That's it. We keep all rows. 
+def save_feature_cache(df, cache_path, signature):
+    """
+    Engineered features as one .npz: numeric columns as arrays, categorical columns
+    as codes + categories, plus the CSV signature they were built from.
+    Written to a temp file, then renamed.
+    """
+    arrays = {"__signature__": np.array(json.dumps(signature))}
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            arrays[f"{column}__codes"] = df[column].cat.codes.to_numpy()
+            arrays[f"{column}__categories"] = np.array(df[column].cat.categories, dtype=str)
+        else:
+            arrays[column] = df[column].to_numpy()
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def load_feature_cache(cache_path, signature):
+    """
+    The cached feature frame, or None if missing or built from another CSV / version.
+    """
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if json.loads(str(data["__signature__"])) != signature:
+                return None
+            columns = {}
+            for column in FEATURE_COLUMNS:
+                if column in CATEGORICAL_FEATURES:
+                    columns[column] = pd.Categorical.from_codes(
+                        data[f"{column}__codes"], categories=data[f"{column}__categories"],
+                    )
+                else:
+                    columns[column] = data[column]
+    except (OSError, KeyError, ValueError):
+        return None
+    return pd.DataFrame(columns, columns=FEATURE_COLUMNS)
+
+
+def load_data(csv_path="app/ml/credit_card_transactions.csv", chunk_rows=TRAIN_CSV_CHUNK_ROWS,
+              use_cache=TRAIN_FEATURE_CACHE):
+    """
+    1) Load CSV in chunks of chunk_rows, only the columns the features need,
+       with category / gender / state as categorical dtypes
+    2) Parse trans_date_trans_time (missing => forward fill)
+    3) Create hour, day_of_week
+    4) Compute naive distance (fill missing lat/long with 0, so we don't drop rows)
+    5) Keep relevant columns only (missing city_pop => 0, gender => U, state => XX,
+       category => other)
+    6) Behavioral features per card (cc_num) over its earlier transactions
+    With use_cache, the result is saved next to the CSV and reused while the CSV
+    is unchanged, so re-runs skip all of the above.
+    """
+    cache_path = _feature_cache_path(csv_path)
+    signature = _csv_signature(csv_path)
+    if use_cache:
+        df = load_feature_cache(cache_path, signature)
+        if df is not None:
+            print(f"Loaded cached features from {cache_path}:", df.shape)
+            return df
+
+    # 1) Load only what we need; the categorical columns are stored as codes
+    reader = pd.read_csv(
+        csv_path,
+        usecols=RAW_COLUMNS,
+        dtype={column: "category" for column in [*CATEGORICAL_FEATURES, "merchant"]},
+        chunksize=chunk_rows,
+    )
+    chunks = []
+    last_timestamp = None
+    rows_read = 0
+    for chunk in reader:
+        rows_read += len(chunk)
+        features, last_timestamp = _engineer_features(chunk, last_timestamp)
+        chunks.append(features)
+    print("Rows read from CSV:", rows_read)
+
+    # That's it. We keep all rows.
+    df = _add_behavior_features(_concat_features(chunks))
     print("Final shape after feature engineering:", df.shape)
+
+    if use_cache:
+        save_feature_cache(df, cache_path, signature)
+        print(f"Cached features in {cache_path}")
     return df
 
 
-def build_pipeline():
+def plan_parallelism(n_fits, n_jobs=TRAIN_N_JOBS):
+    """
+    Split n_jobs cores between the hyperparameter search (parallel fits) and each
+    forest (parallel trees), so search_jobs * forest_jobs <= n_jobs instead of
+    both using every core. Returns (search_jobs, forest_jobs).
+    """
+    n_jobs = max(1, n_jobs)
+    search_jobs = max(1, min(n_fits, n_jobs))
+    return search_jobs, max(1, n_jobs // search_jobs)
+
+
+def build_pipeline(n_jobs=-1, behavior_features=True):
     """
     Creates a pipeline:
       - ColumnTransformer for numeric vs. categorical
+        (behavior_features=False => without the per-card history columns, like older models)
       - SMOTE for class balance
-      - RandomForest
+      - RandomForest (n_jobs trees fitted in parallel)
     """
     numeric_feats = ["amt", "city_pop", "hour", "day_of_week", "distance"]
+    if behavior_features:
+        numeric_feats += BEHAVIOR_FEATURES
     cat_feats = ["category", "gender", "state"]
 
     numeric_transformer = StandardScaler()
@@ -94,7 +246,7 @@ def build_pipeline():
         ("cat", cat_transformer, cat_feats)
     ])
 
-    rf = RandomForestClassifier(random_state=42, n_jobs=-1)
+    rf = RandomForestClassifier(random_state=42, n_jobs=n_jobs)
 
     # ImbPipeline from imblearn so SMOTE occurs after transforms
     pipeline = ImbPipeline([
@@ -105,22 +257,158 @@ def build_pipeline():
     return pipeline
 
 
+def export_forest_arrays(model) -> dict:
+    """
+    Flatten a fitted pipeline (ColumnTransformer -> SMOTE -> RandomForest) into plain
+    NumPy arrays for the API's compiled inference engine (app/compiled_model.py):
+      - numeric columns: StandardScaler mean/scale + output position
+      - categorical columns: OneHotEncoder categories + output position of each one
+      - all trees concatenated: feature, threshold, children (interleaved left/right,
+        global node indices; leaves point to themselves), leaf flag, missing-value
+        direction, leaf class probabilities, plus each tree's root and the maximum depth
+    """
+    preprocessor = model.named_steps["preprocessor"]
+    forest = model.named_steps["rf"]
+
+    numeric_columns, numeric_positions, means, scales = [], [], [], []
+    categorical_columns, category_values, category_positions, category_offsets = [], [], [], [0]
+    position = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        if isinstance(transformer, StandardScaler):
+            n = len(columns)
+            numeric_columns.extend(columns)
+            numeric_positions.extend(range(position, position + n))
+            means.extend(transformer.mean_ if transformer.mean_ is not None else np.zeros(n))
+            scales.extend(transformer.scale_ if transformer.scale_ is not None else np.ones(n))
+            position += n
+        elif isinstance(transformer, OneHotEncoder) and transformer.drop is None:
+            for column, categories in zip(columns, transformer.categories_):
+                categorical_columns.append(column)
+                category_values.extend(str(c) for c in categories)
+                category_positions.extend(range(position, position + len(categories)))
+                category_offsets.append(len(category_values))
+                position += len(categories)
+        else:
+            raise ValueError(f"Cannot export transformer {name!r} ({type(transformer).__name__})")
+
+    features, thresholds, children, leaves, missing_left, leaf_values, roots = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(tree.threshold)
+        children.append(np.stack([
+            np.where(is_leaf, ids, tree.children_left),
+            np.where(is_leaf, ids, tree.children_right),
+        ], axis=1).ravel() + offset)
+        leaves.append(is_leaf)
+        missing_left.append(tree.missing_go_to_left.astype(bool))
+        leaf_values.append(tree.value[:, 0, :forest.n_classes_])
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return {
+        "numeric_columns": np.array(numeric_columns, dtype=str),
+        "numeric_positions": np.array(numeric_positions, dtype=np.intp),
+        "numeric_mean": np.array(means, dtype=np.float64),
+        "numeric_scale": np.array(scales, dtype=np.float64),
+        "categorical_columns": np.array(categorical_columns, dtype=str),
+        "category_values": np.array(category_values, dtype=str),
+        "category_positions": np.array(category_positions, dtype=np.intp),
+        "category_offsets": np.array(category_offsets, dtype=np.intp),
+        "n_features": np.array(position, dtype=np.intp),
+        "classes": np.asarray(forest.classes_),
+        "node_feature": np.concatenate(features).astype(np.intp),
+        "node_threshold": np.concatenate(thresholds).astype(np.float64),
+        "node_children": np.concatenate(children).astype(np.intp),
+        "node_is_leaf": np.concatenate(leaves),
+        "node_missing_left": np.concatenate(missing_left),
+        "leaf_value": np.concatenate(leaf_values).astype(np.float64),
+        "tree_roots": np.array(roots, dtype=np.intp),
+        "max_depth": np.array(max_depth, dtype=np.intp),
+    }
+
+
+def save_compiled_model(model, threshold, path, source_path=None):
+    """
+    Save export_forest_arrays(model) as a directory of .npy files (plus meta.json)
+    that the API memory-maps, so all worker processes share one read-only copy.
+    source_version is the short sha256 of the pickle (same as the API's model version),
+    so the API only uses the arrays with the pickle they were exported from.
+    The files are written to a temp dir next to `path` and renamed into place:
+    running workers keep the arrays they mapped, truncating them would crash them.
+    """
+    source_version = "unknown"
+    if source_path is not None:
+        with open(source_path, "rb") as f:
+            source_version = hashlib.sha256(f.read()).hexdigest()[:12]
+
+    parent, name = os.path.split(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = os.path.join(parent, f".{name}-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        for array_name, array in export_forest_arrays(model).items():
+            np.save(os.path.join(tmp_dir, f"{array_name}.npy"), array, allow_pickle=False)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"source_version": source_version, "threshold": float(threshold)}, f)
+
+        # Move the old directory aside (its files stay mapped until unmapped), then swap
+        old_dir = None
+        if os.path.exists(path):
+            old_dir = os.path.join(parent, f".{name}-old-{uuid.uuid4().hex}")
+            os.rename(path, old_dir)
+        os.rename(tmp_dir, path)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return path
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory so far: this process, and the largest of the search's
+    worker processes once they have exited. Linux reports KiB.
+    """
+    return {
+        "main": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "largest_worker": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
 def main():
+    started = time.perf_counter()
+    stages = {}
+
+    def mark(stage, since):
+        stages[stage] = round(time.perf_counter() - since, 2)
+        return time.perf_counter()
+
     # Load data
+    stage_start = time.perf_counter()
     df = load_data("app/ml/credit_card_transactions.csv")
     print(df.head())  # debug first 5 rows
+    stage_start = mark("load_data", stage_start)
 
     # Separate features & target
     X = df.drop("is_fraud", axis=1)
     y = df["is_fraud"].values
+    del df
 
     # Split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.2, random_state=42, stratify=y
     )
     print("Train shape:", X_train.shape, "Test shape:", X_test.shape)
-
-    pipeline = build_pipeline()
+    stage_start = mark("split", stage_start)
 
     # Let's do a small hyperparam search
     param_dist = {
@@ -129,45 +417,59 @@ def main():
         "rf__min_samples_split": [2, 5],
         "rf__min_samples_leaf": [1, 2],
     }
+    n_iter, cv = 4, 3  # small for demo
 
-    from sklearn.model_selection import RandomizedSearchCV
+    # Parallel fits in the search, each forest gets the cores left over
+    search_jobs, forest_jobs = plan_parallelism(n_iter * cv)
+    print(f"Parallelism: {search_jobs} search fits x {forest_jobs} forest jobs ({TRAIN_N_JOBS} cores)")
+    pipeline = build_pipeline(n_jobs=forest_jobs)
 
     search = RandomizedSearchCV(
         pipeline,
         param_dist,
-        n_iter=4,        # small for demo
+        n_iter=n_iter,
         scoring="f1",
-        cv=3,
+        cv=cv,
         verbose=2,
-        n_jobs=-1,
+        n_jobs=search_jobs,
+        refit=False,
         random_state=42
     )
 
     search.fit(X_train, y_train)
-    best_model = search.best_estimator_
     print("Best params:", search.best_params_)
+    # Stop the search's worker processes (frees their memory, and records their peak RSS)
+    from joblib.externals.loky import get_reusable_executor
+    get_reusable_executor().shutdown(wait=True)
+    stage_start = mark("search", stage_start)
+
+    # Refit the winner alone, so its forest can use every core
+    best_model = build_pipeline(n_jobs=TRAIN_N_JOBS).set_params(**search.best_params_)
+    best_model.fit(X_train, y_train)
+    stage_start = mark("refit", stage_start)
 
     # Evaluate default threshold=0.5
     y_pred = best_model.predict(X_test)
     print("Classification report @ threshold=0.5:")
     print(classification_report(y_test, y_pred))
 
-    # Probability + threshold tuning
+    # Probability + threshold tuning: every distinct probability in one pass (app/ml/thresholds.py)
     probs = best_model.predict_proba(X_test)[:, 1]
-    thresholds = np.linspace(0, 1, 50)
-    best_thr = 0.5
-    best_f1 = -1
-    for t in thresholds:
-        temp_pred = (probs >= t).astype(int)
-        f1 = f1_score(y_test, temp_pred)
-        if f1 > best_f1:
-            best_f1 = f1
-            best_thr = t
-
-    print(f"Best threshold by F1: {best_thr:.3f} (F1={best_f1:.3f})")
+    curve = threshold_curve(y_test, probs, amounts=X_test["amt"].to_numpy())
+    curve_points = curve_metrics(curve)
+    best = point(curve_points, best_index(curve_points, THRESHOLD_OBJECTIVE))
+    best_thr = best["threshold"] if best["threshold"] is not None else float(np.nextafter(probs.max(), np.inf))
+    best_f1 = best["f1"]
+
+    print(
+        f"Best threshold by {THRESHOLD_OBJECTIVE}: {best_thr:.4f} "
+        f"(F1={best_f1:.3f}, precision={best['precision']:.3f}, recall={best['recall']:.3f}, cost={best['cost']:.2f}; "
+        f"{len(curve['thresholds'])} thresholds evaluated)"
+    )
     final_preds = (probs >= best_thr).astype(int)
     print("Classification report @ best threshold:")
     print(classification_report(y_test, final_preds))
+    stage_start = mark("evaluate", stage_start)
 
     # Save model
     model_data = {
@@ -177,6 +479,41 @@ def main():
     joblib.dump(model_data, "app/ml/rf_model.pkl")
     print("Saved rf_model.pkl with best threshold.")
 
+    # Export the fitted preprocessor + forest as NumPy arrays for the API
+    save_compiled_model(best_model, best_thr, "app/ml/rf_model_compiled", source_path="app/ml/rf_model.pkl")
+    print("Saved rf_model_compiled/ (memory-mappable forest arrays).")
+
+    # Publish as a new registry version; running APIs hot-swap to it (app/registry.py)
+    from sklearn.metrics import precision_score, recall_score, roc_auc_score
+
+    from app.registry import ModelRegistry
+
+    version = ModelRegistry().publish(
+        best_model,
+        best_thr,
+        metrics={
+            "f1": float(best_f1),
+            "precision": float(precision_score(y_test, final_preds, zero_division=0)),
+            "recall": float(recall_score(y_test, final_preds)),
+            "roc_auc": float(roc_auc_score(y_test, probs)),
+            "cv_f1": float(search.best_score_),
+        },
+        features=list(X.columns),
+        params=search.best_params_,
+        threshold_curve=curve,
+        activate=os.getenv("MODEL_REGISTRY_ACTIVATE", "1") == "1",
+    )
+    print(f"Published model version {version} to the registry.")
+    mark("save", stage_start)
+
+    print("Training run:", json.dumps({
+        "wall_sec": round(time.perf_counter() - started, 2),
+        "stages_sec": stages,
+        "peak_rss_mb": _peak_rss_mb(),
+        "search_jobs": search_jobs,
+        "forest_jobs": forest_jobs,
+    }))
+
 
 if __name__ == "__main__":
     main()
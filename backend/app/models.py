@@ -1,5 +1,7 @@
 # backend/app/models.py
-from sqlalchemy import Column, Integer, String, Boolean, Float, Text
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Boolean, Float, Text, DateTime, Index, JSON, text
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -17,5 +19,148 @@ class Transaction(Base):
     remaining_credit_limit = Column(Float, nullable=True)
 
     fraud_detected = Column(Boolean, default=False)
+    # Legacy rows only: the explanation is rendered from probability + threshold
+    # (scoring.explanation_for) instead of storing the same sentence on every row
     explanation = Column(Text, nullable=True)
     probability = Column(Float, nullable=True)
+    threshold = Column(Float, nullable=True)  # decision threshold the row was scored with
+    model_version = Column(String, nullable=True)  # registry version that scored the row
+
+    # Confirmed outcome (POST /transactions/{id}/label), used by app/ml/incremental.py
+    label = Column(Boolean, nullable=True)
+    labeled_at = Column(DateTime, nullable=True)
+
+    # Typed copy of `date` (the time of scoring when the statement's date is unreadable)
+    occurred_at = Column(DateTime, nullable=True)
+    statement_id = Column(String(36), nullable=True)  # rows of one upload
+    customer_key = Column(String, nullable=True)  # normalized contact email (feature_store.customer_key)
+    # When the row was stored: the monthly partition / retention key (app/partitions.py)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Keyset order of newly labeled rows
+        Index("ix_transactions_labeled_at_id", "labeled_at", "id"),
+        # A customer's history, newest first (keyset pagination on (occurred_at, id))
+        Index("ix_transactions_customer_occurred", "customer_key", "occurred_at", "id"),
+        # Same, flagged rows only (a small fraction of the table)
+        Index(
+            "ix_transactions_customer_flagged", "customer_key", "occurred_at", "id",
+            postgresql_where=text("fraud_detected = true"),
+            sqlite_where=text("fraud_detected = 1"),
+        ),
+        Index("ix_transactions_statement_id", "statement_id"),
+        # Month ranges for retention where the table is not partitioned
+        Index("ix_transactions_created_at", "created_at"),
+    )
+
+
+# Dedup index of stored transactions (app/dedup.py): a table of its own, since a unique
+# constraint on the partitioned transactions table would have to include the partition key
+class TransactionFingerprint(Base):
+    __tablename__ = "transaction_fingerprints"
+
+    fingerprint = Column(String(32), primary_key=True)  # customer + time + merchant + amount + occurrence
+    transaction_id = Column(Integer, nullable=False)
+    customer_key = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # pruned with the transactions' month
+
+
+class AnalysisJob(Base):
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(36), primary_key=True)
+    status = Column(String, nullable=False, default="queued")  # queued/running/done/failed
+    file_name = Column(String, nullable=True)
+    contact_email = Column(String, nullable=True)
+
+    pages_parsed = Column(Integer, default=0)
+    pages_total = Column(Integer, nullable=True)
+    rows_scored = Column(Integer, default=0)
+    rows_total = Column(Integer, nullable=True)
+
+    result = Column(Text, nullable=True)  # JSON-encoded output rows
+    duplicates = Column(Text, nullable=True)  # JSON-encoded rows already stored (app/dedup.py)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class StatementCacheEntry(Base):
+    __tablename__ = "statement_cache"
+
+    key = Column(String(128), primary_key=True)  # sha256(upload):model_version[:customer]
+    result = Column(Text, nullable=False)  # JSON-encoded output rows
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ShadowScore(Base):
+    __tablename__ = "shadow_scores"
+
+    id = Column(Integer, primary_key=True)
+    transaction_id = Column(Integer, index=True)
+    batch_id = Column(String(32), nullable=False)  # rows scored by one predict_proba call
+    mode = Column(String, nullable=False)  # inline/background
+
+    champion_version = Column(String, nullable=False, index=True)
+    challenger_version = Column(String, nullable=False, index=True)
+    champion_probability = Column(Float, nullable=False)
+    challenger_probability = Column(Float, nullable=False)
+    champion_fraud = Column(Boolean, nullable=False)
+    challenger_fraud = Column(Boolean, nullable=False)
+    agree = Column(Boolean, nullable=False)
+
+    # Scoring time of the whole batch (same on every row of the batch)
+    champion_ms = Column(Float, nullable=True)
+    challenger_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TrainingCheckpoint(Base):
+    __tablename__ = "training_checkpoints"
+
+    # High-water mark of an incremental training stream: rows up to
+    # (labeled_at, transaction_id) have been trained on
+    name = Column(String, primary_key=True)
+    labeled_at = Column(DateTime, nullable=True)
+    transaction_id = Column(Integer, nullable=True)
+    rows_total = Column(Integer, default=0)
+    model_version = Column(String, nullable=True)  # last version published from this stream
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CustomerProfile(Base):
+    __tablename__ = "customer_profiles"
+
+    # Rolling history of one customer (app/behavior.py), keyed by normalized contact email
+    customer_key = Column(String, primary_key=True)
+    tx_count = Column(Integer, nullable=False, default=0)
+    amount_sum = Column(Float, nullable=False, default=0.0)
+    amount_sq_sum = Column(Float, nullable=False, default=0.0)
+    last_seen = Column(Float, nullable=True)  # epoch seconds of the latest transaction
+    merchant_counts = Column(JSON, nullable=False, default=dict)
+    category_counts = Column(JSON, nullable=False, default=dict)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class AlertOutbox(Base):
+    __tablename__ = "alert_outbox"
+
+    # One flagged statement waiting to be emailed (app/alerts.py); written in the
+    # same transaction as its transactions, sent later as part of a per-recipient digest
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String, nullable=False, index=True)
+    file_name = Column(String, nullable=True)
+    details = Column(Text, nullable=False)  # one line per flagged row
+    status = Column(String, nullable=False, default="pending")  # pending/sending/sent/failed/skipped
+    attempts = Column(Integer, nullable=False, default=0)
+    # pending => when it is due (digest window / retry backoff); sending => when the claim expires
+    next_attempt_at = Column(DateTime, nullable=False)
+    digest_id = Column(String(32), nullable=True)  # rows sent in the same email
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Due rows of the dispatcher's poll
+        Index("ix_alert_outbox_status_due", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,195 @@
+# backend/app/ocr.py
+"""
+Band-parallel OCR for statement images.
+
+Instead of one tesseract call over the whole page:
+  1) Downscale to OCR_TARGET_DPI and deskew.
+  2) Find text-line bands with a horizontal projection of the binarized image.
+  3) OCR the bands in parallel (each pytesseract call is its own subprocess,
+     so a thread pool is enough) with tesseract's single-line mode.
+  4) Cache the text of every band by the hash of its pixels.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import pytesseract
+
+# "bands" => band-parallel OCR, "page" => a single tesseract call over the page
+OCR_MODE = os.getenv("OCR_MODE", "bands")
+# Parallel tesseract calls per process. With WORKER_MODE=process every worker has
+# its own OCR pool, so by default the CPUs are split between WORKER_POOL_SIZE workers
+_CPUS = os.cpu_count() or 1
+_OCR_POOLS = int(os.getenv("WORKER_POOL_SIZE", str(_CPUS))) if os.getenv("WORKER_MODE", "process") == "process" else 1
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, _CPUS // max(1, _OCR_POOLS)))))
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Statements are assumed to be letter/A4 width when estimating the scan DPI
+OCR_PAGE_WIDTH_INCHES = float(os.getenv("OCR_PAGE_WIDTH_INCHES", "8.5"))
+OCR_BAND_CACHE_SIZE = int(os.getenv("OCR_BAND_CACHE_SIZE", "4096"))
+
+MIN_ROW_PIXELS = 2  # a pixel row with fewer ink pixels counts as blank
+MAX_BAND_GAP = 2  # blank rows allowed inside one text line
+MIN_BAND_HEIGHT = 6
+BAND_PADDING = 3
+MAX_DESKEW_ANGLE = 15.0
+MIN_DESKEW_ANGLE = 0.3
+
+_band_cache = OrderedDict()
+_band_cache_lock = threading.Lock()
+ocr_stats = {"bands": 0, "band_cache_hits": 0, "pages": 0}
+_ocr_pool = None
+_ocr_pool_size = 0
+
+
+def normalize_resolution(gray: np.ndarray, target_dpi: int = None) -> np.ndarray:
+    """
+    Downscale a scan to roughly target_dpi (estimated from the image width).
+    Never upscales.
+    """
+    if target_dpi is None:
+        target_dpi = OCR_TARGET_DPI
+    estimated_dpi = gray.shape[1] / OCR_PAGE_WIDTH_INCHES
+    if estimated_dpi <= target_dpi:
+        return gray
+    scale = target_dpi / estimated_dpi
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def deskew(gray: np.ndarray, binary: np.ndarray) -> tuple:
+    """
+    Rotate gray + binary so text lines are horizontal. The angle comes from the
+    minimum-area rectangle around all ink pixels; small or implausible angles are ignored.
+    """
+    coords = cv2.findNonZero(binary)
+    if coords is None:
+        return gray, binary
+    angle = cv2.minAreaRect(coords)[-1]
+    # minAreaRect angles are in [-90, 90) (or (0, 90] in OpenCV >= 4.5); map to [-45, 45)
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    if abs(angle) < MIN_DESKEW_ANGLE or abs(angle) > MAX_DESKEW_ANGLE:
+        return gray, binary
+
+    h, w = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    gray = cv2.warpAffine(gray, matrix, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    binary = cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_NEAREST, borderValue=0)
+    return gray, binary
+
+
+def prepare_image(gray: np.ndarray) -> tuple:
+    """
+    Normalize resolution, binarize (ink = 255) and deskew a grayscale scan.
+    Returns (gray, binary).
+    """
+    gray = normalize_resolution(gray)
+    _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
+    return deskew(gray, binary)
+
+
+def find_text_bands(binary: np.ndarray) -> list:
+    """
+    (top, bottom) row ranges of text lines, from the horizontal projection of
+    a binarized image (ink = non-zero).
+    """
+    ink_rows = np.count_nonzero(binary, axis=1) >= MIN_ROW_PIXELS
+    if not ink_rows.any():
+        return []
+
+    # Start/end indices of runs of ink rows
+    padded = np.concatenate(([False], ink_rows, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    runs = list(zip(changes[0::2], changes[1::2]))
+
+    bands = []
+    for start, stop in runs:
+        if bands and start - bands[-1][1] <= MAX_BAND_GAP:
+            bands[-1] = (bands[-1][0], stop)
+        else:
+            bands.append((start, stop))
+
+    height = binary.shape[0]
+    return [
+        (max(0, int(top) - BAND_PADDING), min(height, int(bottom) + BAND_PADDING))
+        for top, bottom in bands
+        if bottom - top >= MIN_BAND_HEIGHT
+    ]
+
+
+def _get_ocr_pool(workers: int) -> ThreadPoolExecutor:
+    global _ocr_pool, _ocr_pool_size
+    if _ocr_pool is None or _ocr_pool_size != workers:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False)
+        _ocr_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        _ocr_pool_size = workers
+    return _ocr_pool
+
+
+def _ocr_band(band: np.ndarray) -> str:
+    """
+    OCR one text line, using the band cache.
+    """
+    band = np.ascontiguousarray(band)
+    key = hashlib.sha1(band.tobytes()).hexdigest() + f":{band.shape[0]}x{band.shape[1]}"
+    with _band_cache_lock:
+        text = _band_cache.get(key)
+        if text is not None:
+            _band_cache.move_to_end(key)
+            ocr_stats["band_cache_hits"] += 1
+            return text
+
+    text = pytesseract.image_to_string(band, config="--psm 7").strip()
+
+    with _band_cache_lock:
+        _band_cache[key] = text
+        while len(_band_cache) > OCR_BAND_CACHE_SIZE:
+            _band_cache.popitem(last=False)
+        ocr_stats["bands"] += 1
+    return text
+
+
+def ocr_text_lines(image: np.ndarray, workers: int = None) -> list:
+    """
+    OCR every text band of `image` in parallel. Returns one string per band,
+    top to bottom. Falls back to a single page-level call if no bands are found.
+    """
+    if workers is None:
+        workers = OCR_WORKERS
+    bands = find_text_bands(image)
+    if not bands:
+        return ocr_page_lines(image)
+
+    crops = [image[top:bottom] for top, bottom in bands]
+    if workers <= 1 or len(crops) == 1:
+        texts = [_ocr_band(crop) for crop in crops]
+    else:
+        texts = list(_get_ocr_pool(workers).map(_ocr_band, crops))
+    return [text for text in texts if text]
+
+
+def ocr_page_lines(image: np.ndarray) -> list:
+    """
+    The original single-call OCR of the whole page.
+    """
+    ocr_stats["pages"] += 1
+    extracted_text = pytesseract.image_to_string(image, config="--psm 6")
+    return extracted_text.strip().split("\n")
+
+
+def ocr_stats_snapshot() -> dict:
+    with _band_cache_lock:
+        stats = dict(ocr_stats)
+        stats["band_cache_entries"] = len(_band_cache)
+    return stats
+
+
+def clear_band_cache():
+    with _band_cache_lock:
+        _band_cache.clear()
@@ -1,13 +1,18 @@
 # parse_statement.py
 
-import pdfplumber
 import pandas as pd
-import cv2
-import pytesseract
 import numpy as np
 import re
 import os
-from PIL import Image
+import io
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+from app import pdf_layout
+
+# pdfplumber (PDFs) and OpenCV + Tesseract (images, app/ocr.py) are imported by the
+# functions that need them, so importing this module stays cheap for the API process
+# and a worker only loads the stack for the file types it actually parses.
 
 # Define patterns / lookups
 TRANSACTION_TYPES = {"purchase", "refund", "withdrawal", "payment", "credit", "debit"}
@@ -19,73 +24,254 @@ CURRENCY_ALIASES = {
     # Add more if needed
 }
 
-def extract_transactions_from_table_pdf(pdf_path: str) -> pd.DataFrame:
+# Active ISO 4217 codes accepted in the currency position of an OCR'd line
+ISO_CURRENCY_CODES = frozenset("""
+    AED AFN ALL AMD ANG AOA ARS AUD AWG AZN BAM BBD BDT BGN BHD BIF BMD BND BOB BRL
+    BSD BTN BWP BYN BZD CAD CDF CHF CLP CNY COP CRC CUP CVE CZK DJF DKK DOP DZD EGP
+    ERN ETB EUR FJD FKP GBP GEL GHS GIP GMD GNF GTQ GYD HKD HNL HTG HUF IDR ILS INR
+    IQD IRR ISK JMD JOD JPY KES KGS KHR KMF KPW KRW KWD KYD KZT LAK LBP LKR LRD LSL
+    LYD MAD MDL MGA MKD MMK MNT MOP MRU MUR MVR MWK MXN MYR MZN NAD NGN NIO NOK NPR
+    NZD OMR PAB PEN PGK PHP PKR PLN PYG QAR RON RSD RUB RWF SAR SBD SCR SDG SEK SGD
+    SHP SLE SOS SRD SSP STN SVC SYP SZL THB TJS TMT TND TOP TRY TTD TWD TZS UAH UGX
+    USD UYU UZS VES VND VUV WST XAF XCD XOF XPF YER ZAR ZMW ZWL
+""".split())
+
+# OCR line cleanup in one pass: "|" and "," => space, currency aliases => ISO code
+_OCR_CLEANUP_RE = re.compile(
+    r"[\|,]|" + "|".join(re.escape(alias) for alias in sorted(CURRENCY_ALIASES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+_NON_WORD_RE = re.compile(r"[^\w]")
+_SPURIOUS_TOKENS = frozenset(("-", "|"))
+
+# Page-parallel PDF extraction (PDF_PAGE_WORKERS=1 => serial)
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", "1"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+# Max rows per chunk yielded by iter_statement
+STATEMENT_CHUNK_ROWS = int(os.getenv("STATEMENT_CHUNK_ROWS", "500"))
+_page_pool = None
+_page_pool_size = 0
+
+
+def _describe_source(source) -> str:
     """
-    Extract transactions from a tabular PDF using pdfplumber.
-    Expects columns: Date, Merchant, Category, Amount, Currency, Transaction Type
+    Short name of a statement source for log messages.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return str(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes in memory>"
+    return f"<{type(source).__name__}>"
+
+
+def _as_pdf_input(source):
     """
+    pdfplumber.open accepts a path or a binary stream; wrap raw bytes in a stream.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    return source
+
+
+def _read_image(source):
+    """
+    Decode an image from a path, raw bytes or a binary file-like object.
+    Returns None if it cannot be decoded.
+    """
+    import cv2
+
+    if isinstance(source, (str, os.PathLike)):
+        return cv2.imread(str(source))
+    if not isinstance(source, (bytes, bytearray, memoryview)):
+        source = source.read()
+    return cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def _rows_from_pdf_page(page, layout_state: dict = None) -> list:
+    """
+    Extract the transaction rows of a single pdfplumber page.
+    With layout_state (one dict per document), try the text-layer fast path first
+    and only run table detection when it does not fit (see app/pdf_layout.py).
+    """
+    if layout_state is not None:
+        rows = pdf_layout.extract_rows(page, layout_state)
+        if rows is not None:
+            return _transactions_from_tables([rows])
+        found = page.find_tables()
+        pdf_layout.learn_from_tables(found, layout_state)
+        tables = [table.extract() for table in found]
+    else:
+        tables = page.extract_tables()
+    return _transactions_from_tables(tables)
+
+
+def _transactions_from_tables(tables: list) -> list:
+    """
+    Turn extracted table rows (lists of cell strings) into transaction dicts.
+    """
+    transactions = []
+    for table in tables:
+        # Each table is a list of rows, where each row is a list of string cells
+        for row in table:
+            if len(row) < 6:
+                continue
+            # Skip potential header row
+            if row[0].strip().lower() == "date" or row[3].strip().lower() == "amount":
+                continue
+            try:
+                date_str = row[0].strip()
+                merchant_str = row[1].strip()
+                category_str = row[2].strip()
+                raw_amount = row[3].strip().replace(",", "")
+                amount_val = float(raw_amount)
+                currency_str = row[4].strip()
+                transaction_type_str = row[5].strip()
+
+                transactions.append({
+                    "Date": date_str,
+                    "Merchant": merchant_str,
+                    "Category": category_str,
+                    "Amount": amount_val,
+                    "Currency": currency_str,
+                    "Type": transaction_type_str
+                })
+            except Exception as e:
+                print(f"[WARN] Skipped row in PDF parse due to error: {e} => {row}")
+    return transactions
+
+
+def _extract_pdf_page_range(pdf_source, start: int, stop: int, fast_path: bool = False) -> list:
+    """
+    Page-pool task: open the document independently and extract pages [start, stop).
+    """
+    import pdfplumber
+
     transactions = []
+    layout_state = {} if fast_path else None
+    with pdfplumber.open(_as_pdf_input(pdf_source)) as pdf:
+        for page in pdf.pages[start:stop]:
+            transactions.extend(_rows_from_pdf_page(page, layout_state))
+    return transactions
+
+
+def _get_page_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for page-parallel extraction, created on first use (one per process).
+    """
+    global _page_pool, _page_pool_size
+    if _page_pool is None or _page_pool_size != workers:
+        if _page_pool is not None:
+            _page_pool.shutdown(wait=False)
+        _page_pool = ProcessPoolExecutor(max_workers=workers)
+        _page_pool_size = workers
+    return _page_pool
+
+
+def _iter_pdf_pages_parallel(pdf_source, pages_total: int, workers: int, progress=None,
+                             fast_path: bool = False):
+    """
+    Fan page ranges out to the page pool and yield their rows back in page order
+    (one list per range) as soon as each range is done.
+    """
+    pool = _get_page_pool(workers)
+    # Small enough ranges that every worker gets some, capped at PDF_PAGES_PER_TASK
+    pages_per_task = max(1, min(PDF_PAGES_PER_TASK, math.ceil(pages_total / workers)))
+    ranges = [
+        (start, min(start + pages_per_task, pages_total))
+        for start in range(0, pages_total, pages_per_task)
+    ]
+    futures = [
+        pool.submit(_extract_pdf_page_range, pdf_source, start, stop, fast_path)
+        for start, stop in ranges
+    ]
+
+    for future, (start, stop) in zip(futures, ranges):
+        rows = future.result()
+        if progress is not None:
+            progress(stop, pages_total)
+        yield rows
+
+
+def iter_pdf_transaction_pages(pdf_path, progress=None, page_workers: int = None, fast_path: bool = None):
+    """
+    Generator version of extract_transactions_from_table_pdf: yields one list of
+    transaction dicts per page (per page range in page-parallel mode), in page order.
+    """
+    import pdfplumber
+
+    if page_workers is None:
+        page_workers = PDF_PAGE_WORKERS
+    if fast_path is None:
+        fast_path = pdf_layout.PDF_FAST_PATH
+
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                for table in tables:
-                    # Each table is a list of rows, where each row is a list of string cells
-                    for row in table:
-                        if len(row) < 6:
-                            continue
-                        # Skip potential header row
-                        if row[0].strip().lower() == "date" or row[3].strip().lower() == "amount":
-                            continue
-                        try:
-                            date_str = row[0].strip()
-                            merchant_str = row[1].strip()
-                            category_str = row[2].strip()
-                            raw_amount = row[3].strip().replace(",", "")
-                            amount_val = float(raw_amount)
-                            currency_str = row[4].strip()
-                            transaction_type_str = row[5].strip()
-
-                            transactions.append({
-                                "Date": date_str,
-                                "Merchant": merchant_str,
-                                "Category": category_str,
-                                "Amount": amount_val,
-                                "Currency": currency_str,
-                                "Type": transaction_type_str
-                            })
-                        except Exception as e:
-                            print(f"[WARN] Skipped row in PDF parse due to error: {e} => {row}")
+        # Workers need something picklable to open the document from
+        if page_workers > 1 and not isinstance(pdf_path, (str, os.PathLike, bytes, bytearray)):
+            pdf_path = pdf_path.read()
+
+        with pdfplumber.open(_as_pdf_input(pdf_path)) as pdf:
+            pages_total = len(pdf.pages)
+            parallel = page_workers > 1 and pages_total >= PDF_PARALLEL_MIN_PAGES
+            if not parallel:
+                layout_state = {} if fast_path else None
+                for page_number, page in enumerate(pdf.pages, start=1):
+                    rows = _rows_from_pdf_page(page, layout_state)
+                    if progress is not None:
+                        progress(page_number, pages_total)
+                    yield rows
+
+        if parallel:
+            yield from _iter_pdf_pages_parallel(pdf_path, pages_total, page_workers, progress, fast_path)
     except Exception as e:
-        print(f"[ERROR] Failed to process PDF at {pdf_path}: {e}")
+        print(f"[ERROR] Failed to process PDF at {_describe_source(pdf_path)}: {e}")
 
+
+def extract_transactions_from_table_pdf(pdf_path, progress=None, page_workers: int = None,
+                                        fast_path: bool = None) -> pd.DataFrame:
+    """
+    Extract transactions from a tabular PDF using pdfplumber.
+    Expects columns: Date, Merchant, Category, Amount, Currency, Transaction Type
+    pdf_path may be a path, raw bytes or a binary file-like object.
+    If given, progress(pages_parsed, pages_total) is called as pages complete.
+    With page_workers > 1 (default PDF_PAGE_WORKERS), documents of at least
+    PDF_PARALLEL_MIN_PAGES pages are split into page ranges extracted in parallel.
+    With fast_path (default PDF_FAST_PATH), pages are cut into columns from their
+    words using cached layout templates, falling back to extract_tables().
+    """
+    transactions = []
+    for rows in iter_pdf_transaction_pages(pdf_path, progress, page_workers, fast_path):
+        transactions.extend(rows)
     return pd.DataFrame(transactions)
 
 
-def extract_transactions_from_image(image_path: str) -> pd.DataFrame:
+def iter_image_transactions(image_path, progress=None):
     """
-    Extract transactions from an image of a statement using OpenCV + Tesseract.
-    We use a more flexible approach:
-      1) Use morphological ops + threshold to isolate text.
-      2) OCR the text line by line.
-      3) For each line, attempt to find date, transaction type, currency, and amount.
-      4) Whatever remains in the middle is merchant/category.
+    Generator version of extract_transactions_from_image: yields one transaction
+    dict per parsed OCR line.
     """
-    transactions = []
+    import cv2
+    from app import ocr
+
     try:
-        img = cv2.imread(image_path)
+        img = _read_image(image_path)
         if img is None:
-            print(f"[ERROR] Unable to read image: {image_path}")
-            return pd.DataFrame()
+            print(f"[ERROR] Unable to read image: {_describe_source(image_path)}")
+            return
 
         # Convert to grayscale
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-        # Thresholding (inverse)
-        # If lighting is inconsistent, consider using adaptive thresholding:
-        # table_structure = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        #                                         cv2.THRESH_BINARY_INV, 11, 2)
-        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
+        if ocr.OCR_MODE == "bands":
+            # Downscale to OCR_TARGET_DPI, threshold (inverse) and deskew
+            gray, binary = ocr.prepare_image(gray)
+        else:
+            # Thresholding (inverse)
+            # If lighting is inconsistent, consider using adaptive thresholding:
+            # table_structure = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            #                                         cv2.THRESH_BINARY_INV, 11, 2)
+            _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
 
         # Detect horizontal lines
         kernel = np.ones((1, 50), np.uint8)
@@ -94,140 +280,147 @@ def extract_transactions_from_image(image_path: str) -> pd.DataFrame:
         # Subtract lines => table_structure
         table_structure = cv2.subtract(binary, horizontal_lines)
 
-        # OCR
-        extracted_text = pytesseract.image_to_string(table_structure, config="--psm 6")
-        rows = extracted_text.strip().split("\n")
-
-        for row in rows:
-            row_clean = re.sub(r"[\|,]", " ", row).strip()
-            # Normalize common currency OCR mistakes (usp->USD, usb->USD, etc.)
-            for bad_cur, good_cur in CURRENCY_ALIASES.items():
-                # case-insensitive replace
-                row_clean = re.sub(bad_cur, good_cur, row_clean, flags=re.IGNORECASE)
+        # OCR: one call per text band (in parallel, cached) or one call for the page
+        if ocr.OCR_MODE == "bands":
+            rows = ocr.ocr_text_lines(table_structure)
+        else:
+            rows = ocr.ocr_page_lines(table_structure)
 
-            # Split on whitespace
-            tokens = re.split(r"\s+", row_clean)
+        if progress is not None:
+            progress(1, 1)
 
-            # Attempt to parse using a pattern-based approach
-            parsed = parse_ocr_line(tokens)
+        for row in rows:
+            parsed = parse_ocr_text_line(row)
             if parsed is not None:
-                transactions.append(parsed)
-            # else we skip the row (and might see a [WARN] in parse_ocr_line)
+                yield parsed
     except Exception as ex:
-        print(f"[ERROR] Failed to process image {image_path}: {ex}")
+        print(f"[ERROR] Failed to process image {_describe_source(image_path)}: {ex}")
 
-    return pd.DataFrame(transactions)
 
+def extract_transactions_from_image(image_path, progress=None) -> pd.DataFrame:
+    """
+    Extract transactions from an image of a statement using OpenCV + Tesseract.
+    We use a more flexible approach:
+      1) Use morphological ops + threshold to isolate text
+         (in OCR_MODE=bands, after downscaling to OCR_TARGET_DPI and deskewing).
+      2) OCR the text line by line (app/ocr.py: one tesseract call per text band,
+         run in parallel and cached, or one call for the page in OCR_MODE=page).
+      3) For each line, attempt to find date, transaction type, currency, and amount.
+      4) Whatever remains in the middle is merchant/category.
+    image_path may be a path, raw bytes or a binary file-like object.
+    If given, progress(1, 1) is called once the image has been OCR'd.
+    """
+    return pd.DataFrame(list(iter_image_transactions(image_path, progress)))
 
-def parse_ocr_line(tokens):
+
+def _clean_ocr_match(match) -> str:
+    text = match.group(0)
+    if text in ("|", ","):
+        return " "
+    return CURRENCY_ALIASES[text.lower()]
+
+
+def tokenize_ocr_line(line: str) -> list:
     """
-    Given a list of tokens from one OCR'd line, attempt to extract:
-      - Date (YYYY-MM-DD) near the start
-      - Transaction Type (purchase/refund/withdrawal, etc.) near the end
-      - Currency (USD, etc.) near the end
-      - Amount (float) near the currency
-      - Everything else becomes Merchant/Category
-    If we can't parse correctly, return None.
+    Clean one OCR'd line ("|" and "," => space, currency aliases like usp/usb => USD)
+    with a single precompiled regex and split it on whitespace.
     """
+    return _OCR_CLEANUP_RE.sub(_clean_ocr_match, line).split()
 
-    # Filter out obviously spurious tokens like '-' or '|' if they remain
-    tokens = [t for t in tokens if t not in ("-", "|")]
 
-    if len(tokens) < 5:
-        return None
+def _transaction_type_index(tokens: list) -> int:
+    """
+    Index of the right-most token naming a transaction type
+    (punctuation ignored, case-insensitive), or -1.
+    """
+    for i in range(len(tokens) - 1, 0, -1):
+        word = tokens[i].lower()
+        if word in TRANSACTION_TYPES or _NON_WORD_RE.sub("", word) in TRANSACTION_TYPES:
+            return i
+    return -1
 
-    # 1) Identify date near the front (we look for a pattern like YYYY-MM-DD)
-    date_str = None
-    if re.match(r"^\d{4}-\d{2}-\d{2}$", tokens[0]):
-        date_str = tokens[0]
-        idx_start_merchant = 1
-    else:
-        # If the first token isn't a date, skip (or you can try searching further)
-        return None
 
-    # 2) Identify transaction type near the end
-    # We'll search from the right for a known transaction type
-    tx_type_idx = -1
-    transaction_type_str = None
-    for i in range(len(tokens)-1, -1, -1):
-        maybe_type = re.sub(r"[^\w]", "", tokens[i].lower())  # remove punctuation, make lower
-        if maybe_type in TRANSACTION_TYPES:
-            transaction_type_str = tokens[i]
-            tx_type_idx = i
-            break
-    if not transaction_type_str:
-        # No recognized transaction type => skip
+def parse_ocr_line(tokens):
+    """
+    Given a list of tokens from one OCR'd line, attempt to extract:
+      - Date (YYYY-MM-DD) as the first token
+      - Transaction Type (purchase/refund/withdrawal, etc.): the right-most known type
+      - Currency (ISO 4217 code, e.g. USD/EUR) just left of the type
+      - Amount (float) just left of the currency
+      - The token before the amount is the Category, everything else the Merchant
+    If we can't parse correctly, return None.
+    """
+    # Filter out obviously spurious tokens like '-' or '|' if they remain
+    tokens = [t for t in tokens if t not in _SPURIOUS_TOKENS]
+    if len(tokens) < 5 or not _DATE_RE.fullmatch(tokens[0]):
         return None
 
-    # 3) Identify currency near the type (e.g., the token to the left might be "USD")
-    currency_idx = tx_type_idx - 1
-    if currency_idx < 1:
+    tx_type_idx = _transaction_type_index(tokens)
+    # Currency and amount must sit between the date and the type
+    if tx_type_idx < 3:
         return None
-    currency_str = tokens[currency_idx].upper()
 
-    # If for some reason it's not recognized, you could skip or assume "USD"
-    # We'll just accept anything as a currency token if it matches "USD" or similar.
-    if currency_str not in ("USD",):
-        # If you want to accept "usd" or other currency codes, add them here:
-        # or do a more flexible check => if re.match(r"^[A-Za-z]{3}$", currency_str)
+    currency_str = tokens[tx_type_idx - 1].upper()
+    if currency_str not in ISO_CURRENCY_CODES:
         return None
 
-    # 4) Identify amount near the currency (one token to the left)
-    amount_idx = currency_idx - 1
-    if amount_idx < 1:
-        return None
-    amount_str = tokens[amount_idx].replace(",", "")
+    amount_idx = tx_type_idx - 2
     try:
-        amount_val = float(amount_str)
+        amount_val = float(tokens[amount_idx].replace(",", ""))
     except ValueError:
         return None
 
-    # 5) Next token to the left is presumably the category (optional).
-    # This is a guess. You could skip if you want to treat everything in the middle as merchant & category combined.
-    category_idx = amount_idx - 1
-
-    # If we run out of tokens, we skip
-    if category_idx < idx_start_merchant:
-        # We have no category => let's assume we skip it or treat it as "misc"
+    if amount_idx == 1:
+        # No room for a category (or merchant)
         category_str = "misc"
-        idx_end_merchant = amount_idx  # merchant from [1 .. amount_idx-1]
+        idx_end_merchant = amount_idx
     else:
-        category_str = tokens[category_idx]
-        idx_end_merchant = category_idx
-
-    # 6) Merchant tokens are in between the date and the category
-    merchant_tokens = tokens[idx_start_merchant:idx_end_merchant]
-    merchant_str = " ".join(merchant_tokens)
+        category_str = tokens[amount_idx - 1]
+        idx_end_merchant = amount_idx - 1
 
-    # Build a dict with the extracted info
-    parsed_line = {
-        "Date": date_str,
-        "Merchant": merchant_str,
+    return {
+        "Date": tokens[0],
+        "Merchant": " ".join(tokens[1:idx_end_merchant]),
         "Category": category_str,
         "Amount": amount_val,
         "Currency": currency_str,
-        "Type": transaction_type_str
+        "Type": tokens[tx_type_idx],
     }
 
-    return parsed_line
 
+def parse_ocr_text_line(line: str):
+    """
+    tokenize_ocr_line + parse_ocr_line for one raw OCR'd line.
+    """
+    return parse_ocr_line(tokenize_ocr_line(line))
+
+
+def _statement_type(file_path, file_type: str = None) -> str:
+    if file_type is not None:
+        return file_type.lower()
+    return os.path.splitext(str(file_path))[1].lower()
 
-def parse_statement(file_path: str) -> pd.DataFrame:
+
+def iter_transaction_pages(file_path, progress=None, file_type: str = None):
     """
-    1) Decide if file is PDF or Image based on extension.
-    2) Parse transactions into a DataFrame with columns:
-       Date, Merchant, Category, Amount, Currency, Type
-    3) Rename columns to match the training set:
-       trans_date_trans_time, merchant, category, amt, currency, transaction_type
-    4) Add placeholder columns for hour, day_of_week, city_pop, distance, gender, state
-       so that we can pass them into the same pipeline that was trained on CSV data.
+    Yield raw transaction dicts (Date, Merchant, Category, Amount, Currency, Type)
+    page by page: one list per PDF page, a single list for an image.
     """
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == ".pdf":
-        df = extract_transactions_from_table_pdf(file_path)
+    if _statement_type(file_path, file_type) == ".pdf":
+        yield from iter_pdf_transaction_pages(file_path, progress=progress)
     else:
-        df = extract_transactions_from_image(file_path)
+        rows = list(iter_image_transactions(file_path, progress=progress))
+        if rows:
+            yield rows
+
 
+def normalize_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    1) Rename columns to match the training set:
+       trans_date_trans_time, merchant, category, amt, currency, transaction_type
+    2) Add placeholder columns for hour, day_of_week, city_pop, distance, gender, state
+       so that we can pass them into the same pipeline that was trained on CSV data.
+    """
     if df.empty:
         return df  # no rows => return empty DataFrame
 
@@ -263,3 +456,33 @@ def parse_statement(file_path: str) -> pd.DataFrame:
         df["state"] = "XX"
 
     return df
+
+
+def iter_statement(file_path, progress=None, file_type: str = None, chunk_size: int = None):
+    """
+    Streaming variant of parse_statement: yields normalized DataFrame chunks
+    (same columns as parse_statement) page by page, each at most chunk_size rows
+    (default STATEMENT_CHUNK_ROWS). Pages without transactions yield nothing.
+    """
+    if chunk_size is None:
+        chunk_size = STATEMENT_CHUNK_ROWS
+    for rows in iter_transaction_pages(file_path, progress=progress, file_type=file_type):
+        for start in range(0, len(rows), chunk_size):
+            yield normalize_transactions(pd.DataFrame(rows[start:start + chunk_size]))
+
+
+def parse_statement(file_path, progress=None, file_type: str = None) -> pd.DataFrame:
+    """
+    1) Decide if file is PDF or Image based on extension.
+       file_path may also be raw bytes or a binary file-like object; then pass
+       file_type (the original extension, e.g. ".pdf").
+    2) Parse transactions into a DataFrame with columns:
+       Date, Merchant, Category, Amount, Currency, Type
+    3) Normalize it for the model (see normalize_transactions).
+    progress(pages_parsed, pages_total) is forwarded to the extractor.
+    Thin wrapper over iter_transaction_pages; use iter_statement to stream.
+    """
+    transactions = []
+    for rows in iter_transaction_pages(file_path, progress=progress, file_type=file_type):
+        transactions.extend(rows)
+    return normalize_transactions(pd.DataFrame(transactions))
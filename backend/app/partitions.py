@@ -0,0 +1,610 @@
+# backend/app/partitions.py
+"""
+Time partitioning and retention of the transactions table.
+
+Rows are partitioned by the month of created_at, i.e. when they were stored (a
+statement's own dates can be years old or unreadable, and retention is about how
+long we keep what we stored), so new rows always go to the current month:
+  - PostgreSQL (TRANSACTION_PARTITIONING=1): `transactions` is a native RANGE
+    partitioned table with one partition per month (transactions_pYYYYMM), created
+    TRANSACTION_PARTITIONS_AHEAD months ahead, plus a DEFAULT partition for rows
+    outside them. Each partition has its own (small) indexes, and removing a month
+    is DETACH + DROP TABLE instead of a DELETE that leaves dead rows to vacuum.
+  - Other databases (SQLite, tests) keep one plain table; a month is the range of
+    rows on ix_transactions_created_at and is removed with a DELETE.
+
+Retention (TRANSACTION_RETENTION_MONTHS, 0 => keep everything): months that ended
+more than that many months ago are dropped, or archived first
+(TRANSACTION_RETENTION_ACTION=archive) to one compressed columnar file per month in
+TRANSACTION_ARCHIVE_DIR: parquet (zstd, needs pyarrow) or numpy .npz (read back
+with read_archive).
+
+PartitionMaintainer creates upcoming partitions and applies retention every
+TRANSACTION_MAINTENANCE_SECONDS in the API (one replica at a time, via an advisory
+lock). Run once from backend/:
+    python -m app.partitions [--dry-run]
+An existing PostgreSQL table is converted with `python -m app.migrate --partition`.
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Boolean, Column, MetaData, Table, delete, func, inspect, select, text
+
+from app.database import engine
+from app.models import Transaction, TransactionFingerprint
+
+# 1 => on PostgreSQL, create `transactions` partitioned by month (a new table only;
+# convert an existing one with `python -m app.migrate --partition`)
+TRANSACTION_PARTITIONING = os.getenv("TRANSACTION_PARTITIONING", "1") == "1"
+# Monthly partitions created ahead of time
+TRANSACTION_PARTITIONS_AHEAD = int(os.getenv("TRANSACTION_PARTITIONS_AHEAD", "2"))
+# Months of transactions kept (0 => keep everything)
+TRANSACTION_RETENTION_MONTHS = int(os.getenv("TRANSACTION_RETENTION_MONTHS", "0"))
+# archive => write expired months to TRANSACTION_ARCHIVE_DIR, then drop them; drop => only drop
+TRANSACTION_RETENTION_ACTION = os.getenv("TRANSACTION_RETENTION_ACTION", "archive")
+TRANSACTION_ARCHIVE_DIR = os.getenv("TRANSACTION_ARCHIVE_DIR", "archive/transactions")
+# parquet (needs pyarrow) | npz
+TRANSACTION_ARCHIVE_FORMAT = os.getenv("TRANSACTION_ARCHIVE_FORMAT", "parquet")
+TRANSACTION_ARCHIVE_BATCH_ROWS = int(os.getenv("TRANSACTION_ARCHIVE_BATCH_ROWS", "50000"))
+TRANSACTION_MAINTENANCE_SECONDS = float(os.getenv("TRANSACTION_MAINTENANCE_SECONDS", "3600"))
+
+TABLE = Transaction.__table__.name
+PARTITION_KEY = "created_at"
+DEFAULT_PARTITION = f"{TABLE}_default"
+RETENTION_ACTIONS = ("archive", "drop")
+# pg_try_advisory_lock key of the maintenance run
+_LOCK_KEY = 0x7472616E73  # "trans"
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def partition_month(name: str):
+    """
+    Month of a transactions_pYYYYMM partition (None for other tables).
+    """
+    prefix = f"{TABLE}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m")
+    except ValueError:
+        return None
+
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def is_partitioned(bind) -> bool:
+    if not _is_postgres(bind):
+        return False
+    with bind.connect() as conn:
+        return bool(conn.execute(
+            text("SELECT count(*) FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": TABLE},
+        ).scalar())
+
+
+def partitioned_table() -> Table:
+    """
+    The transactions table as a partitioned table: created_at becomes NOT NULL and
+    part of the primary key (PostgreSQL requires the partition key in every unique
+    constraint); ids still come from one sequence.
+    """
+    columns = [
+        Column(
+            column.name, column.type,
+            primary_key=column.name in ("id", PARTITION_KEY),
+            autoincrement=column.name == "id",
+            nullable=column.nullable and column.name != PARTITION_KEY,
+        )
+        for column in Transaction.__table__.columns
+    ]
+    return Table(TABLE, MetaData(), *columns, postgresql_partition_by=f"RANGE ({PARTITION_KEY})")
+
+
+def create_transactions_table(bind=None) -> bool:
+    """
+    At start-up, before create_all: on PostgreSQL with TRANSACTION_PARTITIONING,
+    create a missing transactions table partitioned (with its indexes and the
+    partitions of the coming months). Returns True if it did.
+    """
+    bind = bind if bind is not None else engine
+    if not TRANSACTION_PARTITIONING or not _is_postgres(bind) or inspect(bind).has_table(TABLE):
+        return False
+    with bind.begin() as conn:
+        create_partitioned_table(conn)
+    print(f"[partitions] Created {TABLE} partitioned by month of {PARTITION_KEY}")
+    return True
+
+
+def create_partitioned_table(conn, first: datetime = None):
+    partitioned_table().create(bind=conn)
+    ensure_partitions(conn, first=first)
+    for index in Transaction.__table__.indexes:
+        index.create(bind=conn)
+
+
+def ensure_partitions(conn, first: datetime = None, now: datetime = None,
+                      ahead: int = TRANSACTION_PARTITIONS_AHEAD) -> list:
+    """
+    Create the monthly partitions from `first` (default: this month) to `ahead`
+    months after this one, and the DEFAULT partition. Returns the names created.
+    A month the DEFAULT partition already holds rows of (maintenance stopped for
+    longer than `ahead` months, or rows copied by convert_to_partitioned) gets
+    them moved into its new partition (_split_default); if that fails the month
+    is skipped, so the other months and retention still run.
+    """
+    current = month_start(now or datetime.utcnow())
+    month = month_start(first) if first is not None and first < current else current
+    existing = set(_attached_partitions(conn))
+    created = []
+    while month <= add_months(current, ahead):
+        name = partition_name(month)
+        if name not in existing:
+            bounds = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+            if DEFAULT_PARTITION in existing and _default_has_rows(conn, month):
+                try:
+                    with conn.begin_nested():
+                        moved = _split_default(conn, month, name, bounds)
+                    print(f"[partitions] Moved {moved} rows of {month:%Y-%m} from {DEFAULT_PARTITION} to {name}")
+                    created.append(name)
+                except Exception as e:
+                    print(f"[partitions] Skipped {name}, could not move its rows out of {DEFAULT_PARTITION}: "
+                          f"{str(e).splitlines()[0]}")
+            else:
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} {bounds}"))
+                created.append(name)
+        month = add_months(month, 1)
+    if DEFAULT_PARTITION not in existing:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+        created.append(DEFAULT_PARTITION)
+    return created
+
+
+def _default_has_rows(conn, month: datetime) -> bool:
+    return conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+             f"WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end)"),
+        {"start": month, "end": add_months(month, 1)},
+    ).scalar()
+
+
+def _split_default(conn, month: datetime, name: str, bounds: str) -> int:
+    """
+    PostgreSQL refuses a partition whose range the DEFAULT partition has rows in:
+    detach DEFAULT, create the month's partition, move the rows over and attach
+    DEFAULT again (in the caller's transaction). Returns the rows moved.
+    """
+    columns = ", ".join(column.name for column in Transaction.__table__.columns)
+    params = {"start": month, "end": add_months(month, 1)}
+    where = f"{PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end"
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}"))
+    moved = conn.execute(
+        text(f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} WHERE {where}"), params,
+    ).rowcount
+    conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {where}"), params)
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return moved
+
+
+def _attached_partitions(conn) -> dict:
+    """
+    {partition name: live rows (statistics collector estimate)} of the PostgreSQL
+    partitioned table.
+    """
+    rows = conn.execute(text(
+        "SELECT c.relname, coalesce(s.n_live_tup, 0) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": TABLE}).all()
+    return {name: int(estimate) for name, estimate in rows}
+
+
+def _detached_partitions(conn) -> list:
+    """
+    transactions_pYYYYMM tables no longer attached: detached for archiving by a run
+    that did not finish.
+    """
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_class c WHERE c.relkind = 'r' AND c.relname LIKE :pattern "
+        "AND c.relnamespace = current_schema()::regnamespace AND NOT c.relispartition"
+    ), {"pattern": f"{TABLE}\\_p%"}).scalars().all()
+    return sorted(name for name in names if partition_month(name) is not None)
+
+
+def list_partitions(bind=None) -> list:
+    """
+    One entry per stored month, oldest first: {"month", "table", "rows"}. On
+    PostgreSQL "table" is the partition and "rows" an estimate; elsewhere
+    the month is a range of the one table and "rows" is exact.
+    """
+    bind = bind if bind is not None else engine
+    with bind.connect() as conn:
+        if is_partitioned(bind):
+            partitions = [
+                {"month": f"{partition_month(name):%Y-%m}", "table": name, "rows": rows}
+                for name, rows in _attached_partitions(conn).items() if partition_month(name) is not None
+            ]
+            return sorted(partitions, key=lambda partition: partition["month"])
+        if _is_postgres(bind):
+            month_key = func.to_char(Transaction.created_at, "YYYY-MM")
+        else:
+            month_key = func.strftime("%Y-%m", Transaction.created_at)
+        month_key = month_key.label("month")
+        rows = conn.execute(
+            select(month_key, func.count())
+            .where(Transaction.created_at.is_not(None))
+            .group_by(month_key)
+            .order_by(month_key)
+        ).all()
+        return [{"month": month, "table": TABLE, "rows": count} for month, count in rows]
+
+
+def expired_months(partitions: list, now: datetime = None, retention_months: int = TRANSACTION_RETENTION_MONTHS) -> list:
+    """
+    Months (as datetimes) of `partitions` that ended more than retention_months ago.
+    """
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.utcnow()), -retention_months)
+    months = [datetime.strptime(partition["month"], "%Y-%m") for partition in partitions]
+    return sorted(month for month in set(months) if month < cutoff)
+
+
+def _archive_frame(rows: list, columns: list) -> pd.DataFrame:
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for column in Transaction.__table__.columns:
+        if column.name in ("occurred_at", "labeled_at", PARTITION_KEY):
+            frame[column.name] = pd.to_datetime(frame[column.name])
+        elif isinstance(column.type, Boolean):
+            frame[column.name] = frame[column.name].astype("boolean")
+    return frame
+
+
+def _write_npz(frames: list, path: str):
+    """
+    One array per column (np.savez_compressed); booleans and strings (fixed-width
+    unicode) with a <column>__null mask, so nothing needs pickling.
+    """
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    arrays = {}
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            arrays[name] = values.to_numpy(dtype="datetime64[us]")
+        elif pd.api.types.is_bool_dtype(values):
+            arrays[f"{name}__null"] = values.isna().to_numpy(dtype=bool)
+            arrays[name] = values.fillna(False).to_numpy(dtype=bool)
+        elif pd.api.types.is_integer_dtype(values):
+            arrays[name] = values.to_numpy(dtype=np.int64)
+        elif pd.api.types.is_numeric_dtype(values):
+            arrays[name] = values.to_numpy(dtype=float)
+        else:
+            arrays[f"{name}__null"] = values.isna().to_numpy(dtype=bool)
+            arrays[name] = values.fillna("").astype(str).to_numpy(dtype=str)
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+def read_archive(path: str) -> pd.DataFrame:
+    """
+    An archived month as a DataFrame (parquet or .npz).
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    with np.load(path, allow_pickle=False) as arrays:
+        columns = {}
+        for name in arrays.files:
+            if name.endswith("__null"):
+                continue
+            values = arrays[name]
+            if f"{name}__null" in arrays.files:
+                values = pd.Series(values, dtype=object).where(~arrays[f"{name}__null"], None)
+            columns[name] = values
+        return pd.DataFrame(columns)
+
+
+def archive_month(conn, month: datetime, source: str = None, archive_dir: str = TRANSACTION_ARCHIVE_DIR,
+                  archive_format: str = TRANSACTION_ARCHIVE_FORMAT,
+                  batch_rows: int = TRANSACTION_ARCHIVE_BATCH_ROWS) -> dict:
+    """
+    Write a month of transactions to <archive_dir>/transactions_YYYY-MM.<format>,
+    reading it in id order, batch_rows at a time. `source` is its (detached)
+    partition; default: the month's range of the transactions table.
+    Returns {"path", "rows"}.
+    """
+    columns = [column.name for column in Transaction.__table__.columns]
+    if source is None:
+        source = TABLE
+        where = f"{PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end AND "
+    else:
+        where = ""
+    query = text(f"SELECT {', '.join(columns)} FROM {source} WHERE {where}id > :last ORDER BY id LIMIT :limit")
+    params = {"start": month, "end": add_months(month, 1), "limit": batch_rows}
+
+    if archive_format == "parquet":
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            print("[partitions] pyarrow is not installed, archiving as .npz")
+            archive_format = "npz"
+    elif archive_format != "npz":
+        raise ValueError(f"Unknown archive format {archive_format!r} (parquet | npz)")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{TABLE}_{month:%Y-%m}.{archive_format}")
+    tmp_path = f"{path}.tmp"
+    frames, writer, rows, last = [], None, 0, 0
+    try:
+        while True:
+            batch = conn.execute(query, {**params, "last": last}).all()
+            if not batch:
+                break
+            last = batch[-1].id
+            rows += len(batch)
+            frame = _archive_frame(batch, columns)
+            if archive_format == "npz":
+                frames.append(frame)
+                continue
+            table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table)
+        if archive_format == "npz":
+            _write_npz(frames, tmp_path)
+        elif writer is None:
+            pd.DataFrame(columns=columns).to_parquet(tmp_path, compression="zstd")
+        else:
+            writer.close()
+            writer = None
+        os.replace(tmp_path, path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": path, "rows": rows}
+
+
+def drop_month(conn, month: datetime, source: str = None) -> int:
+    """
+    Remove a month: DROP its detached partition (`source`), or DELETE its range of
+    the transactions table, with the month's dedup fingerprints (app/dedup.py).
+    Returns the rows deleted (None for a DROP).
+    """
+    conn.execute(
+        delete(TransactionFingerprint)
+        .where(TransactionFingerprint.created_at >= month, TransactionFingerprint.created_at < add_months(month, 1))
+    )
+    if source is not None:
+        conn.execute(text(f"DROP TABLE {source}"))
+        return None
+    return conn.execute(
+        text(f"DELETE FROM {TABLE} WHERE {PARTITION_KEY} >= :start AND {PARTITION_KEY} < :end"),
+        {"start": month, "end": add_months(month, 1)},
+    ).rowcount
+
+
+def apply_retention(bind=None, now: datetime = None, retention_months: int = TRANSACTION_RETENTION_MONTHS,
+                    action: str = TRANSACTION_RETENTION_ACTION, archive_dir: str = TRANSACTION_ARCHIVE_DIR,
+                    archive_format: str = TRANSACTION_ARCHIVE_FORMAT, dry_run: bool = False) -> dict:
+    """
+    Archive (action=archive) and drop the months older than retention_months, one
+    month per transaction. A partition is detached before it is archived, so a run
+    that stops half-way is finished by the next one.
+    Returns {"expired", "archived", "dropped", "rows_archived"}.
+    """
+    if action not in RETENTION_ACTIONS:
+        raise ValueError(f"Unknown retention action {action!r} (archive | drop)")
+    bind = bind if bind is not None else engine
+    partitioned = is_partitioned(bind)
+    months = expired_months(list_partitions(bind), now, retention_months)
+    leftovers = []
+    if partitioned:
+        with bind.connect() as conn:
+            leftovers = [(partition_month(name), name) for name in _detached_partitions(conn)]
+    result = {
+        "expired": [f"{month:%Y-%m}" for month in months],
+        "archived": [], "dropped": [], "rows_archived": 0,
+    }
+    if dry_run:
+        result["detached"] = [name for _, name in leftovers]
+        return result
+
+    work = leftovers + [(month, partition_name(month) if partitioned else None) for month in months]
+    for month, source in work:
+        if partitioned and (month, source) not in leftovers:
+            with bind.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {source}"))
+        with bind.begin() as conn:
+            if action == "archive":
+                archived = archive_month(conn, month, source, archive_dir, archive_format)
+                result["archived"].append(archived["path"])
+                result["rows_archived"] += archived["rows"]
+            drop_month(conn, month, source)
+        result["dropped"].append(f"{month:%Y-%m}")
+        print(f"[partitions] Removed transactions of {month:%Y-%m}"
+              + (f" (archived to {result['archived'][-1]})" if action == "archive" else ""))
+    return result
+
+
+def convert_to_partitioned(bind=None, batch_rows: int = TRANSACTION_ARCHIVE_BATCH_ROWS) -> dict:
+    """
+    PostgreSQL: replace an unpartitioned transactions table by a partitioned one
+    (run with the API stopped). The old table is renamed to
+    transactions_unpartitioned (with its indexes and id sequence), the new one gets
+    partitions from its oldest created_at, and rows are copied in id batches, each
+    in its own transaction (rows without created_at get the time of the copy).
+    Re-running resumes an interrupted copy. The old table is kept; drop it once
+    the copy is checked.
+    """
+    bind = bind if bind is not None else engine
+    if not _is_postgres(bind):
+        raise ValueError("Native partitioning needs PostgreSQL.")
+    legacy = f"{TABLE}_unpartitioned"
+    if not is_partitioned(bind):
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+            indexes = conn.execute(
+                text("SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()"),
+                {"table": legacy},
+            ).scalars().all()
+            for name in indexes:
+                conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:50]}_unpartitioned"'))
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": legacy}).scalar()
+            if sequence:
+                conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {legacy}_id_seq"))
+            first = conn.execute(text(f"SELECT min({PARTITION_KEY}) FROM {legacy}")).scalar()
+            create_partitioned_table(conn, first=first)
+            # New rows continue after the old ids
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), max(id)) FROM {legacy} "
+                f"HAVING max(id) IS NOT NULL"
+            ))
+        print(f"[partitions] Renamed {TABLE} to {legacy} and created the partitioned {TABLE}")
+    elif not inspect(bind).has_table(legacy):
+        return {"converted": False, "rows_copied": 0}
+
+    columns = ", ".join(column.name for column in Transaction.__table__.columns)
+    values = ", ".join(
+        f"coalesce({column.name}, :copied_at)" if column.name == PARTITION_KEY else column.name
+        for column in Transaction.__table__.columns
+    )
+    with bind.connect() as conn:
+        last_id = conn.execute(text(f"SELECT coalesce(max(id), 0) FROM {legacy}")).scalar()
+        copied = conn.execute(
+            text(f"SELECT coalesce(max(id), 0) FROM {TABLE} WHERE id <= :last_id"), {"last_id": last_id},
+        ).scalar()
+    rows = 0
+    copied_at = datetime.utcnow()
+    while copied < last_id:
+        upper = copied + batch_rows
+        with bind.begin() as conn:
+            rows += conn.execute(
+                text(f"INSERT INTO {TABLE} ({columns}) SELECT {values} FROM {legacy} "
+                     f"WHERE id > :lower AND id <= :upper ORDER BY id"),
+                {"lower": copied, "upper": upper, "copied_at": copied_at},
+            ).rowcount
+        copied = upper
+    print(f"[partitions] Copied {rows} rows into the partitioned {TABLE}; drop {legacy} once checked")
+    return {"converted": True, "rows_copied": rows}
+
+
+class PartitionMaintainer:
+    """
+    Background thread of the API: creates the coming months' partitions and applies
+    the retention policy every interval (see module docstring).
+    """
+
+    def __init__(self, bind=None, interval: float = TRANSACTION_MAINTENANCE_SECONDS,
+                 retention_months: int = TRANSACTION_RETENTION_MONTHS):
+        self.bind = bind if bind is not None else engine
+        self.interval = interval
+        self.retention_months = retention_months
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0, "skipped_locked": 0, "partitions_created": 0, "months_dropped": 0,
+            "rows_archived": 0, "errors": 0, "last_error": None, "last_run_seconds": None,
+            "partitioned": None,
+        }
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+    def _loop(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"[partitions] Maintenance failed: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._stats["last_error"] = str(e)
+            if self._stop.wait(self.interval):
+                return
+
+    def run_once(self, now: datetime = None) -> dict:
+        start = time.perf_counter()
+        partitioned = is_partitioned(self.bind)
+        with self._lock:
+            self._stats["partitioned"] = partitioned
+        if not partitioned and self.retention_months <= 0:
+            return {}
+        with self.bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+            if _is_postgres(self.bind):
+                # Another replica is on it
+                if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _LOCK_KEY}).scalar():
+                    with self._lock:
+                        self._stats["skipped_locked"] += 1
+                    return {}
+            try:
+                created = []
+                if partitioned:
+                    with self.bind.begin() as conn:
+                        created = ensure_partitions(conn, now=now)
+                result = apply_retention(self.bind, now, self.retention_months)
+            finally:
+                if _is_postgres(self.bind):
+                    lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _LOCK_KEY})
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["partitions_created"] += len(created)
+            self._stats["months_dropped"] += len(result["dropped"])
+            self._stats["rows_archived"] += result["rows_archived"]
+            self._stats["last_run_seconds"] = round(time.perf_counter() - start, 3)
+        return {"created": created, **result}
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["retention_months"] = self.retention_months
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming partitions and apply transaction retention.")
+    parser.add_argument("--retention-months", type=int, default=TRANSACTION_RETENTION_MONTHS)
+    parser.add_argument("--action", choices=RETENTION_ACTIONS, default=TRANSACTION_RETENTION_ACTION)
+    parser.add_argument("--dry-run", action="store_true", help="only list the months that would be removed")
+    args = parser.parse_args()
+
+    if is_partitioned(engine) and not args.dry_run:
+        with engine.begin() as conn:
+            created = ensure_partitions(conn)
+        print(f"[partitions] Created partitions: {created or 'none'}")
+    for partition in list_partitions(engine):
+        print(f"[partitions] {partition['month']}: {partition['rows']} rows ({partition['table']})")
+    result = apply_retention(engine, retention_months=args.retention_months, action=args.action, dry_run=args.dry_run)
+    print(f"[partitions] Retention: {result}")
+
+
+if __name__ == "__main__":
+    main()
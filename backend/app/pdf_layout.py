@@ -0,0 +1,184 @@
+# backend/app/pdf_layout.py
+"""
+Fast text-layer path for grid statements.
+
+Instead of pdfplumber's table detection, read the page's words once and cut each
+text line into columns at known x-boundaries. Boundaries come from a per-layout
+template cache keyed by the header row (text + positions + page width). A template
+is learned from the page's vertical rulings, or from the tables found when a page
+falls back to extract_tables(). Any line that does not fit the template makes the
+caller fall back to extract_tables() for that page.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+PDF_FAST_PATH = os.getenv("PDF_FAST_PATH", "1") == "1"
+PDF_LAYOUT_CACHE_SIZE = int(os.getenv("PDF_LAYOUT_CACHE_SIZE", "256"))
+
+N_COLUMNS = 6  # Date, Merchant, Category, Amount, Currency, Transaction Type
+LINE_TOLERANCE = 3.0  # words whose tops differ by less are on the same line
+EDGE_TOLERANCE = 2.0  # how far a word may poke past its column edge
+
+# signature => column edges (N_COLUMNS + 1 x positions)
+_templates = OrderedDict()
+# Guards _templates and layout_stats (pages are parsed concurrently with WORKER_MODE=thread)
+_lock = threading.Lock()
+layout_stats = {"fast_pages": 0, "fallback_pages": 0, "templates_learned": 0, "template_hits": 0}
+
+
+def _group_lines(words: list) -> list:
+    """
+    Group pdfplumber words into text lines (top to bottom, left to right).
+    """
+    lines = []
+    for word in sorted(words, key=lambda w: (w["top"], w["x0"])):
+        if lines and abs(word["top"] - lines[-1][0]["top"]) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    for line in lines:
+        line.sort(key=lambda w: w["x0"])
+    return lines
+
+
+def _find_header(lines: list):
+    for i, line in enumerate(lines):
+        texts = {w["text"].lower() for w in line}
+        if "date" in texts and "amount" in texts:
+            return i
+    return None
+
+
+def _signature(page, header_words: list) -> tuple:
+    return (
+        round(float(page.width)),
+        tuple((w["text"].lower(), round(float(w["x0"]))) for w in header_words),
+    )
+
+
+def _remember(signature: tuple, edges: list):
+    with _lock:
+        _templates[signature] = edges
+        _templates.move_to_end(signature)
+        while len(_templates) > PDF_LAYOUT_CACHE_SIZE:
+            _templates.popitem(last=False)
+        layout_stats["templates_learned"] += 1
+
+
+def _lookup(signature: tuple):
+    with _lock:
+        edges = _templates.get(signature)
+        if edges is not None:
+            _templates.move_to_end(signature)
+            layout_stats["template_hits"] += 1
+        return edges
+
+
+def _edges_from_rulings(page, header_words: list):
+    """
+    Column edges from the vertical grid lines crossing the header row, if they
+    give exactly N_COLUMNS columns.
+    """
+    top = min(float(w["top"]) for w in header_words)
+    bottom = max(float(w["bottom"]) for w in header_words)
+    xs = sorted(
+        float(e["x0"]) for e in page.vertical_edges
+        if float(e["top"]) <= top and float(e["bottom"]) >= bottom
+    )
+    edges = []
+    for x in xs:
+        if not edges or x - edges[-1] > 1.0:
+            edges.append(x)
+    return edges if len(edges) == N_COLUMNS + 1 else None
+
+
+def _edges_from_tables(tables: list):
+    """
+    Column edges from the first row of the first detected table.
+    """
+    for table in tables:
+        for row in table.rows:
+            cells = row.cells
+            if len(cells) == N_COLUMNS and all(cell is not None for cell in cells):
+                return [float(cell[0]) for cell in cells] + [float(cells[-1][2])]
+    return None
+
+
+def _split_line(words: list, edges: list):
+    """
+    Cut one text line into N_COLUMNS cell strings. None if a word does not sit
+    inside a single column or a column is empty.
+    """
+    cells = [[] for _ in range(N_COLUMNS)]
+    col = 0
+    for word in words:
+        x0, x1 = float(word["x0"]), float(word["x1"])
+        while col < N_COLUMNS and x0 >= edges[col + 1]:
+            col += 1
+        if col >= N_COLUMNS or x0 < edges[col] - EDGE_TOLERANCE or x1 > edges[col + 1] + EDGE_TOLERANCE:
+            return None
+        cells[col].append(word["text"])
+    if not all(cells):
+        return None
+    return [" ".join(cell) for cell in cells]
+
+
+def extract_rows(page, state: dict):
+    """
+    Fast path for one page. Returns table rows (lists of N_COLUMNS strings, header
+    included, like extract_tables() would) or None when the caller must fall back.
+    `state` is shared by the pages of one document: pages without a header row
+    reuse the template of the last header seen.
+    """
+    lines = _group_lines(page.extract_words())
+    header_idx = _find_header(lines)
+
+    if header_idx is not None:
+        signature = _signature(page, lines[header_idx])
+        edges = _lookup(signature)
+        if edges is None:
+            edges = _edges_from_rulings(page, lines[header_idx])
+            if edges is not None:
+                _remember(signature, edges)
+        state["signature"] = signature
+        state["edges"] = edges
+        body = lines[header_idx:]
+    else:
+        edges = state.get("edges")
+        body = lines
+
+    if edges is None:
+        return None
+
+    rows = []
+    for line in body:
+        cells = _split_line(line, edges)
+        if cells is None:
+            return None
+        rows.append(cells)
+
+    with _lock:
+        layout_stats["fast_pages"] += 1
+    return rows
+
+
+def learn_from_tables(tables: list, state: dict):
+    """
+    Called after a page fell back to table detection: (re)learn the template
+    for the current layout from the tables that were found.
+    """
+    with _lock:
+        layout_stats["fallback_pages"] += 1
+    signature = state.get("signature")
+    if signature is None:
+        return
+    edges = _edges_from_tables(tables)
+    if edges is not None:
+        _remember(signature, edges)
+    state["edges"] = edges
+
+
+def clear_templates():
+    with _lock:
+        _templates.clear()
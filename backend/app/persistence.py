@@ -0,0 +1,116 @@
+# backend/app/persistence.py
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert, text, update
+from sqlalchemy.orm import Session
+
+from app.models import AnalysisJob, Transaction
+
+
+def bulk_insert_transactions(db: Session, rows: List[dict], commit: bool = True) -> List[int]:
+    """
+    Insert all rows of a statement in one transaction.
+    1) A single INSERT ... VALUES (...), (...) ... RETURNING id
+       (SQLAlchemy batches the executemany into multi-row statements).
+    2) One commit for the whole statement. Pass commit=False when inserting a
+       streamed statement chunk by chunk, and commit once after the last chunk.
+    Returns the generated ids in the same order as `rows` (sort_by_parameter_order),
+    without re-reading them.
+    """
+    if not rows:
+        return []
+
+    try:
+        result = db.execute(insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), rows)
+        ids = [row_id for (row_id,) in result.all()]
+        if commit:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return ids
+
+
+def reserve_transaction_ids(db: Session, count: int) -> Optional[List[int]]:
+    """
+    Take `count` ids from the transactions id sequence without inserting anything
+    (a streamed statement returns ids per chunk and inserts every row at the end).
+    Returns None where there is no sequence to draw from (SQLite).
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    if count <= 0:
+        return []
+    ids = db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('transactions', 'id')) FROM generate_series(1, :count)"),
+        {"count": count},
+    ).scalars().all()
+    db.commit()
+    return sorted(ids)
+
+
+def create_job(db: Session, job_id: str, file_name: str, contact_email: Optional[str]) -> AnalysisJob:
+    """
+    Record a newly accepted analysis job (status=queued).
+    """
+    job = AnalysisJob(id=job_id, status="queued", file_name=file_name, contact_email=contact_email)
+    db.add(job)
+    db.commit()
+    return job
+
+
+def start_job(db: Session, job_id: str) -> bool:
+    """
+    queued => running. False if the job is no longer queued (e.g. failed as stale).
+    """
+    result = db.execute(
+        update(AnalysisJob)
+        .where(AnalysisJob.id == job_id, AnalysisJob.status == "queued")
+        .values(status="running", updated_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def fail_stale_jobs(db: Session, updated_before: datetime, error: str, job_id: str = None) -> int:
+    """
+    Fail queued / running jobs not updated since `updated_before` (the process
+    running them is gone). Only `job_id` if given. Returns the number of jobs failed.
+    """
+    query = update(AnalysisJob).where(
+        AnalysisJob.status.in_(("queued", "running")),
+        AnalysisJob.updated_at < updated_before,
+    )
+    if job_id is not None:
+        query = query.where(AnalysisJob.id == job_id)
+    result = db.execute(query.values(status="failed", error=error, updated_at=datetime.utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+def update_job(db: Session, job_id: str, **fields):
+    """
+    Update status/progress columns of a job and bump updated_at.
+    """
+    fields["updated_at"] = datetime.utcnow()
+    db.execute(update(AnalysisJob).where(AnalysisJob.id == job_id).values(**fields))
+    db.commit()
+
+
+def get_job(db: Session, job_id: str) -> Optional[AnalysisJob]:
+    return db.get(AnalysisJob, job_id)
+
+
+def label_transaction(db: Session, tx_id: int, is_fraud: bool) -> bool:
+    """
+    Record the confirmed outcome of a transaction (for incremental training).
+    Returns False if there is no such transaction.
+    """
+    result = db.execute(
+        update(Transaction)
+        .where(Transaction.id == tx_id)
+        .values(label=is_fraud, labeled_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount > 0
@@ -0,0 +1,206 @@
+# backend/app/pipeline.py
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.alerts import AlertDispatcher, queue_alert
+from app.dedup import DEDUP, claim_fingerprints, fingerprint_index
+from app.persistence import bulk_insert_transactions
+
+
+def _occurred_at(value, default: datetime) -> datetime:
+    """
+    A parsed transaction time as a naive UTC datetime (default when unreadable).
+    """
+    if not isinstance(value, pd.Timestamp):
+        return default
+    if value.tzinfo is not None:
+        value = value.tz_convert(None)
+    return value.to_pydatetime()
+
+
+def build_result_rows(df: pd.DataFrame, scores: dict, statement_id: str = None, customer: str = None):
+    """
+    Combine parsed rows with their batch scores. statement_id / customer (the
+    normalized contact email) are stored on every row, for the history queries.
+    Returns (output_rows, db_rows, fraud_details):
+      - output_rows => JSON rows for the client
+      - db_rows => Transaction column values for the bulk insert
+      - fraud_details => one line per flagged row, for the alert email
+    """
+    # Convert any boolean or numpy dtypes if needed
+    for col in df.columns:
+        if pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype(bool)
+
+    probabilities = scores["probabilities"]
+    fraud_flags = scores["is_fraud"]
+    explanations = scores["explanations"]
+    amounts = scores["amounts"]
+    version = scores.get("model_version")
+    # Rows store the threshold and the explanation is rendered on read
+    threshold = scores.get("threshold")
+    scored_at = datetime.utcnow()
+
+    output_rows = []
+    db_rows = []
+    fraud_details = []
+
+    for i, row in enumerate(df.to_dict("records")):
+        date_str = str(row.get("trans_date_trans_time", ""))
+        merchant_str = str(row.get("merchant", ""))
+        category_str = str(row.get("category", ""))
+        amount_val = float(amounts[i])
+        currency_str = str(row.get("currency", ""))
+        transaction_type = str(row.get("transaction_type", ""))
+
+        prob = float(probabilities[i])
+        is_fraud = bool(fraud_flags[i])
+        explanation = explanations[i]
+
+        if is_fraud:
+            fraud_details.append(
+                f"Merchant={merchant_str}, Amount={amount_val}, Prob={prob:.2f}"
+            )
+
+        # Collect for the bulk insert
+        db_rows.append({
+            "date": date_str,
+            "merchant_name": merchant_str,
+            "merchant_category": category_str,
+            "transaction_amount": amount_val,
+            "currency": currency_str,
+            "transaction_type": transaction_type,
+            "remaining_credit_limit": 9999.0,  # placeholder
+            "fraud_detected": is_fraud,
+            "explanation": explanation if threshold is None else None,
+            "probability": prob,
+            "threshold": threshold,
+            "model_version": version,
+            "occurred_at": _occurred_at(row.get("trans_date_trans_time"), scored_at),
+            "statement_id": statement_id,
+            "customer_key": customer,
+            "created_at": scored_at,
+        })
+
+        output_rows.append({
+            "date": date_str,
+            "merchant": merchant_str,
+            "category": category_str,
+            "amount": amount_val,
+            "currency": currency_str,
+            "type": transaction_type,
+            "fraud_detected": is_fraud,
+            "explanation": explanation,
+            "probability": prob,
+        })
+
+    return output_rows, db_rows, fraud_details
+
+
+def claim_rows(db: Session, output_rows: list, db_rows: list, tx_ids: list, fingerprints: list = None):
+    """
+    Store the dedup fingerprints of just inserted rows (app/dedup.py). Rows a
+    concurrent upload stored first are deleted again; their output rows get
+    id None and "duplicate_of". Returns ({fingerprint: transaction id} of the
+    claimed rows, for fingerprint_index.remember once committed, indices of the
+    deleted rows in db_rows).
+    """
+    if not fingerprints:
+        return {}, set()
+    lost = claim_fingerprints(db, fingerprints, tx_ids, db_rows)
+    for i, existing in lost.items():
+        if output_rows is not None and i < len(output_rows):
+            output_rows[i]["id"] = None
+            output_rows[i]["duplicate_of"] = existing
+    claimed = {
+        fingerprint: tx_id
+        for i, (fingerprint, tx_id) in enumerate(zip(fingerprints, tx_ids))
+        if i not in lost
+    }
+    return claimed, set(lost)
+
+
+def stored_fraud_details(fraud_details: list, db_rows: list, lost: set) -> list:
+    """
+    fraud_details (one line per flagged row of db_rows, in order) without the
+    lines of the rows in `lost` (deleted as duplicates, see claim_rows).
+    """
+    if not lost:
+        return fraud_details
+    flagged = [i for i, row in enumerate(db_rows) if row["fraud_detected"]]
+    return [detail for detail, i in zip(fraud_details, flagged) if i not in lost]
+
+
+def store_rows(db: Session, output_rows: list, db_rows: list, commit: bool = True, fingerprints: list = None):
+    """
+    Save rows with one multi-row insert and attach the generated ids to the output rows.
+    Streaming callers pass commit=False per chunk and commit once at the end.
+    Returns (claimed fingerprints, indices of rows lost as duplicates), see claim_rows.
+    """
+    tx_ids = bulk_insert_transactions(db, db_rows, commit=False)
+    for out_row, tx_id in zip(output_rows, tx_ids):
+        out_row["id"] = tx_id
+    claimed, lost = claim_rows(db, output_rows, db_rows, tx_ids, fingerprints)
+    if commit:
+        db.commit()
+        fingerprint_index.remember(claimed)
+    return claimed, lost
+
+
+def write_statement(db: Session, db_rows: list, fraud_details: list, contact_email: str = None,
+                    file_name: str = None, fingerprints: list = None, output_rows: list = None):
+    """
+    The write phase of a statement: one multi-row insert, the rows' fingerprints
+    (claim_rows) + its alert (app/alerts.py) if anything it stored was flagged, in
+    one commit. Returns (transaction ids, alert queued).
+    """
+    try:
+        tx_ids = bulk_insert_transactions(db, db_rows, commit=False)
+        claimed, lost = claim_rows(db, output_rows, db_rows, tx_ids, fingerprints)
+        queued = queue_alert(db, contact_email, stored_fraud_details(fraud_details, db_rows, lost), file_name)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    fingerprint_index.remember(claimed)
+    return tx_ids, queued
+
+
+def store_and_notify(db: Session, output_rows: list, db_rows: list, fraud_details: list, contact_email: str = None,
+                     alerts: AlertDispatcher = None, file_name: str = None, fingerprints: list = None):
+    """
+    1) Save all rows, their fingerprints and queue the alert (write_statement: one commit).
+    2) Attach the generated ids to the output rows (rows a concurrent upload
+       stored first keep id None and "duplicate_of").
+    3) Wake the alert dispatcher; the email is sent later, as part of the
+       recipient's digest.
+    """
+    tx_ids, queued = write_statement(db, db_rows, fraud_details, contact_email, file_name, fingerprints, output_rows)
+    for out_row, tx_id in zip(output_rows, tx_ids):
+        if "duplicate_of" not in out_row:
+            out_row["id"] = tx_id
+    if queued and alerts is not None:
+        alerts.notify()
+    return output_rows
+
+
+def cached_statement(rows: list, customer: str = None):
+    """
+    (rows, duplicates) to answer a re-upload from the result cache with. The cache
+    holds the whole statement (stored rows + the rows reported as duplicates), so
+    for a customer (with dedup) every row of it is now a duplicate of its stored
+    transaction; otherwise the cached rows are returned as they are.
+    """
+    if not customer or not DEDUP:
+        return rows, []
+    return [], [
+        {
+            "date": row["date"],
+            "merchant": row["merchant"],
+            "amount": row["amount"],
+            "duplicate_of": row["duplicate_of"] if "duplicate_of" in row else row["id"],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,187 @@
+# backend/app/queries.py
+"""
+Read queries over a customer's scored transactions (GET /transactions, GET
+/transactions/summary).
+
+Pages are keyset-paginated: rows come newest first by (occurred_at, id) and the
+cursor is the last row's key, so page N costs the same as page 1 (an OFFSET scan
+would read and discard every earlier row). Both queries are served by
+ix_transactions_customer_occurred, or by the partial ix_transactions_customer_flagged
+for flagged rows only.
+"""
+import base64
+import binascii
+import os
+from datetime import datetime
+
+from sqlalchemy import case, func, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from app.models import Transaction
+from app.scoring import explanation_for
+
+QUERY_DEFAULT_LIMIT = int(os.getenv("QUERY_DEFAULT_LIMIT", "50"))
+QUERY_MAX_LIMIT = int(os.getenv("QUERY_MAX_LIMIT", "500"))
+
+GROUP_BY = ("month", "merchant", "category")
+
+
+class InvalidQueryError(ValueError):
+    pass
+
+
+def encode_cursor(*key) -> str:
+    """
+    Opaque page cursor from a row / group key (datetimes as ISO strings).
+    """
+    parts = [value.isoformat() if isinstance(value, datetime) else str(value) for value in key]
+    return base64.urlsafe_b64encode("|".join(parts).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidQueryError("Invalid cursor.")
+
+
+def _limit(limit: int) -> int:
+    if limit is None:
+        return QUERY_DEFAULT_LIMIT
+    if limit < 1:
+        raise InvalidQueryError("limit must be at least 1.")
+    return min(limit, QUERY_MAX_LIMIT)
+
+
+def _customer_rows(customer: str, flagged_only: bool, since: datetime, until: datetime) -> list:
+    conditions = [Transaction.customer_key == customer, Transaction.occurred_at.is_not(None)]
+    if flagged_only:
+        # Same predicate as the partial index
+        conditions.append(Transaction.fraud_detected == true())
+    if since is not None:
+        conditions.append(Transaction.occurred_at >= since)
+    if until is not None:
+        conditions.append(Transaction.occurred_at < until)
+    return conditions
+
+
+def transaction_to_dict(tx) -> dict:
+    return {
+        "id": tx.id,
+        "date": tx.date,
+        "occurred_at": tx.occurred_at.isoformat() if tx.occurred_at else None,
+        "merchant": tx.merchant_name,
+        "category": tx.merchant_category,
+        "amount": tx.transaction_amount,
+        "currency": tx.currency,
+        "type": tx.transaction_type,
+        "fraud_detected": bool(tx.fraud_detected),
+        "probability": tx.probability,
+        "explanation": explanation_for(tx.explanation, tx.probability, tx.threshold, tx.fraud_detected),
+        "model_version": tx.model_version,
+        "statement_id": tx.statement_id,
+        "label": tx.label,
+    }
+
+
+def list_transactions(db: Session, customer: str, limit: int = None, cursor: str = None,
+                      flagged_only: bool = False, since: datetime = None, until: datetime = None) -> dict:
+    """
+    One page of the customer's transactions, newest first.
+    Returns {"items", "next_cursor"} (next_cursor None on the last page).
+    """
+    limit = _limit(limit)
+    conditions = _customer_rows(customer, flagged_only, since, until)
+    if cursor:
+        parts = _decode_cursor(cursor).split("|")
+        try:
+            occurred_at, tx_id = datetime.fromisoformat(parts[0]), int(parts[1])
+        except (IndexError, ValueError):
+            raise InvalidQueryError("Invalid cursor.")
+        conditions.append(tuple_(Transaction.occurred_at, Transaction.id) < tuple_(occurred_at, tx_id))
+
+    rows = db.execute(
+        select(Transaction)
+        .where(*conditions)
+        .order_by(Transaction.occurred_at.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+    ).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [transaction_to_dict(tx) for tx in rows],
+        "next_cursor": encode_cursor(rows[-1].occurred_at, rows[-1].id) if has_more else None,
+    }
+
+
+def _group_key(db: Session, group_by: str):
+    if group_by == "merchant":
+        return func.coalesce(Transaction.merchant_name, "")
+    if group_by == "category":
+        return func.coalesce(Transaction.merchant_category, "")
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(Transaction.occurred_at, "YYYY-MM")
+    return func.strftime("%Y-%m", Transaction.occurred_at)
+
+
+def _aggregates():
+    flagged = Transaction.fraud_detected == true()
+    return [
+        func.count().label("transactions"),
+        func.sum(case((flagged, 1), else_=0)).label("flagged"),
+        func.coalesce(func.sum(Transaction.transaction_amount), 0.0).label("amount"),
+        func.coalesce(func.sum(case((flagged, Transaction.transaction_amount), else_=0.0)), 0.0).label("flagged_amount"),
+        func.avg(Transaction.probability).label("avg_probability"),
+        func.min(Transaction.occurred_at).label("first_at"),
+        func.max(Transaction.occurred_at).label("last_at"),
+    ]
+
+
+def _aggregate_dict(row) -> dict:
+    return {
+        "transactions": row.transactions,
+        "flagged": int(row.flagged or 0),
+        "amount": round(float(row.amount or 0.0), 2),
+        "flagged_amount": round(float(row.flagged_amount or 0.0), 2),
+        "avg_probability": round(float(row.avg_probability), 4) if row.avg_probability is not None else None,
+        "first_at": _iso(row.first_at),
+        "last_at": _iso(row.last_at),
+    }
+
+
+def _iso(value):
+    # SQLite returns min()/max() of a DateTime column as the stored string
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def summarize_transactions(db: Session, customer: str, group_by: str = "month", limit: int = None,
+                           cursor: str = None, flagged_only: bool = False, since: datetime = None,
+                           until: datetime = None) -> dict:
+    """
+    Totals of the customer's transactions plus one page of per-group aggregates
+    (groups = month, newest first, or merchant / category, by name).
+    Returns {"totals", "group_by", "groups", "next_cursor"}.
+    """
+    if group_by not in GROUP_BY:
+        raise InvalidQueryError(f"group_by must be one of {', '.join(GROUP_BY)}.")
+    limit = _limit(limit)
+    conditions = _customer_rows(customer, flagged_only, since, until)
+    totals = db.execute(select(*_aggregates()).where(*conditions)).one()
+
+    key = _group_key(db, group_by).label("key")
+    groups = select(key, *_aggregates()).where(*conditions).group_by(key).subquery()
+    newest_first = group_by == "month"
+    query = select(groups)
+    if cursor:
+        last = _decode_cursor(cursor)
+        query = query.where(groups.c.key < last if newest_first else groups.c.key > last)
+    query = query.order_by(groups.c.key.desc() if newest_first else groups.c.key.asc()).limit(limit + 1)
+    rows = db.execute(query).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "totals": _aggregate_dict(totals),
+        "group_by": group_by,
+        "groups": [{"key": row.key, **_aggregate_dict(row)} for row in rows],
+        "next_cursor": encode_cursor(rows[-1].key) if has_more else None,
+    }
@@ -0,0 +1,407 @@
+# backend/app/registry.py
+"""
+Local model registry + hot reload.
+
+Layout of MODEL_REGISTRY_DIR:
+    <version>/model.pkl        joblib {"model", "threshold"} (as train_model.py saves it)
+    <version>/model_compiled/  memory-mappable forest arrays (app/compiled_model.py)
+    <version>/metadata.json    version, created_at, threshold, metrics, features, params, sha256
+    <version>/threshold_curve.npz     counts at every threshold on the test set (app/ml/thresholds.py)
+    <version>/operating_point.json    optional threshold that replaces the trained one
+    ACTIVE                     name of the version the API should serve
+    CHALLENGER                 optional version scored in shadow (app/shadow.py)
+
+Every API process runs a ModelWatcher that polls ACTIVE. When it names another
+version, the new model is loaded and test-scored in the worker pool (warm-up) and
+only then swapped in. Requests already running finish on the model they started with.
+The challenger is kept in sync the same way.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+from app.workers import ModelRef, WorkerPool
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "app/ml/registry")
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "5"))
+# How long a new version may take to load + score its warm-up batch
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "120"))
+
+MODEL_FILE = "model.pkl"
+METADATA_FILE = "metadata.json"
+CURVE_FILE = "threshold_curve.npz"
+OPERATING_POINT_FILE = "operating_point.json"
+ACTIVE_FILE = "ACTIVE"
+CHALLENGER_FILE = "CHALLENGER"
+
+
+class ModelNotFoundError(Exception):
+    """
+    Raised when a version is not in the registry.
+    """
+
+
+class ModelRegistry:
+    """
+    A directory of versioned model artifacts plus an ACTIVE pointer.
+    """
+
+    def __init__(self, root: str = MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def _path(self, *parts) -> str:
+        return os.path.join(self.root, *parts)
+
+    def versions(self) -> list:
+        """
+        Metadata of every complete version, oldest first.
+        """
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in sorted(os.listdir(self.root)):
+            if name.startswith("."):
+                continue
+            metadata = self.get(name)
+            if metadata is not None:
+                found.append(metadata)
+        return sorted(found, key=lambda m: (m.get("created_at") or "", m["version"]))
+
+    def get(self, version: str):
+        """
+        Metadata of one version, or None.
+        """
+        if not version or os.sep in version or version.startswith("."):
+            return None
+        try:
+            with open(self._path(version, METADATA_FILE)) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._path(version, MODEL_FILE)):
+            return None
+        metadata["version"] = version
+        return metadata
+
+    def active_version(self):
+        """
+        The version named in ACTIVE, else the newest version, else None (empty registry).
+        """
+        try:
+            with open(self._path(ACTIVE_FILE)) as f:
+                version = f.read().strip()
+            if self.get(version) is not None:
+                return version
+        except OSError:
+            pass
+        versions = self.versions()
+        return versions[-1]["version"] if versions else None
+
+    def ref(self, version: str) -> ModelRef:
+        metadata = self.get(version)
+        if metadata is None:
+            raise ModelNotFoundError(f"Unknown model version {version!r}")
+        operating_point = self.operating_point(version)
+        return ModelRef(
+            version=version,
+            path=self._path(version, MODEL_FILE),
+            checksum=metadata.get("sha256"),
+            threshold=operating_point["threshold"] if operating_point else None,
+        )
+
+    def active_ref(self):
+        version = self.active_version()
+        return self.ref(version) if version is not None else None
+
+    def _write_pointer(self, file_name: str, content: str):
+        # Atomic rename, so readers never see a partial file
+        directory, name = os.path.split(self._path(file_name))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}")
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, self._path(file_name))
+
+    def threshold_curve(self, version: str):
+        """
+        The version's saved threshold curve, or None (published without one).
+        """
+        from app.ml.thresholds import load_threshold_curve
+
+        if self.get(version) is None:
+            raise ModelNotFoundError(f"Unknown model version {version!r}")
+        try:
+            return load_threshold_curve(self._path(version, CURVE_FILE))
+        except (OSError, ValueError):
+            return None
+
+    def operating_point(self, version: str):
+        """
+        The operating point chosen for a version ({"threshold", "objective", ...}), or None.
+        """
+        try:
+            with open(self._path(version, OPERATING_POINT_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set_operating_point(self, version: str, threshold: float = None, objective: str = None,
+                            alert_cost: float = None, fraud_cost: float = None) -> dict:
+        """
+        Choose the version's threshold: an explicit threshold, or the best point of
+        its saved curve for objective ("f1" / "cost" with alert_cost, fraud_cost).
+        Neither => back to the trained threshold. Returns the stored point.
+        """
+        from app.ml import thresholds
+
+        metadata = self.get(version)
+        if metadata is None:
+            raise ModelNotFoundError(f"Unknown model version {version!r}")
+        if threshold is None and objective is None:
+            try:
+                os.remove(self._path(version, OPERATING_POINT_FILE))
+            except FileNotFoundError:
+                pass
+            return {"threshold": metadata.get("threshold"), "objective": "trained"}
+
+        costs = {
+            "alert_cost": thresholds.ALERT_COST if alert_cost is None else alert_cost,
+            "fraud_cost": thresholds.FRAUD_COST if fraud_cost is None else fraud_cost,
+        }
+        curve = self.threshold_curve(version)
+        chosen = {"threshold": threshold, "objective": objective or "manual", **costs}
+        if curve is not None:
+            metrics = thresholds.curve_metrics(curve, **costs)
+            if threshold is None:
+                index = thresholds.best_index(metrics, objective)
+            else:
+                index = thresholds.index_for_threshold(curve, threshold)
+            test_point = thresholds.point(metrics, index)
+            if threshold is None:
+                # "flag nothing" wins => a threshold above every probability
+                chosen["threshold"] = test_point["threshold"] if test_point["threshold"] is not None else 1.0 + 1e-9
+            chosen["test_set"] = test_point
+        elif threshold is None:
+            raise ValueError(f"Model {version} has no threshold curve; pass a threshold instead.")
+
+        self._write_pointer(os.path.join(version, OPERATING_POINT_FILE), json.dumps(chosen, indent=2))
+        return chosen
+
+    def activate(self, version: str):
+        """
+        Point ACTIVE at `version`.
+        """
+        if self.get(version) is None:
+            raise ModelNotFoundError(f"Unknown model version {version!r}")
+        self._write_pointer(ACTIVE_FILE, version)
+
+    def active_pointer(self):
+        """
+        The content of ACTIVE as it is (None if there is no ACTIVE), for restore_active.
+        """
+        try:
+            with open(self._path(ACTIVE_FILE)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def restore_active(self, pointer: str = None):
+        """
+        Put back an ACTIVE saved with active_pointer (None => remove ACTIVE again).
+        """
+        if pointer is None:
+            try:
+                os.remove(self._path(ACTIVE_FILE))
+            except FileNotFoundError:
+                pass
+            return
+        self._write_pointer(ACTIVE_FILE, pointer)
+
+    def challenger_version(self):
+        """
+        The version named in CHALLENGER, or None.
+        """
+        try:
+            with open(self._path(CHALLENGER_FILE)) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version if self.get(version) is not None else None
+
+    def set_challenger(self, version: str = None):
+        """
+        Point CHALLENGER at `version`, or remove it (None).
+        """
+        if version is None:
+            try:
+                os.remove(self._path(CHALLENGER_FILE))
+            except FileNotFoundError:
+                pass
+            return
+        if self.get(version) is None:
+            raise ModelNotFoundError(f"Unknown model version {version!r}")
+        self._write_pointer(CHALLENGER_FILE, version)
+
+    def publish(self, model, threshold: float, metrics: dict = None, features: list = None,
+                params: dict = None, threshold_curve: dict = None, activate: bool = True) -> str:
+        """
+        Add a trained pipeline as a new version (written to a temp dir, then renamed
+        into place) and optionally activate it. Returns the version name.
+        threshold_curve (app/ml/thresholds.py) lets the API change operating points later.
+        """
+        import hashlib
+
+        import joblib
+
+        from app.ml.train_model import save_compiled_model
+
+        os.makedirs(self.root, exist_ok=True)
+        tmp_dir = self._path(f".publish-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            model_path = os.path.join(tmp_dir, MODEL_FILE)
+            joblib.dump({"model": model, "threshold": threshold}, model_path)
+            with open(model_path, "rb") as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()[:12]
+            save_compiled_model(model, threshold, os.path.join(tmp_dir, "model_compiled"), source_path=model_path)
+            if threshold_curve is not None:
+                from app.ml.thresholds import save_threshold_curve
+
+                save_threshold_curve(threshold_curve, os.path.join(tmp_dir, CURVE_FILE))
+
+            created_at = datetime.utcnow()
+            version = f"{created_at:%Y%m%d-%H%M%S}-{sha256[:8]}"
+            with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+                json.dump({
+                    "version": version,
+                    "created_at": created_at.isoformat(),
+                    "threshold": float(threshold),
+                    "metrics": metrics or {},
+                    "features": list(features or []),
+                    "params": params or {},
+                    "sha256": sha256,
+                }, f, indent=2, default=str)
+            os.rename(tmp_dir, self._path(version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if activate:
+            self.activate(version)
+        return version
+
+
+class ModelWatcher:
+    """
+    Keeps a WorkerPool on the registry's active version: polls ACTIVE every
+    poll_seconds, warms the new version up in the pool and only then swaps it in.
+    A version that fails its warm-up is not retried until ACTIVE changes again.
+    With a ShadowScorer, its challenger follows CHALLENGER the same way.
+    """
+
+    def __init__(self, registry: ModelRegistry, worker_pool: WorkerPool, shadow=None,
+                 poll_seconds: float = MODEL_REGISTRY_POLL_SECONDS, warmup_timeout: float = MODEL_WARMUP_TIMEOUT):
+        self.registry = registry
+        self.worker_pool = worker_pool
+        self.shadow = shadow
+        self.poll_seconds = poll_seconds
+        self.warmup_timeout = warmup_timeout
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failed = {}  # version => error of its last warm-up
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.sync()
+                if self.shadow is not None:
+                    self.sync_challenger()
+            except Exception as e:
+                print(f"[registry] Sync failed: {e}")
+
+    def sync(self, version: str = None) -> dict:
+        """
+        Bring the pool to `version` (default: the registry's active version).
+        Returns {"version", "swapped", "error"}.
+        """
+        with self._sync_lock:
+            if version is None:
+                version = self.registry.active_version()
+            if version is None:
+                return {"version": self.worker_pool.model_version, "swapped": False, "error": None}
+            ref = self.registry.ref(version)
+            if ref == self.worker_pool.active_model:
+                return {"version": version, "swapped": False, "error": None}
+            if version == self.worker_pool.model_version:
+                # Same model, new operating point: nothing to load
+                self.worker_pool.set_active_model(ref)
+                print(f"[registry] Model {version} now uses threshold {ref.threshold}")
+                return {"version": version, "swapped": True, "error": None}
+            if version in self._failed:
+                return {"version": self.worker_pool.model_version, "swapped": False, "error": self._failed[version]}
+
+            try:
+                self.worker_pool.warm_up(ref, timeout=self.warmup_timeout)
+            except Exception as e:
+                self._failed[version] = f"Warm-up of {version} failed: {e}"
+                print(f"[registry] {self._failed[version]}")
+                return {"version": self.worker_pool.model_version, "swapped": False, "error": self._failed[version]}
+
+            previous = self.worker_pool.model_version
+            self.worker_pool.set_active_model(ref)
+            print(f"[registry] Now serving model {version} (was {previous})")
+            return {"version": version, "swapped": True, "error": None}
+
+    def sync_challenger(self, version: str = None) -> dict:
+        """
+        Bring the shadow scorer to `version` (default: the registry's CHALLENGER,
+        None => no challenger). Returns {"version", "swapped", "error"}.
+        """
+        with self._sync_lock:
+            if version is None:
+                version = self.registry.challenger_version()
+            current = self.shadow.challenger.version if self.shadow.challenger is not None else None
+            if version is None:
+                if current is None:
+                    return {"version": None, "swapped": False, "error": None}
+                self.shadow.set_challenger(None)
+                print(f"[registry] Shadow scoring stopped (was {current})")
+                return {"version": None, "swapped": True, "error": None}
+            ref = self.registry.ref(version)
+            if ref == self.shadow.challenger:
+                return {"version": current, "swapped": False, "error": None}
+            if version == current:
+                self.shadow.set_challenger(ref)
+                return {"version": version, "swapped": True, "error": None}
+            if version in self._failed:
+                return {"version": current, "swapped": False, "error": self._failed[version]}
+
+            try:
+                self.shadow.warm_up(ref, timeout=self.warmup_timeout)
+            except Exception as e:
+                self._failed[version] = f"Warm-up of {version} failed: {e}"
+                print(f"[registry] {self._failed[version]}")
+                return {"version": current, "swapped": False, "error": self._failed[version]}
+
+            self.shadow.set_challenger(ref)
+            print(f"[registry] Shadow scoring with challenger {version} (was {current})")
+            return {"version": version, "swapped": True, "error": None}
+
+    def forget_failure(self, version: str):
+        with self._sync_lock:
+            self._failed.pop(version, None)
@@ -0,0 +1,63 @@
+# backend/app/responses.py
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def dumps(content) -> bytes:
+    """
+    Encode plain Python data (dicts/lists/str/float/bool/None, numpy scalars) to JSON bytes.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def _default(value):
+    # numpy scalars / arrays when orjson is not installed
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def ndjson_line(content) -> bytes:
+    return dumps(content) + b"\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson, skipping jsonable_encoder.
+    Only use it for content that is already plain data (like the analysed rows).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def pool_full_response(file_name: str, error: Exception) -> JSONResponse:
+    print(f"[analyze] Rejecting upload: {error}")
+    return JSONResponse(
+        {
+            "error": "Server is busy, please retry shortly.",
+            "fileName": file_name,
+        },
+        status_code=429,
+        headers={"Retry-After": "1"},
+    )
+
+
+def no_transactions_response(file_name: str) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "No transactions found or parse error.",
+            "fileName": file_name,
+        },
+        status_code=400,
+    )
@@ -1,6 +1,6 @@
 # backend/app/schemas.py
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 class StatementRow(BaseModel):
     date: str
@@ -17,3 +17,14 @@ class StatementRow(BaseModel):
 class AnalyzeResponse(BaseModel):
     status: str
     rows: List[StatementRow]
+
+class OperatingPointRequest(BaseModel):
+    # Either a threshold, or an objective ("f1" / "cost") picked from the saved curve;
+    # neither => back to the threshold the model was trained with
+    threshold: Optional[float] = None
+    objective: Optional[str] = None
+    alert_cost: Optional[float] = None
+    fraud_cost: Optional[float] = None
+
+class TransactionLabelRequest(BaseModel):
+    is_fraud: bool
@@ -0,0 +1,129 @@
+# backend/app/scoring.py
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.behavior import BEHAVIOR_DEFAULTS, BEHAVIOR_FEATURES
+
+# Columns the training pipeline was fitted on (see app/ml/train_model.py); models
+# trained before the behavioral features simply ignore those columns
+FEATURE_COLUMNS = [
+    "amt",
+    "category",
+    "gender",
+    "state",
+    "city_pop",
+    "hour",
+    "day_of_week",
+    "distance",
+] + BEHAVIOR_FEATURES
+
+# Defaults used when parse_statement did not provide a column
+FEATURE_DEFAULTS = {
+    "gender": "U",
+    "state": "XX",
+    "city_pop": 1000.0,
+    "hour": 0,
+    "day_of_week": 0,
+    "distance": 0.5,
+    **BEHAVIOR_DEFAULTS,
+}
+
+
+def build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the model input for every parsed row at once.
+    Mirrors the per-row construction the API used to do:
+      - amt => float (unparseable => 0.0)
+      - category => lowercase, spaces replaced by underscores
+      - everything else taken as-is, or filled with FEATURE_DEFAULTS
+    """
+    n = len(df)
+    features = {}
+
+    if "amt" in df.columns:
+        features["amt"] = pd.to_numeric(df["amt"], errors="coerce").fillna(0.0).astype(float).to_numpy()
+    else:
+        features["amt"] = np.zeros(n, dtype=float)
+
+    if "category" in df.columns:
+        features["category"] = df["category"].astype(str).str.lower().str.replace(" ", "_", regex=False).to_numpy()
+    else:
+        features["category"] = np.full(n, "", dtype=object)
+
+    for col, default in FEATURE_DEFAULTS.items():
+        if col in df.columns:
+            features[col] = df[col].to_numpy()
+        else:
+            features[col] = np.full(n, default)
+
+    return pd.DataFrame(features, columns=FEATURE_COLUMNS)
+
+
+def render_explanation(probability: float, threshold: float, flagged: bool) -> str:
+    """
+    Human-readable explanation of one score (same wording as the original per-row path).
+    """
+    if flagged:
+        return f"Fraud probability={probability:.2f} >= threshold={threshold:.2f}"
+    return f"No fraud (prob={probability:.2f} < threshold={threshold:.2f})"
+
+
+def format_explanations(probs: np.ndarray, is_fraud: np.ndarray, threshold: float) -> list:
+    """
+    Explanation per row of a batch.
+    """
+    return [render_explanation(p, threshold, flagged) for p, flagged in zip(probs.tolist(), is_fraud.tolist())]
+
+
+def explanation_for(explanation, probability, threshold, flagged):
+    """
+    Explanation of a stored transaction: rendered from its probability + threshold,
+    or the text stored before thresholds were (None if neither is there).
+    """
+    if explanation is not None:
+        return explanation
+    if probability is None or threshold is None:
+        return None
+    return render_explanation(probability, threshold, bool(flagged))
+
+
+def score_transactions(model, threshold: float, df: pd.DataFrame) -> dict:
+    """
+    Score every parsed transaction with a single predict_proba call.
+    Returns arrays aligned with df's rows:
+      - probabilities (float)
+      - is_fraud (bool)
+      - explanations (str)
+      - threshold (float, the decision threshold)
+      - amounts (float, as fed to the model)
+      - score_seconds (time spent in feature building + predict_proba)
+    """
+    start = time.perf_counter()
+    X = build_feature_frame(df)
+    if X.empty:
+        probs = np.zeros(0, dtype=float)
+    else:
+        probs = model.predict_proba(X)[:, 1]
+    is_fraud = probs >= threshold
+
+    return {
+        "probabilities": probs,
+        "is_fraud": is_fraud,
+        "explanations": format_explanations(probs, is_fraud, threshold),
+        "threshold": float(threshold),
+        "amounts": X["amt"].to_numpy(),
+        "score_seconds": time.perf_counter() - start,
+    }
+
+
+def score_chunks(model, threshold: float, chunks):
+    """
+    Score parsed chunks as they arrive (e.g. from parse_statement.iter_statement).
+    Yields (chunk, scores) with scores as returned by score_transactions.
+    """
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        yield chunk, score_transactions(model, threshold, chunk)
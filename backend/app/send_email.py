@@ -1,31 +1,152 @@
 # backend/app/send_email.py
+"""
+Email transports for fraud alerts (app/alerts.py delivers through one, chosen by
+ALERT_TRANSPORT):
+  - sendgrid => SendGrid API, one client reused for every message
+  - smtp     => an SMTP server (SMTP_HOST; a local test server works too), the
+                connection is kept open between messages and reopened when dropped
+  - file     => every message written as a .eml file to ALERT_FILE_DIR (testing)
+
+send() raises on failure so the caller can retry; close() releases the connection.
+"""
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import smtplib
+import uuid
+from datetime import datetime
+from email.message import EmailMessage
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "example@domain.com")
 
-def send_fraud_alert(to_email: str, explanation: str):
-    """
-    Sends an email alert if fraud is detected.
-    """
-    if not SENDGRID_API_KEY or not to_email:
-        print("[send_email] Missing SendGrid API key or to_email, skipping.")
-        return
-
-    message = Mail(
-        from_email=FROM_EMAIL,
-        to_emails=to_email,
-        subject="[FRAUD ALERT] Suspicious Transaction Detected",
-        html_content=f"""
-        <h1>Fraud Alert</h1>
-        <p>{explanation}</p>
-        """
-    )
-    try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
+SMTP_HOST = os.getenv("SMTP_HOST")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+# 0 => plain connection (e.g. a local test server)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+
+ALERT_FILE_DIR = os.getenv("ALERT_FILE_DIR", "alerts_outbox")
+
+
+def _email_message(to_email: str, subject: str, html: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = FROM_EMAIL
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+class SendGridTransport:
+    name = "sendgrid"
+
+    def __init__(self, api_key: str = SENDGRID_API_KEY, from_email: str = FROM_EMAIL):
+        self.api_key = api_key
+        self.from_email = from_email
+        self._client = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    def send(self, to_email: str, subject: str, html: str):
+        # Imported here: most statements have no fraud, so most processes never need it
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail
+
+        if self._client is None:
+            self._client = SendGridAPIClient(self.api_key)
+        message = Mail(from_email=self.from_email, to_emails=to_email, subject=subject, html_content=html)
+        response = self._client.send(message)
         print("[send_email] Status:", response.status_code)
-    except Exception as e:
-        print("[send_email] Error sending email:", e)
+
+    def close(self):
+        self._client = None
+
+
+class SmtpTransport:
+    name = "smtp"
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, user: str = SMTP_USER,
+                 password: str = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS, timeout: float = SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections = 0
+        self._conn = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host)
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.user:
+            conn.login(self.user, self.password or "")
+        self.connections += 1
+        return conn
+
+    def send(self, to_email: str, subject: str, html: str):
+        message = _email_message(to_email, subject, html)
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = self._connect()
+            try:
+                self._conn.send_message(message)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The server closed an idle connection => reconnect once
+                self._conn = None
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+
+class FileTransport:
+    name = "file"
+
+    def __init__(self, directory: str = ALERT_FILE_DIR):
+        self.directory = directory
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    def send(self, to_email: str, subject: str, html: str):
+        os.makedirs(self.directory, exist_ok=True)
+        file_name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}.eml"
+        with open(os.path.join(self.directory, file_name), "wb") as f:
+            f.write(bytes(_email_message(to_email, subject, html)))
+
+    def close(self):
+        pass
+
+
+TRANSPORTS = {
+    "sendgrid": SendGridTransport,
+    "smtp": SmtpTransport,
+    "file": FileTransport,
+}
+
+
+def make_transport(name: str):
+    try:
+        return TRANSPORTS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown alert transport {name!r} (expected one of {', '.join(TRANSPORTS)})")
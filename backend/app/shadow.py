@@ -0,0 +1,256 @@
+# backend/app/shadow.py
+"""
+Champion/challenger shadow scoring.
+
+When the registry names a CHALLENGER (app/registry.py), every freshly scored batch
+is scored by it too and one shadow_scores row per transaction records both
+probabilities, both decisions and both scoring times. The response always uses
+the champion.
+
+SHADOW_MODE:
+  - background => after the rows are stored, the parsed batch is scored in a
+                  separate small pool, so the response waits for nothing (batches
+                  are dropped, not queued, when that pool is full)
+  - inline     => the worker scores the batch with both models before answering
+                  (the challenger's time is added to the request)
+  - off        => no shadow scoring, even with a CHALLENGER set
+"""
+import os
+import threading
+import traceback
+import uuid
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import ShadowScore
+from app.workers import WORKER_MODE, ModelRef, PoolFullError, WorkerPool, score_with_model
+
+SHADOW_MODE = os.getenv("SHADOW_MODE", "background")
+SHADOW_POOL_SIZE = int(os.getenv("SHADOW_POOL_SIZE", "1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "8"))
+
+
+def shadow_rows(tx_ids: list, scores: dict, challenger: dict, mode: str) -> list:
+    """
+    shadow_scores column values for one batch scored by champion (scores, from
+    score_transactions) and challenger (from score_with_model).
+    """
+    batch_id = uuid.uuid4().hex
+    champion_ms = scores["score_seconds"] * 1000
+    challenger_ms = challenger["score_seconds"] * 1000
+    rows = []
+    for tx_id, p_champion, f_champion, p_challenger, f_challenger in zip(
+        tx_ids,
+        scores["probabilities"].tolist(),
+        scores["is_fraud"].tolist(),
+        challenger["probabilities"].tolist(),
+        challenger["is_fraud"].tolist(),
+    ):
+        rows.append({
+            "transaction_id": tx_id,
+            "batch_id": batch_id,
+            "mode": mode,
+            "champion_version": scores["model_version"],
+            "challenger_version": challenger["version"],
+            "champion_probability": p_champion,
+            "challenger_probability": p_challenger,
+            "champion_fraud": f_champion,
+            "challenger_fraud": f_challenger,
+            "agree": f_champion == f_challenger,
+            "champion_ms": champion_ms,
+            "challenger_ms": challenger_ms,
+        })
+    return rows
+
+
+def shadow_report(db: Session, challenger_version: str = None) -> list:
+    """
+    Per (champion, challenger, mode): rows compared, decision agreement, flagged
+    counts of each model, probability deltas (challenger - champion) and average
+    scoring time per batch. Inline mode adds the challenger's time to the request;
+    background mode adds nothing to it.
+    """
+    delta = ShadowScore.challenger_probability - ShadowScore.champion_probability
+    key = [ShadowScore.champion_version, ShadowScore.challenger_version, ShadowScore.mode]
+    query = select(
+        *key,
+        func.count().label("rows"),
+        func.sum(case((ShadowScore.agree, 1), else_=0)).label("agree"),
+        func.sum(case((ShadowScore.champion_fraud, 1), else_=0)).label("champion_flagged"),
+        func.sum(case((ShadowScore.challenger_fraud, 1), else_=0)).label("challenger_flagged"),
+        func.avg(delta).label("mean_delta"),
+        func.avg(func.abs(delta)).label("mean_abs_delta"),
+        func.max(func.abs(delta)).label("max_abs_delta"),
+    ).group_by(*key)
+    if challenger_version is not None:
+        query = query.where(ShadowScore.challenger_version == challenger_version)
+
+    # Scoring times are per batch, so average them over batches, not rows
+    batches = select(
+        *key,
+        func.max(ShadowScore.champion_ms).label("champion_ms"),
+        func.max(ShadowScore.challenger_ms).label("challenger_ms"),
+        func.count().label("batch_rows"),
+    ).group_by(ShadowScore.batch_id, *key)
+    if challenger_version is not None:
+        batches = batches.where(ShadowScore.challenger_version == challenger_version)
+    batches = batches.subquery()
+    timing = {
+        (row.champion_version, row.challenger_version, row.mode): row
+        for row in db.execute(select(
+            batches.c.champion_version,
+            batches.c.challenger_version,
+            batches.c.mode,
+            func.count().label("batches"),
+            func.avg(batches.c.champion_ms).label("champion_ms"),
+            func.avg(batches.c.challenger_ms).label("challenger_ms"),
+            func.avg(batches.c.batch_rows).label("rows_per_batch"),
+        ).group_by(batches.c.champion_version, batches.c.challenger_version, batches.c.mode))
+    }
+
+    report = []
+    for row in db.execute(query):
+        times = timing.get((row.champion_version, row.challenger_version, row.mode))
+        champion_ms = float(times.champion_ms or 0.0) if times else 0.0
+        challenger_ms = float(times.challenger_ms or 0.0) if times else 0.0
+        report.append({
+            "champion_version": row.champion_version,
+            "challenger_version": row.challenger_version,
+            "mode": row.mode,
+            "rows": row.rows,
+            "batches": times.batches if times else 0,
+            "rows_per_batch": round(float(times.rows_per_batch or 0.0), 1) if times else 0.0,
+            "agreement_rate": round(row.agree / row.rows, 4) if row.rows else None,
+            "champion_flagged": row.champion_flagged,
+            "challenger_flagged": row.challenger_flagged,
+            "probability_delta": {
+                "mean": round(float(row.mean_delta or 0.0), 6),
+                "mean_abs": round(float(row.mean_abs_delta or 0.0), 6),
+                "max_abs": round(float(row.max_abs_delta or 0.0), 6),
+            },
+            "latency_ms": {
+                "champion_per_batch": round(champion_ms, 3),
+                "challenger_per_batch": round(challenger_ms, 3),
+                "added_to_request": round(challenger_ms, 3) if row.mode == "inline" else 0.0,
+                "relative_cost": round(challenger_ms / champion_ms, 3) if champion_ms else None,
+            },
+        })
+    return report
+
+
+class ShadowScorer:
+    """
+    Scores batches with the challenger model (set by the registry's ModelWatcher)
+    and stores the comparison. Background mode runs its own WorkerPool so shadow
+    work never takes a worker away from live requests.
+    """
+
+    def __init__(self, worker_pool: WorkerPool, mode: str = SHADOW_MODE,
+                 pool_size: int = SHADOW_POOL_SIZE, queue_size: int = SHADOW_QUEUE_SIZE):
+        self.worker_pool = worker_pool
+        self.mode = mode
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.challenger = None
+        self.pool = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "rows": 0, "dropped": 0, "failed": 0}
+
+    def start(self):
+        if self.mode == "background":
+            self.pool = WorkerPool(
+                max_workers=self.pool_size, max_queue=self.queue_size, mode=WORKER_MODE,
+                model_ref=self.worker_pool.active_model,
+            )
+            self.pool.start()
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def set_challenger(self, model_ref: ModelRef = None):
+        with self._lock:
+            self.challenger = model_ref
+
+    def warm_up(self, model_ref: ModelRef, timeout: float = None):
+        """
+        Load + test-score the challenger where it will run.
+        """
+        pool = self.pool if self.pool is not None else self.worker_pool
+        return pool.warm_up(model_ref, timeout=timeout)
+
+    def _active_challenger(self, champion_version: str):
+        challenger = self.challenger
+        if self.mode == "off" or challenger is None or challenger.version == champion_version:
+            return None
+        return challenger
+
+    def inline_ref(self, champion_ref: ModelRef):
+        """
+        The challenger to pass to the scoring task in inline mode, else None.
+        """
+        if self.mode != "inline":
+            return None
+        return self._active_challenger(champion_ref.version)
+
+    def record(self, df, scores: dict, output_rows: list):
+        """
+        Call once the batch's rows are committed (output_rows carry their ids).
+        Inline => store the comparison now; background => queue the challenger.
+        """
+        if scores is None:
+            return
+        tx_ids = [row.get("id") for row in output_rows]
+        if "challenger" in scores:
+            self._store(tx_ids, scores, scores["challenger"], "inline")
+            return
+        challenger = self._active_challenger(scores.get("model_version"))
+        if self.mode != "background" or challenger is None or self.pool is None:
+            return
+        try:
+            future = self.pool.submit(score_with_model, df, challenger)
+        except PoolFullError:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        future.add_done_callback(lambda f: self._store_future(f, tx_ids, scores))
+
+    def _store_future(self, future, tx_ids: list, scores: dict):
+        if future.cancelled() or future.exception() is not None:
+            print(f"[shadow] Challenger scoring failed: {future.exception() if not future.cancelled() else 'cancelled'}")
+            with self._lock:
+                self._stats["failed"] += 1
+            return
+        self._store(tx_ids, scores, future.result(), "background")
+
+    def _store(self, tx_ids: list, scores: dict, challenger: dict, mode: str):
+        rows = shadow_rows(tx_ids, scores, challenger, mode)
+        if not rows:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(insert(ShadowScore), rows)
+            db.commit()
+            with self._lock:
+                self._stats["batches"] += 1
+                self._stats["rows"] += len(rows)
+        except Exception:
+            traceback.print_exc()
+            db.rollback()
+            with self._lock:
+                self._stats["failed"] += 1
+        finally:
+            db.close()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            "mode": self.mode,
+            "challenger": self.challenger.version if self.challenger is not None else None,
+            **stats,
+            "pool": self.pool.metrics() if self.pool is not None else None,
+        }
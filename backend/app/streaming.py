@@ -0,0 +1,187 @@
+# backend/app/streaming.py
+import traceback
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from app.alerts import AlertDispatcher, queue_alert
+from app.cache import ResultCache
+from app.database import SessionLocal, run_write
+from app.dedup import fingerprint_index
+from app.feature_store import CustomerFeatureStore
+from app.persistence import reserve_transaction_ids
+from app.pipeline import build_result_rows, cached_statement, store_rows, stored_fraud_details, write_statement
+from app.responses import NDJSON_MEDIA_TYPE, ndjson_line, no_transactions_response, pool_full_response
+from app.shadow import ShadowScorer
+from app.uploads import SpooledUpload
+from app.workers import ModelRef, PoolFullError, WorkerPool, stream_parse_and_score
+
+
+def _summary(file_name: str, rows: list, cached: bool, statement_id: str = None, duplicates: int = 0) -> dict:
+    return {
+        "type": "summary",
+        "status": "ok",
+        "fileName": file_name,
+        "rows": len(rows),
+        "fraud_count": sum(1 for row in rows if row.get("fraud_detected") and "duplicate_of" not in row),
+        "duplicates": duplicates,
+        "cached": cached,
+        "statementId": statement_id,
+    }
+
+
+async def _prepend(first, rest):
+    yield first
+    async for item in rest:
+        yield item
+
+
+async def stream_analysis(
+    upload: SpooledUpload,
+    file_name: str,
+    contact_email: str,
+    worker_pool: WorkerPool,
+    result_cache: ResultCache,
+    key: str,
+    model_ref: ModelRef,
+    shadow: ShadowScorer,
+    feature_store: CustomerFeatureStore,
+    customer: str = None,
+    alerts: AlertDispatcher = None,
+):
+    """
+    NDJSON mode of /analyze-statement. Emits one {"type": "rows"} record per scored
+    chunk as soon as it has transaction ids, then a {"type": "summary"} record with
+    fraud counts. Ids are reserved from the id sequence per chunk and all rows are
+    inserted after the last chunk, so no DB connection is held while pages are parsed
+    (without a sequence, i.e. SQLite, chunks are inserted in one open transaction).
+    The first chunk is awaited before answering, so "pool full" and "nothing parsed"
+    still come back as 429 / 400. Every chunk is scored with model_ref, even if the
+    active model changes mid-stream. Chunks go to the shadow scorer and into the
+    customer's history (feature_store) after the final commit, which also commits the
+    fraud alert (sent by `alerts`). Rows the customer already stored (app/dedup.py)
+    are not scored: each chunk's are reported in a {"type": "duplicates"} record
+    instead. Rows a concurrent upload stored first are found at the final commit and
+    reported the same way, with the "id" they were streamed with (not stored).
+    Takes ownership of `upload`.
+    """
+    lock = result_cache.lock_for(key)
+    await lock.acquire()
+
+    def release():
+        lock.release()
+        upload.cleanup()
+
+    try:
+        cached = await run_in_threadpool(result_cache.get, key)
+        if cached is not None:
+            rows, duplicates = cached_statement(cached["rows"], customer)
+
+            async def cached_body():
+                try:
+                    if duplicates:
+                        yield ndjson_line({"type": "duplicates", "duplicates": duplicates})
+                    yield ndjson_line({"type": "rows", "rows": rows})
+                    yield ndjson_line(_summary(file_name, rows, True, duplicates=len(duplicates)))
+                finally:
+                    release()
+
+            return StreamingResponse(cached_body(), media_type=NDJSON_MEDIA_TYPE)
+
+        profile = await run_in_threadpool(feature_store.get, customer)
+        batches = worker_pool.stream(
+            stream_parse_and_score, upload.source, upload.file_type, model_ref, shadow.inline_ref(model_ref), profile,
+            customer,
+        )
+        try:
+            first = await batches.__anext__()
+        except PoolFullError as e:
+            release()
+            return pool_full_response(file_name, e)
+        except StopAsyncIteration:
+            release()
+            return no_transactions_response(file_name)
+    except BaseException:
+        release()
+        raise
+
+    async def body():
+        all_rows = []
+        pending_rows = []  # db rows with reserved ids, inserted after the last chunk
+        pending_fingerprints = []
+        claimed = {}  # fingerprints stored without an id sequence, cached after the commit
+        duplicates = []  # rows split off as already stored, cached with the statement
+        raced = 0  # rows a concurrent upload stored first (in all_rows, with "duplicate_of")
+        fraud_details = []
+        scored_chunks = []
+        db = None  # only without an id sequence
+        statement_id = uuid.uuid4().hex
+        try:
+            async for chunk, scores in _prepend(first, batches):
+                if scores["duplicates"]:
+                    duplicates.extend(scores["duplicates"])
+                    yield ndjson_line({"type": "duplicates", "duplicates": scores["duplicates"]})
+                if chunk.empty:
+                    continue
+                output_rows, db_rows, details = build_result_rows(chunk, scores, statement_id, customer)
+                fingerprints = scores.get("fingerprints")
+                tx_ids = await run_write(reserve_transaction_ids, len(db_rows)) if db is None else None
+                if tx_ids is None:
+                    if db is None:
+                        db = SessionLocal()
+                    stored, lost = await run_in_threadpool(store_rows, db, output_rows, db_rows, False, fingerprints)
+                    claimed.update(stored)
+                    raced += len(lost)
+                    details = stored_fraud_details(details, db_rows, lost)
+                else:
+                    for out_row, db_row, tx_id in zip(output_rows, db_rows, tx_ids):
+                        out_row["id"] = db_row["id"] = tx_id
+                    pending_rows.extend(db_rows)
+                    pending_fingerprints.extend(fingerprints or [])
+                all_rows.extend(output_rows)
+                fraud_details.extend(details)
+                scored_chunks.append((chunk, scores, output_rows))
+                yield ndjson_line({"type": "rows", "rows": output_rows})
+
+            # One commit for the whole statement and its alert, then cache
+            if db is None:
+                _, queued = await run_write(
+                    write_statement, pending_rows, fraud_details, contact_email, file_name,
+                    pending_fingerprints or None, all_rows,
+                )
+                lost = [
+                    {"id": db_row["id"], "date": row["date"], "merchant": row["merchant"], "amount": row["amount"],
+                     "duplicate_of": row["duplicate_of"]}
+                    for row, db_row in zip(all_rows, pending_rows)
+                    if "duplicate_of" in row
+                ]
+                if lost:
+                    raced += len(lost)
+                    yield ndjson_line({"type": "duplicates", "duplicates": lost})
+            else:
+                queued = queue_alert(db, contact_email, fraud_details, file_name)
+                await run_in_threadpool(db.commit)
+                fingerprint_index.remember(claimed)
+            if queued and alerts is not None:
+                alerts.notify()
+            for chunk, scores, output_rows in scored_chunks:
+                await run_in_threadpool(shadow.record, chunk, scores, output_rows)
+                await run_in_threadpool(feature_store.record, customer, chunk)
+            await run_in_threadpool(result_cache.put, key, None, None, all_rows + duplicates)
+            yield ndjson_line(_summary(file_name, all_rows, False, statement_id, len(duplicates) + raced))
+        except Exception as e:
+            traceback.print_exc()
+            if db is not None:
+                await run_in_threadpool(db.rollback)
+            yield ndjson_line({
+                "type": "error",
+                "error": f"Analysis failed, nothing was saved: {e}",
+                "fileName": file_name,
+            })
+        finally:
+            await batches.aclose()
+            if db is not None:
+                await run_in_threadpool(db.close)
+            release()
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE)
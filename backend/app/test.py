@@ -1,10 +1,14 @@
 import os
+import sys
 import json
 import pandas as pd
 import joblib
 
+# Make the `app` package importable when run as `python test.py` from backend/app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Import your PDF parser from parse_statement.py
-from parse_statement import parse_statement
+from app.parse_statement import parse_statement
 
 def main():
     # Load the trained model and threshold
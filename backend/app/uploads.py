@@ -0,0 +1,186 @@
+# backend/app/uploads.py
+import hashlib
+import io
+import os
+import tempfile
+
+from fastapi import UploadFile
+from starlette.responses import JSONResponse
+
+# Uploads up to this size stay in memory; bigger ones spill to a temp file
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+# Hard limit for one upload (rejected with 413)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR", tempfile.gettempdir())
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Endpoints that receive statement uploads
+UPLOAD_PATHS = ("/analyze-statement", "/jobs")
+
+
+class UploadTooLargeError(Exception):
+    """
+    Raised when an upload exceeds UPLOAD_MAX_BYTES.
+    """
+
+
+class SpooledUpload:
+    """
+    An uploaded statement, kept in memory up to `max_memory` bytes and spilled to a
+    temp file beyond that. Hashes the bytes as they are written.
+    `source` is what parse_statement takes: bytes, or the path of the spilled file.
+    Always call cleanup() (or use it as a context manager) to remove the temp file.
+    """
+
+    def __init__(self, file_name: str, max_memory: int = UPLOAD_SPOOL_MAX_BYTES,
+                 max_bytes: int = UPLOAD_MAX_BYTES):
+        self.file_name = file_name
+        self.file_type = os.path.splitext(file_name or "")[1].lower()
+        self.max_memory = max_memory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.path = None
+        self._buffer = io.BytesIO()
+        self._file = None
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+        self._digest.update(chunk)
+        if self._file is None and self.size > self.max_memory:
+            self._spill()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer.write(chunk)
+
+    def _spill(self):
+        fd, self.path = tempfile.mkstemp(suffix=self.file_type, dir=UPLOAD_TMP_DIR)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer.getvalue())
+        self._buffer = None
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    @property
+    def source(self):
+        return self.path if self.spilled else self._buffer.getvalue()
+
+    def cleanup(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+        self._buffer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def spool_upload(file: UploadFile, max_memory: int = UPLOAD_SPOOL_MAX_BYTES,
+                 max_bytes: int = UPLOAD_MAX_BYTES) -> SpooledUpload:
+    """
+    Read an UploadFile chunk by chunk into a SpooledUpload.
+    Raises UploadTooLargeError (after cleaning up) once max_bytes is exceeded.
+    """
+    upload = SpooledUpload(file.filename, max_memory=max_memory, max_bytes=max_bytes)
+    try:
+        while True:
+            chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            upload.write(chunk)
+        upload.finish()
+    except Exception:
+        upload.cleanup()
+        raise
+    return upload
+
+
+def upload_too_large_response(file_name: str = None) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": f"Upload too large (limit {UPLOAD_MAX_BYTES} bytes).",
+            "fileName": file_name,
+        },
+        status_code=413,
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware rejecting oversized uploads before the body is parsed:
+      1) Content-Length above the limit => 413 without reading the body.
+      2) Otherwise count body bytes as they arrive and stop at the limit
+         (covers chunked requests without Content-Length).
+    """
+
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BYTES, paths=UPLOAD_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        # Allow a little slack for the multipart envelope around the file
+        limit = self.max_bytes + 64 * 1024
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await upload_too_large_response()(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLargeError(f"Request body exceeds {limit} bytes")
+            return message
+
+        async def limited_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The body parser turned our error into its own response; answer 413 instead
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await upload_too_large_response()(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except UploadTooLargeError:
+            if response_started:
+                raise
+            await upload_too_large_response()(scope, receive, send)
@@ -0,0 +1,499 @@
+# backend/app/workers.py
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional
+
+from app import compiled_model
+from app.behavior import BEHAVIOR_MAX_KEYS, add_behavior_features, merge_profiles, statement_profile
+from app.database import SessionLocal, engine
+from app.dedup import DEDUP, StatementDeduplicator, fingerprint_index, shared_cache
+from app.parse_statement import iter_statement, parse_statement
+from app.persistence import update_job
+from app.scoring import score_transactions
+
+# "process" => CPU-bound work runs in separate processes (default)
+# "thread"  => run in a thread pool inside the API process (dev / debugging)
+WORKER_MODE = os.getenv("WORKER_MODE", "process")
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", str(os.cpu_count() or 1)))
+# How many jobs may wait for a free worker before we answer 429
+WORKER_QUEUE_SIZE = int(os.getenv("WORKER_QUEUE_SIZE", str(WORKER_POOL_SIZE * 4)))
+MODEL_PATH = os.getenv("MODEL_PATH", "app/ml/rf_model.pkl")
+# "compiled" => NumPy tree-ensemble engine (app/compiled_model.py), "sklearn" => pipeline.predict_proba
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "compiled")
+# "1" => workers load the model when they start instead of on their first task
+WORKER_PRELOAD_MODEL = os.getenv("WORKER_PRELOAD_MODEL", "0") == "1"
+
+
+class PoolFullError(Exception):
+    """
+    Raised when every worker is busy and the wait queue is full.
+    """
+
+
+# Loaded models kept per worker; 2 => the active one plus the one being swapped in/out
+WORKER_MODEL_SLOTS = int(os.getenv("WORKER_MODEL_SLOTS", "2"))
+
+
+class ModelRef(NamedTuple):
+    """
+    Which model a task should score with. version names it (registry version, or
+    the artifact hash for a plain MODEL_PATH); checksum is the artifact hash that
+    an exported compiled forest must match; threshold (if set) replaces the one
+    saved with the model (operating point chosen in the registry).
+    """
+    version: str
+    path: str
+    checksum: Optional[str] = None
+    threshold: Optional[float] = None
+
+    @property
+    def tag(self) -> str:
+        """
+        version plus the operating point, e.g. for result cache keys.
+        """
+        return self.version if self.threshold is None else f"{self.version}@{self.threshold:.6g}"
+
+
+# Per-worker state: set by _init_worker, models loaded on first use (_get_model)
+_worker_default_ref = None
+_worker_models = OrderedDict()  # version => (model, threshold), least recently used first
+_worker_model_lock = threading.Lock()
+
+
+def model_version(model_path: str) -> str:
+    """
+    Short content hash of the model artifact; changes whenever the model is retrained.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        return "unknown"
+    return digest.hexdigest()[:12]
+
+
+def model_ref_for_path(model_path: str) -> ModelRef:
+    version = model_version(model_path)
+    return ModelRef(version=version, path=model_path, checksum=version)
+
+
+def _init_worker(model_ref: ModelRef, forked: bool = False, dedup_cache=None):
+    """
+    Runs once in every worker: remember the pool's model at start-up (loaded on the
+    first task, or right away with WORKER_PRELOAD_MODEL=1).
+    Forked workers also drop the DB connections inherited from the parent.
+    dedup_cache: the fingerprint cache shared with the API (app/dedup.py).
+    """
+    global _worker_default_ref
+    if forked:
+        engine.dispose(close=False)
+    if dedup_cache is not None:
+        fingerprint_index.use_cache(dedup_cache)
+    _worker_default_ref = model_ref
+    if WORKER_PRELOAD_MODEL:
+        _get_model(model_ref)
+
+
+def _resolve_ref(model_ref: ModelRef = None) -> ModelRef:
+    return model_ref or _worker_default_ref or model_ref_for_path(MODEL_PATH)
+
+
+def _get_model(model_ref: ModelRef = None):
+    """
+    (model, threshold) for model_ref (default: the pool's model at start-up), loading
+    it on first use. Up to WORKER_MODEL_SLOTS models stay loaded, so tasks still on
+    the previous version keep working while a new one is swapped in. With the
+    compiled engine the forest arrays are memory-mapped, so this is cheap and shared.
+    """
+    ref = _resolve_ref(model_ref)
+    with _worker_model_lock:
+        loaded = _worker_models.get(ref.version)
+        if loaded is None:
+            loaded = compiled_model.load_model(ref.path, INFERENCE_ENGINE, ref.checksum or model_version(ref.path))
+            _worker_models[ref.version] = loaded
+            while len(_worker_models) > max(1, WORKER_MODEL_SLOTS):
+                _worker_models.popitem(last=False)
+        else:
+            _worker_models.move_to_end(ref.version)
+    model, threshold = loaded
+    return model, (threshold if ref.threshold is None else ref.threshold)
+
+
+def warm_up_model(model_ref: ModelRef) -> dict:
+    """
+    Worker task: load model_ref and score a small synthetic batch, so a broken
+    artifact is caught before it serves traffic.
+    """
+    import pandas as pd
+
+    model, threshold = _get_model(model_ref)
+    # Shaped like parse_statement's output; features it does not set get their defaults
+    df = pd.DataFrame({
+        "merchant": ["Warm-up Store", "Warm-up Travel"],
+        "category": ["grocery_pos", "travel"],
+        "amt": [12.5, 950.0],
+        "currency": ["USD", "USD"],
+        "transaction_type": ["Purchase", "Online"],
+    })
+    scores = score_transactions(model, threshold, df)
+    probabilities = [float(p) for p in scores["probabilities"]]
+    if not all(0.0 <= p <= 1.0 for p in probabilities):
+        raise ValueError(f"Model {model_ref.version} returned invalid probabilities {probabilities}")
+    return {"version": model_ref.version, "pid": os.getpid(), "probabilities": probabilities}
+
+
+def _timed_call(fn, *args):
+    """
+    Wrapper executed inside the worker. Reports when the task actually started
+    so the parent can compute how long it waited in the queue.
+    """
+    started_at = time.time()
+    result = fn(*args)
+    return started_at, time.time() - started_at, result
+
+
+def _report_job_progress(job_id: str, **fields):
+    """
+    Write job progress straight from the worker, so pollers see it while parsing runs.
+    """
+    db = SessionLocal()
+    try:
+        update_job(db, job_id, **fields)
+    except Exception as e:
+        print(f"[workers] Could not update progress of job {job_id}: {e}")
+    finally:
+        db.close()
+
+
+def score_with_model(df, model_ref: ModelRef) -> dict:
+    """
+    Worker task (and inline helper) for shadow scoring: score already parsed rows
+    with model_ref. Returns {"version", "probabilities", "is_fraud", "score_seconds"}.
+    """
+    model, threshold = _get_model(model_ref)
+    scores = score_transactions(model, threshold, df)
+    return {
+        "version": model_ref.version,
+        "probabilities": scores["probabilities"],
+        "is_fraud": scores["is_fraud"],
+        "score_seconds": scores["score_seconds"],
+    }
+
+
+def parse_and_score(source, file_type: str = None, job_id: str = None, model_ref: ModelRef = None,
+                    challenger_ref: ModelRef = None, profile: dict = None, customer: str = None):
+    """
+    Worker task: parse the statement and score every row with model_ref (default:
+    the worker's model at start-up); scores["model_version"] names the version used.
+    profile is the customer's history (app/feature_store.py) for the behavioral
+    features; None => scored like a new customer's statement.
+    With a customer key, rows that customer already stored are not scored: df holds
+    the new rows, scores["duplicates"] the others and scores["fingerprints"] the new
+    rows' fingerprints (app/dedup.py).
+    With challenger_ref (inline shadow scoring) the rows are scored with it too,
+    into scores["challenger"] (see score_with_model).
+    source is a path or the raw uploaded bytes (then file_type gives the extension).
+    Returns (df, scores); scores is None when nothing was parsed.
+    If job_id is given, pages parsed / rows scored are recorded on that job.
+    """
+    progress = (
+        (lambda done, total: _report_job_progress(job_id, pages_parsed=done, pages_total=total))
+        if job_id is not None else None
+    )
+
+    df = parse_statement(source, progress=progress, file_type=file_type)
+    if df.empty:
+        return df, None
+    df, fingerprints, duplicates = StatementDeduplicator(customer).split(df)
+    if not df.empty:
+        df = add_behavior_features(df, profile)
+
+    model_ref = _resolve_ref(model_ref)
+    model, threshold = _get_model(model_ref)
+    scores = score_transactions(model, threshold, df)
+    scores["model_version"] = model_ref.version
+    scores["fingerprints"] = fingerprints
+    scores["duplicates"] = duplicates
+    if challenger_ref is not None and not df.empty:
+        scores["challenger"] = score_with_model(df, challenger_ref)
+    if job_id is not None:
+        _report_job_progress(job_id, rows_scored=len(df), rows_total=len(df))
+    return df, scores
+
+
+def stream_parse_and_score(source, file_type, model_ref, challenger_ref, profile, customer, out_queue):
+    """
+    Worker task for streaming: put (chunk, scores) on out_queue as soon as each
+    parsed chunk is scored with model_ref (and challenger_ref, if given), then None
+    once the statement is done (or failed). profile / customer: see parse_and_score
+    (a chunk of duplicates only comes through empty, with its scores["duplicates"]).
+    """
+    try:
+        model, threshold = _get_model(model_ref)
+        dedup = StatementDeduplicator(customer)
+        for chunk in iter_statement(source, file_type=file_type):
+            if chunk.empty:
+                continue
+            chunk, fingerprints, duplicates = dedup.split(chunk)
+            if not chunk.empty:
+                # Behavioral features; each chunk's rows count as history for the next ones
+                chunk = add_behavior_features(chunk, profile)
+                delta = statement_profile(chunk)
+                profile = merge_profiles(profile, delta, BEHAVIOR_MAX_KEYS) if profile is not None else delta
+            scores = score_transactions(model, threshold, chunk)
+            scores["model_version"] = model_ref.version
+            scores["fingerprints"] = fingerprints
+            scores["duplicates"] = duplicates
+            if challenger_ref is not None and not chunk.empty:
+                scores["challenger"] = score_with_model(chunk, challenger_ref)
+            out_queue.put((chunk, scores))
+    finally:
+        out_queue.put(None)
+
+
+class WorkerPool:
+    """
+    Bounded execution layer for parse_statement + scoring.
+    At most `max_workers` tasks run and at most `max_queue` wait; anything beyond
+    that is rejected with PoolFullError so the API can answer 429.
+    """
+
+    def __init__(self, max_workers: int = WORKER_POOL_SIZE, max_queue: int = WORKER_QUEUE_SIZE,
+                 mode: str = WORKER_MODE, model_path: str = MODEL_PATH, model_ref: ModelRef = None):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.mode = mode
+        self.model_path = model_path
+        # The model new requests are scored with; swapped by set_active_model (app/registry.py)
+        self.active_model = model_ref
+        self._executor = None
+        self._manager = None
+        # Process workers dedup against the cache the API remembers stored rows in
+        self._dedup_cache = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "run_time_total": 0.0,
+            "rebuilds": 0,
+        }
+
+    @property
+    def model_version(self) -> str:
+        if self.active_model is None:
+            self.active_model = model_ref_for_path(self.model_path)
+        return self.active_model.version
+
+    def set_active_model(self, model_ref: ModelRef):
+        """
+        Score new requests with model_ref. Tasks already submitted carry their own
+        ref, so they finish on the model they started with.
+        """
+        with self._lock:
+            self.active_model = model_ref
+
+    def warm_up(self, model_ref: ModelRef, timeout: float = None) -> list:
+        """
+        Load + test-score model_ref on the workers before it is activated.
+        The first warm-up task must succeed (its error is raised); one more task per
+        remaining worker is best effort, so most workers have the model loaded
+        before the swap. Thread workers share one model cache, so one task is enough.
+        """
+        first = self.submit(warm_up_model, model_ref)
+        others = []
+        if self.mode != "thread":
+            for _ in range(self.max_workers - 1):
+                try:
+                    others.append(self.submit(warm_up_model, model_ref))
+                except PoolFullError:
+                    break
+        reports = [first.result(timeout=timeout)]
+        done, _ = wait(others, timeout=timeout)
+        reports.extend(f.result() for f in done if f.exception() is None)
+        return reports
+
+    def _make_executor(self):
+        executor_cls = ThreadPoolExecutor if self.mode == "thread" else ProcessPoolExecutor
+        return executor_cls(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.active_model, self.mode != "thread", self._dedup_cache),
+        )
+
+    def start(self):
+        if self.active_model is None:
+            self.active_model = model_ref_for_path(self.model_path)
+        if self.mode != "thread" and DEDUP:
+            self._dedup_cache = shared_cache()
+            fingerprint_index.use_cache(self._dedup_cache)
+        self._executor = self._make_executor()
+        print(f"[workers] Started {self.mode} pool: workers={self.max_workers}, queue={self.max_queue}")
+
+    def _rebuild(self, broken):
+        """
+        Replace a process pool that lost a worker (killed by OOM, crashed in
+        native code): a broken ProcessPoolExecutor fails every later task. New
+        workers start with the active model. No-op if `broken` was already replaced.
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._make_executor()
+            self._stats["rebuilds"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        print(f"[workers] A worker process died; restarted the {self.mode} pool")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def submit(self, fn, *args):
+        """
+        Submit fn(*args) to the pool. Returns a concurrent.futures.Future resolving to
+        fn's result. Raises PoolFullError if the pool and its queue are full.
+        """
+        if self._executor is None:
+            raise RuntimeError("WorkerPool is not started")
+
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._stats["rejected"] += 1
+                raise PoolFullError(
+                    f"Worker pool full ({self._in_flight} in flight, limit {self.max_workers + self.max_queue})"
+                )
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        submitted_at = time.time()
+        executor = self._executor
+        try:
+            try:
+                inner = executor.submit(_timed_call, fn, *args)
+            except BrokenProcessPool:
+                self._rebuild(executor)
+                executor = self._executor
+                inner = executor.submit(_timed_call, fn, *args)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+
+        outer = Future()
+
+        def _done(f):
+            with self._lock:
+                self._in_flight -= 1
+                if f.cancelled() or f.exception() is not None:
+                    self._stats["failed"] += 1
+                else:
+                    started_at, run_time, _ = f.result()
+                    wait_time = max(0.0, started_at - submitted_at)
+                    self._stats["completed"] += 1
+                    self._stats["wait_time_total"] += wait_time
+                    self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+                    self._stats["run_time_total"] += run_time
+            if not f.cancelled() and isinstance(f.exception(), BrokenProcessPool):
+                # This task is lost with its worker; later ones go to a new pool
+                self._rebuild(executor)
+            if f.cancelled():
+                outer.cancel()
+            elif f.exception() is not None:
+                outer.set_exception(f.exception())
+            else:
+                outer.set_result(f.result()[2])
+
+        inner.add_done_callback(_done)
+        return outer
+
+    async def run(self, fn, *args):
+        """
+        Await fn(*args) on the pool without blocking the event loop.
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def make_queue(self):
+        """
+        A queue the workers can put results on: a manager queue for process
+        workers (started on first use), a plain queue.Queue for thread workers.
+        """
+        if self.mode == "thread":
+            return queue.Queue()
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager.Queue()
+
+    async def stream(self, fn, *args):
+        """
+        Async generator over the items fn(*args, out_queue) puts on its queue,
+        until it puts None. Errors raised in the worker are re-raised at the end.
+        Raises PoolFullError on the first iteration if the pool is full.
+        """
+        out_queue = self.make_queue()
+        future = self.submit(fn, *args, out_queue)
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, _next_item, out_queue, future)
+            if item is None:
+                break
+            yield item
+        await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+        completed = stats["completed"] or 1
+        return {
+            "mode": self.mode,
+            "inference_engine": INFERENCE_ENGINE,
+            "model_version": self.model_version,
+            # Operating point set in the registry (None => the threshold saved with the model)
+            "model_threshold": self.active_model.threshold if self.active_model is not None else None,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            # Tasks beyond the worker count are waiting for a free worker
+            "queue_depth": max(0, in_flight - self.max_workers),
+            "submitted": stats["submitted"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "rejected": stats["rejected"],
+            # Process pools restarted after a worker died
+            "rebuilds": stats["rebuilds"],
+            "wait_time_avg_ms": round(1000 * stats["wait_time_total"] / completed, 2),
+            "wait_time_max_ms": round(1000 * stats["wait_time_max"], 2),
+            "run_time_avg_ms": round(1000 * stats["run_time_total"] / completed, 2),
+        }
+
+
+def _next_item(out_queue, future, poll_interval: float = 0.5):
+    """
+    Blocking get that gives up (returns None) if the task ended without its sentinel,
+    e.g. because the worker process died.
+    """
+    while True:
+        try:
+            return out_queue.get(timeout=poll_interval)
+        except queue.Empty:
+            if future.done():
+                return None
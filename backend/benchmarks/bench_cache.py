@@ -0,0 +1,55 @@
+# backend/benchmarks/bench_cache.py
+"""
+Result cache hit latency vs. a full re-parse + re-score of the same upload.
+
+Run from backend/:
+    python -m benchmarks.bench_cache
+"""
+import glob
+import hashlib
+import json
+
+from app.cache import ResultCache, cache_key
+from app.parse_statement import parse_statement
+from app.pipeline import build_result_rows
+from app.scoring import score_transactions
+from benchmarks.common import load_benchmark_model, timed
+
+
+def main():
+    model, threshold = load_benchmark_model()
+    cache = ResultCache(use_db=False)
+
+    def full_path(path):
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        df = parse_statement(path)
+        scores = score_transactions(model, threshold, df)
+        output_rows, _, _ = build_result_rows(df, scores)
+        return cache_key(content_hash, "bench"), df, scores, output_rows
+
+    def hit_path(path):
+        with open(path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+        return cache.get(cache_key(content_hash, "bench"))
+
+    results = []
+    for path in sorted(glob.glob("app/sample_credit_card_fraud_transactions*.pdf")):
+        full_time, (key, df, scores, output_rows) = timed(full_path, path)
+        cache.put(key, df, scores, output_rows)
+        hit_time, entry = timed(hit_path, path, repeat=20)
+        results.append({
+            "file": path,
+            "rows": len(output_rows),
+            "full_parse_ms": round(1000 * full_time, 2),
+            "cache_hit_ms": round(1000 * hit_time, 3),
+            "speedup": round(full_time / hit_time, 1),
+            "hit": entry is not None,
+        })
+        print(json.dumps(results[-1]))
+
+    print(json.dumps({"status": "ok", "results": results, "cache": cache.metrics()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
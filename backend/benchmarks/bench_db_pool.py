@@ -0,0 +1,146 @@
+# backend/benchmarks/bench_db_pool.py
+"""
+Load test: statement uploads per second vs. concurrent uploads, for a small DB pool.
+
+Every simulated upload awaits a "parse" (--parse-ms, standing in for the worker
+pool's parsing/OCR) and then stores --rows transactions with store_and_notify:
+  - request_session => a session that touched the DB at the start of the request
+                       holds its connection through the parse (the old per-request
+                       session / chunk-by-chunk streaming transaction)
+  - write_phase     => app.database.run_write opens the session only for the writes
+  - write_phase_async => same on the asyncio engine (only with BENCH_ASYNC_DATABASE_URL,
+                       e.g. postgresql+asyncpg://...)
+
+Reports throughput, latency percentiles and the pool's checkout waits per level.
+Uses a file-backed SQLite database by default; point BENCH_DATABASE_URL at a
+local PostgreSQL to measure the real thing.
+
+Run from backend/:
+    python -m benchmarks.bench_db_pool [--pool-size 4] [--parse-ms 200] [--rows 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+
+from app import database
+from app.models import Base
+from app.pipeline import store_and_notify
+from benchmarks.bench_persistence import make_rows
+
+LEVELS = [1, 2, 4, 8, 16, 32]
+
+
+async def upload_request_session(parse_seconds: float, rows: list):
+    db = database.SessionLocal()
+    try:
+        await run_in_threadpool(db.execute, text("SELECT 1"))
+        await asyncio.sleep(parse_seconds)
+        await run_in_threadpool(store_and_notify, db, [{} for _ in rows], rows, [])
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def upload_write_phase(parse_seconds: float, rows: list):
+    await asyncio.sleep(parse_seconds)
+    await database.run_write(store_and_notify, [{} for _ in rows], rows, [])
+
+
+async def run_level(upload, concurrency: int, uploads: int, parse_seconds: float, rows: list):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await upload(parse_seconds, [dict(row) for row in rows])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+    return elapsed, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--parse-ms", type=float, default=200.0)
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--uploads-per-level", type=int, default=4, help="uploads = concurrency x this (min 16)")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    url = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir.name, 'bench.sqlite')}")
+    async_url = os.getenv("BENCH_ASYNC_DATABASE_URL")
+    pool_options = {"pool_size": args.pool_size, "max_overflow": 0, "pool_timeout": 120}
+
+    engine = database.create_pooled_engine(url, **pool_options)
+    Base.metadata.create_all(bind=engine)
+    database.SessionLocal.configure(bind=engine)
+    modes = {"request_session": upload_request_session, "write_phase": upload_write_phase}
+    if async_url:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        database.async_engine = create_async_engine(async_url, poolclass=database.TimedAsyncQueuePool, **pool_options)
+        database.AsyncSessionLocal = async_sessionmaker(database.async_engine, autoflush=False, expire_on_commit=False)
+        modes["write_phase_async"] = upload_write_phase
+
+    rows = make_rows(args.rows)
+    parse_seconds = args.parse_ms / 1000
+
+    async def run_mode(upload):
+        levels = []
+        for concurrency in LEVELS:
+            bind = database.async_engine if database.DB_ASYNC else engine
+            bind = getattr(bind, "sync_engine", bind)
+            bind.pool.reset_checkout_stats()
+            uploads = max(16, concurrency * args.uploads_per_level)
+            elapsed, latencies = await run_level(upload, concurrency, uploads, parse_seconds, rows)
+            pool = database.pool_metrics(bind)
+            levels.append({
+                "concurrency": concurrency,
+                "uploads_per_sec": round(uploads / elapsed, 2),
+                "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 1),
+                "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 1),
+                "pool_avg_wait_ms": pool.get("avg_wait_ms"),
+                "pool_max_wait_ms": pool.get("max_wait_ms"),
+                "pool_timeouts": pool.get("timeouts"),
+            })
+            print(json.dumps({"mode": mode, **levels[-1]}))
+        return levels
+
+    results = {}
+    for mode, upload in modes.items():
+        database.DB_ASYNC = mode == "write_phase_async"
+        results[mode] = asyncio.run(run_mode(upload))
+        if database.DB_ASYNC:
+            asyncio.run(database.close_async_engine())
+        database.DB_ASYNC = False
+
+    best = {mode: max(level["uploads_per_sec"] for level in levels) for mode, levels in results.items()}
+    print(json.dumps({
+        "status": "ok",
+        "database": engine.url.get_backend_name(),
+        "pool_size": args.pool_size,
+        "parse_ms": args.parse_ms,
+        "rows_per_upload": args.rows,
+        # Without holding connections through the parse, throughput is bounded by the
+        # write time instead of pool_size / parse time
+        "ceiling_request_session_per_sec": round(args.pool_size / parse_seconds, 2) if parse_seconds else None,
+        "best_uploads_per_sec": best,
+        "results": results,
+    }, indent=2))
+    engine.dispose()
+    database.SessionLocal.configure(bind=database.engine)
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
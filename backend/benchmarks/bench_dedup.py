@@ -0,0 +1,145 @@
+# backend/benchmarks/bench_dedup.py
+"""
+Cost of duplicate detection (app/dedup.py) per statement, next to scoring it.
+
+Fills transaction_fingerprints with --fingerprints random entries (other
+customers' history), stores one statement of --rows rows, then times (median of
+--repeat runs):
+  - split_new          => a statement never seen: every fingerprint is looked up
+                          in the database (cache misses, nothing found)
+  - split_repeat_db    => the stored statement again, with an empty cache (another
+                          worker / replica): found in the database
+  - split_repeat_cache => the stored statement again, from the LRU
+  - store / store_claim => insert the rows, without / with claiming their
+                          fingerprints (ON CONFLICT DO NOTHING), rolled back
+  - score              => behavioral features + scoring the same rows (what a
+                          duplicate skips)
+
+Runs on a file-backed SQLite database (BENCH_DATABASE_URL to use another one).
+
+Run from backend/:
+    python -m benchmarks.bench_dedup [--fingerprints 1000000] [--rows 500]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.behavior import add_behavior_features
+from app.dedup import FingerprintIndex, StatementDeduplicator
+from app.models import Base, TransactionFingerprint
+from app.partitions import create_transactions_table
+from app.pipeline import build_result_rows, store_rows
+from app.scoring import score_transactions
+from benchmarks.common import load_benchmark_model, synthetic_statement
+
+CUSTOMER = "bench@example.com"
+FILL_BATCH = 50_000
+
+
+def fill(engine, count: int) -> float:
+    """
+    Random fingerprints of other customers, FILL_BATCH per insert.
+    """
+    start = time.perf_counter()
+    table = TransactionFingerprint.__table__
+    with engine.begin() as conn:
+        for offset in range(0, count, FILL_BATCH):
+            conn.execute(insert(table), [
+                {"fingerprint": uuid.uuid4().hex, "transaction_id": offset + i, "customer_key": f"c{i % 1000}"}
+                for i in range(min(FILL_BATCH, count - offset))
+            ])
+    return time.perf_counter() - start
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fingerprints", type=int, default=1_000_000)
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    model, threshold = load_benchmark_model()
+    stored = synthetic_statement(args.rows, seed=1)
+    fresh = synthetic_statement(args.rows, seed=2)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        engine = create_engine(url)
+        create_transactions_table(engine)
+        Base.metadata.create_all(bind=engine)
+        sessions = sessionmaker(bind=engine)
+        fill_seconds = fill(engine, args.fingerprints)
+
+        def scored_rows(df):
+            df = add_behavior_features(df, None)
+            return build_result_rows(df, score_transactions(model, threshold, df), "bench", CUSTOMER)
+
+        # Store one statement with its fingerprints
+        _, fingerprints, _ = StatementDeduplicator(CUSTOMER, FingerprintIndex(0, sessions)).split(stored)
+        output_rows, db_rows, _ = scored_rows(stored)
+        db = sessions()
+        store_rows(db, output_rows, db_rows, True, fingerprints)
+        table_rows = db.scalar(select(func.count()).select_from(TransactionFingerprint))
+        db.close()
+
+        warm = FingerprintIndex(args.rows, sessions)
+        StatementDeduplicator(CUSTOMER, warm).split(stored)
+        repeat_split = StatementDeduplicator(CUSTOMER, FingerprintIndex(0, sessions)).split(stored)
+        assert repeat_split[0].empty and len(repeat_split[2]) == args.rows, "stored rows not found"
+        assert len(StatementDeduplicator(CUSTOMER, warm).split(fresh)[0]) == args.rows, "new rows flagged"
+
+        new_output, new_rows, _ = scored_rows(fresh)
+        _, new_fingerprints, _ = StatementDeduplicator(CUSTOMER, FingerprintIndex(0, sessions)).split(fresh)
+
+        def store(claim: bool):
+            db = sessions()
+            try:
+                store_rows(db, [dict(row) for row in new_output], [dict(row) for row in new_rows], False,
+                           new_fingerprints if claim else None)
+            finally:
+                db.rollback()
+                db.close()
+
+        latency_ms = {
+            "split_new": median_ms(
+                lambda: StatementDeduplicator(CUSTOMER, FingerprintIndex(0, sessions)).split(fresh), args.repeat,
+            ),
+            "split_repeat_db": median_ms(
+                lambda: StatementDeduplicator(CUSTOMER, FingerprintIndex(0, sessions)).split(stored), args.repeat,
+            ),
+            "split_repeat_cache": median_ms(lambda: StatementDeduplicator(CUSTOMER, warm).split(stored), args.repeat),
+            "store": median_ms(lambda: store(False), args.repeat),
+            "store_claim": median_ms(lambda: store(True), args.repeat),
+            "score": median_ms(lambda: scored_rows(fresh), args.repeat),
+        }
+        engine.dispose()
+
+    print(json.dumps({
+        "status": "ok",
+        "database": url.split(":", 1)[0],
+        "fingerprint_rows": table_rows,
+        "statement_rows": args.rows,
+        "fill_seconds": round(fill_seconds, 1),
+        "latency_ms": latency_ms,
+        "cache": warm.metrics(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# backend/benchmarks/bench_feature_store.py
+"""
+Behavioral features + customer feature store: correctness and per-row cost.
+
+Checks (synthetic customers with overlapping statements):
+  - behavior_features over all customers at once (training) equals a plain
+    per-row loop over each customer's history
+  - scoring statement by statement with the store's profiles (get => score =>
+    record, flushed to the database in between) gives the same features as the
+    one-shot training computation
+  - both with a --max-keys cap below the synthetic merchants / categories, so the
+    keys a customer's profile no longer counts are checked too
+
+Cost: per-row time of a cached profile lookup + feature computation + record,
+per statement size, against a file-backed SQLite database (BENCH_DATABASE_URL
+to use another one).
+
+Run from backend/:
+    python -m benchmarks.bench_feature_store [--customers 200] [--statements 12] [--max-keys 5]
+"""
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.behavior import BEHAVIOR_FEATURES, MAX_ZSCORE, add_behavior_features, behavior_features, normalize_keys
+from app.feature_store import CustomerFeatureStore
+from app.models import Base
+from benchmarks.common import synthetic_statement, timed
+
+TOLERANCE = 1e-6
+SIZES = [20, 100, 500]
+
+
+def reference_features(df: pd.DataFrame, max_keys: int) -> pd.DataFrame:
+    """
+    The features row by row, from each customer's earlier rows (kept simple on purpose).
+    Only the customer's first max_keys merchants / categories are counted.
+    """
+    df = df.assign(
+        _merchant=normalize_keys(df["merchant"]),
+        _category=normalize_keys(df["category"]),
+        _ts=pd.to_datetime(df["trans_date_trans_time"]),
+    )
+    out = np.zeros((len(df), len(BEHAVIOR_FEATURES)))
+    for _, rows in df.groupby("customer", sort=False):
+        history = []
+        tracked = {"_merchant": [], "_category": []}
+        for i, row in rows.sort_values("_ts", kind="stable").iterrows():
+            counted = {
+                column: row[column] in keys or len(keys) < max_keys for column, keys in tracked.items()
+            }
+            amounts = [h["amt"] for h in history]
+            count = len(history)
+            mean = sum(amounts) / count if count else 0.0
+            std = math.sqrt(max(sum(a * a for a in amounts) / count - mean * mean, 0.0)) if count else 0.0
+            z = (row["amt"] - mean) / std if count >= 2 and std > 1e-9 else 0.0
+            out[i] = [
+                count,
+                sum(h["_merchant"] == row["_merchant"] for h in history) if counted["_merchant"] else 0.0,
+                mean,
+                max(-MAX_ZSCORE, min(MAX_ZSCORE, z)),
+                (row["_ts"] - history[-1]["_ts"]).total_seconds() if history else -1.0,
+                sum(h["_category"] == row["_category"] for h in history) / count
+                if count and counted["_category"] else 0.0,
+            ]
+            history.append(row)
+            for column, keys in tracked.items():
+                if counted[column] and row[column] not in keys:
+                    keys.append(row[column])
+    return pd.DataFrame(out, columns=BEHAVIOR_FEATURES)
+
+
+def synthetic_history(customers: int, statements: int, rows: int = 25, seed: int = 0):
+    """
+    One list of statements (DataFrames shaped like parse_statement output) per
+    customer, each statement covering the month after the previous one.
+    """
+    history = {}
+    for c in range(customers):
+        frames = []
+        for s in range(statements):
+            df = synthetic_statement(rows, seed=seed + c * 1000 + s)
+            df["trans_date_trans_time"] += pd.Timedelta(days=30 * s)
+            frames.append(df)
+        history[f"customer{c}@example.com"] = frames
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--statements", type=int, default=12)
+    parser.add_argument("--max-keys", type=int, default=5)
+    args = parser.parse_args()
+
+    history = synthetic_history(args.customers, args.statements)
+    everything = pd.concat(
+        [df.assign(customer=key) for key, frames in history.items() for df in frames], ignore_index=True,
+    )
+
+    # 1) Training computation vs. the per-row reference (a subset: the loop is slow)
+    subset = everything[everything["customer"].isin(list(history)[:20])].reset_index(drop=True)
+    fast = behavior_features(
+        subset["trans_date_trans_time"], subset["merchant"], subset["category"], subset["amt"],
+        customers=subset["customer"], max_keys=args.max_keys,
+    )
+    reference_diff = float(np.max(np.abs(fast.to_numpy() - reference_features(subset, args.max_keys).to_numpy())))
+    training_sec, training = timed(
+        behavior_features, everything["trans_date_trans_time"], everything["merchant"], everything["category"],
+        everything["amt"], customers=everything["customer"], max_keys=args.max_keys, repeat=3,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        url = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        sessions = sessionmaker(bind=engine)
+
+        # 2) Statement by statement through the store (flushed + re-read from the DB in between)
+        store = CustomerFeatureStore(enabled=True, cache_ttl=0.0, flush_rows=10**9,
+                                     max_keys=args.max_keys, session_factory=sessions)
+        served = []
+        for s in range(args.statements):
+            for key, frames in history.items():
+                df = add_behavior_features(frames[s], store.get(key), args.max_keys)
+                store.record(key, df)
+                served.append(df[BEHAVIOR_FEATURES].assign(customer=key, _s=s))
+            store.flush()
+        served = pd.concat(served, ignore_index=True)
+        # everything is ordered customer => statement; served is statement => customer
+        expected = training.assign(customer=everything["customer"].to_numpy(),
+                                   _s=np.repeat(np.tile(np.arange(args.statements), args.customers), 25))
+        merged_order = ["customer", "_s"]
+        a = served.sort_values(merged_order, kind="stable")[BEHAVIOR_FEATURES].to_numpy()
+        b = expected.sort_values(merged_order, kind="stable")[BEHAVIOR_FEATURES].to_numpy()
+        serving_diff = float(np.max(np.abs(a - b) / np.maximum(1.0, np.abs(b))))
+
+        # 3) Per-row cost with a warm cache (the usual case: the customer uploads again)
+        store = CustomerFeatureStore(enabled=True, cache_ttl=3600, session_factory=sessions)
+        key = next(iter(history))
+        store.get(key)
+        costs = {}
+        for size in SIZES:
+            df = synthetic_statement(size, seed=size)
+
+            def score_once():
+                store.record(key, add_behavior_features(df, store.get(key)))
+
+            sec, _ = timed(score_once, repeat=20)
+            costs[size] = {"statement_ms": round(sec * 1000, 3), "per_row_us": round(sec / size * 1e6, 2)}
+        start = time.perf_counter()
+        store.flush()
+        flush_ms = (time.perf_counter() - start) * 1000
+
+        # Cold lookup: one primary-key read
+        cold = CustomerFeatureStore(enabled=True, session_factory=sessions)
+        cold_sec, _ = timed(lambda: (cold.clear(), cold.get(key)), repeat=20)
+        engine.dispose()
+
+    ok = reference_diff <= TOLERANCE and serving_diff <= TOLERANCE
+    print(json.dumps({
+        "status": "ok" if ok else "parity_failed",
+        "customers": args.customers,
+        "rows": len(everything),
+        "max_diff_vs_reference": reference_diff,
+        "max_rel_diff_serving_vs_training": serving_diff,
+        "training_features_sec": round(training_sec, 4),
+        "training_per_row_us": round(training_sec / len(everything) * 1e6, 3),
+        "warm_per_statement": costs,
+        "cold_lookup_ms": round(cold_sec * 1000, 3),
+        "flush_ms": round(flush_ms, 2),
+        "store": store.metrics(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
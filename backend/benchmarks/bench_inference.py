@@ -0,0 +1,76 @@
+# backend/benchmarks/bench_inference.py
+"""
+sklearn pipeline vs. compiled NumPy forest (app/compiled_model.py).
+
+For batch sizes 1 to 10k: best-of-N latency of predict_proba for the sklearn
+pipeline, the compiled engine alone, and the engine as the API uses it (batches
+above COMPILED_MAX_ROWS handed to sklearn), plus the max absolute probability
+difference (must stay below 1e-9). Batches are scored statements
+(build_feature_frame), so they include categories and states the model has never
+seen. The engine is memory-mapped from an exported directory, so the export round
+trip is checked too.
+
+Run from backend/:
+    python -m benchmarks.bench_inference
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from app.compiled_model import CompiledForest
+from app.ml.train_model import save_compiled_model
+from app.scoring import build_feature_frame
+from benchmarks.common import load_benchmark_model, synthetic_statement, timed
+
+BATCH_SIZES = [1, 10, 100, 1_000, 10_000]
+TOLERANCE = 1e-9
+
+
+def main():
+    model, threshold = load_benchmark_model()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = save_compiled_model(model, threshold, os.path.join(tmp_dir, "rf_model_compiled"))
+        compiled, _ = CompiledForest.load(path)
+        api_engine, _ = CompiledForest.load(path)
+        api_engine.fallback = model
+        artifact_bytes = sum(entry.stat().st_size for entry in os.scandir(path))
+
+    results = []
+    max_diff = 0.0
+    for size in BATCH_SIZES:
+        X = build_feature_frame(synthetic_statement(size, seed=size))
+        repeat = 20 if size <= 100 else 5
+        sk_sec, sk_proba = timed(model.predict_proba, X, repeat=repeat)
+        compiled_sec, compiled_proba = timed(compiled.predict_proba, X, repeat=repeat)
+        api_sec, _ = timed(api_engine.predict_proba, X, repeat=repeat)
+        diff = float(np.max(np.abs(sk_proba - compiled_proba)))
+        max_diff = max(max_diff, diff)
+        results.append({
+            "batch": size,
+            "sklearn_ms": round(sk_sec * 1000, 3),
+            "compiled_ms": round(compiled_sec * 1000, 3),
+            "api_ms": round(api_sec * 1000, 3),
+            "compiled_speedup": round(sk_sec / compiled_sec, 2),
+            "api_speedup": round(sk_sec / api_sec, 2),
+            "compiled_us_per_row": round(compiled_sec * 1e6 / size, 2),
+            "max_abs_diff": diff,
+        })
+        print(json.dumps(results[-1]))
+
+    print(json.dumps({
+        "status": "ok" if max_diff <= TOLERANCE else "parity_failed",
+        "trees": len(compiled.roots),
+        "nodes": len(compiled.feature),
+        "max_depth": compiled.max_depth,
+        "compiled_max_rows": api_engine.max_rows,
+        "artifact_bytes": artifact_bytes,
+        "max_abs_diff": max_diff,
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
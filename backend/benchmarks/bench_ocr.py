@@ -0,0 +1,105 @@
+# backend/benchmarks/bench_ocr.py
+"""
+Page-level vs. band-parallel OCR on synthetic rendered statement scans.
+
+Reports latency per megapixel for each scan resolution, core scaling of the
+band mode for several worker counts, and the re-run time with a warm band cache.
+Needs the tesseract binary; without it only preprocessing + band detection are timed.
+
+Run from backend/:
+    python -m benchmarks.bench_ocr
+"""
+import json
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+from app import ocr
+from benchmarks.common import cpu_count, synthetic_statement_image
+
+DPIS = [150, 300, 600]
+WORKER_COUNTS = [1, 2, 4, 8]
+ROWS = 30
+
+
+def _table_structure(gray, bands_mode: bool):
+    if bands_mode:
+        _, binary = ocr.prepare_image(gray)
+    else:
+        _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)
+    horizontal_lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((1, 50), np.uint8))
+    return cv2.subtract(binary, horizontal_lines)
+
+
+def _time(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_image(dpi, skew, worker_counts, have_tesseract):
+    gray = cv2.cvtColor(synthetic_statement_image(dpi, rows=ROWS, skew_degrees=skew), cv2.COLOR_BGR2GRAY)
+    mp = gray.shape[0] * gray.shape[1] / 1e6
+    prep_sec, structure = _time(_table_structure, gray, True)
+    result = {
+        "dpi": dpi,
+        "skew": skew,
+        "megapixels": round(mp, 2),
+        "ocr_megapixels": round(structure.shape[0] * structure.shape[1] / 1e6, 2),
+        "bands": len(ocr.find_text_bands(structure)),
+        "prepare_ms": round(prep_sec * 1000, 1),
+    }
+    if not have_tesseract:
+        return result
+
+    page_sec, page_lines = _time(ocr.ocr_page_lines, _table_structure(gray, False))
+    result["page_sec"] = round(page_sec, 3)
+    result["page_ms_per_mp"] = round(page_sec * 1000 / mp, 1)
+    result["page_lines"] = len([line for line in page_lines if line.strip()])
+
+    scaling = []
+    for workers in worker_counts:
+        ocr.clear_band_cache()
+        band_sec, band_lines = _time(ocr.ocr_text_lines, structure, workers=workers)
+        total = prep_sec + band_sec
+        scaling.append({
+            "workers": workers,
+            "sec": round(total, 3),
+            "ms_per_mp": round(total * 1000 / mp, 1),
+            "speedup_vs_page": round(page_sec / total, 2),
+            "lines": len(band_lines),
+        })
+    result["bands_scaling"] = scaling
+
+    cached_sec, _ = _time(ocr.ocr_text_lines, structure, workers=worker_counts[-1])
+    result["cached_sec"] = round(prep_sec + cached_sec, 3)
+    return result
+
+
+def main():
+    worker_counts = [w for w in WORKER_COUNTS if w <= cpu_count()] or [1]
+    have_tesseract = shutil.which("tesseract") is not None
+    if not have_tesseract:
+        print("[WARN] tesseract not found; timing preprocessing and band detection only")
+
+    results = []
+    for dpi in DPIS:
+        results.append(bench_image(dpi, 0.0, worker_counts, have_tesseract))
+        print(json.dumps(results[-1]))
+    results.append(bench_image(300, 2.0, worker_counts, have_tesseract))
+    print(json.dumps(results[-1]))
+
+    print(json.dumps({
+        "status": "ok",
+        "cpus": cpu_count(),
+        "tesseract": have_tesseract,
+        "target_dpi": ocr.OCR_TARGET_DPI,
+        "results": results,
+        "ocr_stats": ocr.ocr_stats_snapshot(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
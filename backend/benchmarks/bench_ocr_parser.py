@@ -0,0 +1,183 @@
+# backend/benchmarks/bench_ocr_parser.py
+"""
+OCR line parser throughput (lines/sec) and parity with the previous parser.
+
+The corpus is synthetic OCR output: clean lines, currency aliases (usp/usb/us0),
+pipes and commas, punctuation around the type, missing fields, junk lines and
+non-USD ISO currencies. Parity: every line the previous parser accepted must parse
+to the same dict; lines it rejected may only parse now when their currency is a
+non-USD ISO code.
+
+Run from backend/:
+    python -m benchmarks.bench_ocr_parser
+"""
+import json
+import re
+import time
+
+import numpy as np
+
+from app.parse_statement import CURRENCY_ALIASES, TRANSACTION_TYPES, parse_ocr_text_line
+
+N_LINES = 200_000
+
+MERCHANTS = ["Walmart", "Target Store", "Shell Gas Station", "Amazon Mktp", "Joe's Diner", "Uber"]
+CATEGORIES = ["grocery_pos", "gas_transport", "shopping_net", "food_dining", "travel", "misc_pos"]
+TYPES = sorted(TRANSACTION_TYPES) + ["Purchase", "REFUND", "purchase.", "(refund)"]
+CURRENCIES = ["USD", "usd", "usp", "usb", "us0", "USD", "USD", "EUR", "gbp", "JPY", "XYZ"]
+
+
+def legacy_parse_ocr_line(tokens):
+    """
+    Verbatim copy of parse_ocr_line before the single-pass rewrite.
+    """
+    tokens = [t for t in tokens if t not in ("-", "|")]
+
+    if len(tokens) < 5:
+        return None
+
+    date_str = None
+    if re.match(r"^\d{4}-\d{2}-\d{2}$", tokens[0]):
+        date_str = tokens[0]
+        idx_start_merchant = 1
+    else:
+        return None
+
+    tx_type_idx = -1
+    transaction_type_str = None
+    for i in range(len(tokens)-1, -1, -1):
+        maybe_type = re.sub(r"[^\w]", "", tokens[i].lower())
+        if maybe_type in TRANSACTION_TYPES:
+            transaction_type_str = tokens[i]
+            tx_type_idx = i
+            break
+    if not transaction_type_str:
+        return None
+
+    currency_idx = tx_type_idx - 1
+    if currency_idx < 1:
+        return None
+    currency_str = tokens[currency_idx].upper()
+
+    if currency_str not in ("USD",):
+        return None
+
+    amount_idx = currency_idx - 1
+    if amount_idx < 1:
+        return None
+    amount_str = tokens[amount_idx].replace(",", "")
+    try:
+        amount_val = float(amount_str)
+    except ValueError:
+        return None
+
+    category_idx = amount_idx - 1
+
+    if category_idx < idx_start_merchant:
+        category_str = "misc"
+        idx_end_merchant = amount_idx
+    else:
+        category_str = tokens[category_idx]
+        idx_end_merchant = category_idx
+
+    merchant_tokens = tokens[idx_start_merchant:idx_end_merchant]
+    merchant_str = " ".join(merchant_tokens)
+
+    return {
+        "Date": date_str,
+        "Merchant": merchant_str,
+        "Category": category_str,
+        "Amount": amount_val,
+        "Currency": currency_str,
+        "Type": transaction_type_str
+    }
+
+
+def legacy_parse_ocr_text_line(row):
+    """
+    The per-line cleanup iter_image_transactions used to do before parse_ocr_line.
+    """
+    row_clean = re.sub(r"[\|,]", " ", row).strip()
+    for bad_cur, good_cur in CURRENCY_ALIASES.items():
+        row_clean = re.sub(bad_cur, good_cur, row_clean, flags=re.IGNORECASE)
+    tokens = re.split(r"\s+", row_clean)
+    return legacy_parse_ocr_line(tokens)
+
+
+def synthetic_ocr_lines(n: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(n):
+        date = f"2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}"
+        merchant = MERCHANTS[rng.integers(len(MERCHANTS))]
+        category = CATEGORIES[rng.integers(len(CATEGORIES))]
+        amount = f"{rng.uniform(1, 3000):.2f}"
+        currency = CURRENCIES[rng.integers(len(CURRENCIES))]
+        tx_type = TYPES[rng.integers(len(TYPES))]
+        kind = i % 10
+        if kind == 0:
+            line = f"{date} | {merchant} | {category} | {amount} | {currency} | {tx_type}"
+        elif kind == 1:
+            line = f"{date}, {merchant}, {category}, {amount}, {currency}, {tx_type}"
+        elif kind == 2:
+            line = f"{date} {merchant} {amount} {currency} {tx_type}"
+        elif kind == 3:
+            line = f"{date} {merchant} {category} {amount} {currency} {tx_type} - |"
+        elif kind == 4:
+            line = f"{date} {merchant} {category} 1,{amount} {currency} {tx_type}"
+        elif kind == 5:
+            line = "Date Merchant Category Amount Currency Type"
+        elif kind == 6:
+            line = f"{date} {category} {amount}{currency} {tx_type}"
+        elif kind == 7:
+            line = f"{date[:-1]} {merchant} {category} {amount} {currency} {tx_type}"
+        elif kind == 8:
+            line = f"  {date}   {merchant} {category} {amount} {currency} {tx_type} extra  "
+        else:
+            line = f"{date} {merchant} {category} {amount} {currency} {tx_type}"
+        lines.append(line)
+    return lines
+
+
+def throughput(parse, lines) -> tuple:
+    start = time.perf_counter()
+    results = [parse(line) for line in lines]
+    elapsed = time.perf_counter() - start
+    return len(lines) / elapsed, results
+
+
+def main():
+    lines = synthetic_ocr_lines(N_LINES)
+
+    legacy_lps, legacy_results = throughput(legacy_parse_ocr_text_line, lines)
+    new_lps, new_results = throughput(parse_ocr_text_line, lines)
+
+    mismatches = []
+    newly_parsed = 0
+    for line, old, new in zip(lines, legacy_results, new_results):
+        if old is not None:
+            ok = new == old
+        elif new is None:
+            ok = True
+        else:
+            ok = new["Currency"] != "USD"
+            newly_parsed += 1
+        if not ok:
+            mismatches.append({"line": line, "legacy": old, "new": new})
+
+    print(json.dumps({
+        "status": "ok" if not mismatches else "parity_failed",
+        "lines": len(lines),
+        "legacy_lines_per_sec": round(legacy_lps),
+        "new_lines_per_sec": round(new_lps),
+        "speedup": round(new_lps / legacy_lps, 2),
+        "parsed_legacy": sum(r is not None for r in legacy_results),
+        "parsed_new": sum(r is not None for r in new_results),
+        "parsed_only_new_non_usd": newly_parsed,
+        "mismatches": len(mismatches),
+        "mismatch_examples": mismatches[:5],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_pdf_fast_path.py
+"""
+extract_tables() vs. the text-layer fast path (app/pdf_layout.py).
+
+For every bundled sample PDF and a synthetic 100-page statement, reports:
+  - table path time
+  - fast path time with an empty template cache (cold) and a warm one
+  - row-level parity with the table path
+
+Run from backend/:
+    python -m benchmarks.bench_pdf_fast_path
+"""
+import glob
+import json
+import os
+import tempfile
+
+from app import pdf_layout
+from app.parse_statement import extract_transactions_from_table_pdf
+from benchmarks.common import synthetic_statement_pdf, timed
+
+
+def bench_file(path, repeat):
+    table_time, table_df = timed(extract_transactions_from_table_pdf, path, fast_path=False, repeat=repeat)
+
+    def cold():
+        pdf_layout.clear_templates()
+        return extract_transactions_from_table_pdf(path, fast_path=True)
+
+    cold_time, cold_df = timed(cold, repeat=repeat)
+    warm_time, warm_df = timed(extract_transactions_from_table_pdf, path, fast_path=True, repeat=repeat)
+
+    result = {
+        "file": os.path.basename(path),
+        "rows": len(table_df),
+        "table_ms": round(1000 * table_time, 2),
+        "fast_cold_ms": round(1000 * cold_time, 2),
+        "fast_warm_ms": round(1000 * warm_time, 2),
+        "speedup_cold": round(table_time / cold_time, 2),
+        "speedup_warm": round(table_time / warm_time, 2),
+        "rows_identical": bool(table_df.equals(cold_df) and table_df.equals(warm_df)),
+    }
+    print(json.dumps(result))
+    return result
+
+
+def main():
+    results = []
+    for path in sorted(glob.glob("app/sample_credit_card_fraud_transactions*.pdf")):
+        results.append(bench_file(path, repeat=5))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = synthetic_statement_pdf(os.path.join(tmp_dir, "statement_100_pages.pdf"), pages=100)
+        results.append(bench_file(path, repeat=1))
+
+    total_table = sum(r["table_ms"] for r in results)
+    total_warm = sum(r["fast_warm_ms"] for r in results)
+    print(json.dumps({
+        "status": "ok",
+        "results": results,
+        "all_rows_identical": all(r["rows_identical"] for r in results),
+        "overall_speedup_warm": round(total_table / total_warm, 2),
+        "layout_stats": pdf_layout.layout_stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# backend/benchmarks/bench_pdf_pages.py
+"""
+Serial vs. page-parallel PDF table extraction.
+
+Runs over the bundled sample_credit_card_fraud_transactions*.pdf files and a
+synthetic 100-page statement (needs reportlab), for several worker counts.
+
+Run from backend/:
+    python -m benchmarks.bench_pdf_pages
+"""
+import glob
+import json
+import os
+import tempfile
+
+import app.parse_statement as parse_statement_module
+from app.parse_statement import extract_transactions_from_table_pdf
+from benchmarks.common import cpu_count, synthetic_statement_pdf, timed
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def bench_file(path, worker_counts, repeat):
+    results = []
+    baseline = None
+    baseline_rows = None
+    for workers in worker_counts:
+        # Warm the pool so process start-up is not counted
+        if workers > 1:
+            extract_transactions_from_table_pdf(path, page_workers=workers)
+        elapsed, df = timed(extract_transactions_from_table_pdf, path, page_workers=workers, repeat=repeat)
+        if baseline is None:
+            baseline, baseline_rows = elapsed, df
+        results.append({
+            "file": os.path.basename(path),
+            "workers": workers,
+            "rows": len(df),
+            "sec": round(elapsed, 3),
+            "speedup": round(baseline / elapsed, 2),
+            "same_rows_as_serial": bool(df.equals(baseline_rows)),
+        })
+        print(json.dumps(results[-1]))
+    return results
+
+
+def main():
+    worker_counts = [w for w in WORKER_COUNTS if w <= cpu_count()] or [1]
+    # Let the small sample files use the parallel path too
+    parse_statement_module.PDF_PARALLEL_MIN_PAGES = 1
+
+    results = []
+    for path in sorted(glob.glob("app/sample_credit_card_fraud_transactions*.pdf")):
+        results.extend(bench_file(path, worker_counts, repeat=3))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = synthetic_statement_pdf(os.path.join(tmp_dir, "statement_100_pages.pdf"), pages=100)
+        results.extend(bench_file(path, worker_counts, repeat=1))
+
+    print(json.dumps({"status": "ok", "cpus": cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# backend/benchmarks/bench_scoring.py
+"""
+Per-row vs. batch scoring micro-benchmark.
+
+Run from backend/:
+    python -m benchmarks.bench_scoring
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.scoring import score_transactions
+from benchmarks.common import load_benchmark_model, synthetic_statement, timed
+
+SIZES = [10, 100, 1_000, 10_000]
+
+
+def score_per_row(model, threshold, df):
+    """
+    The original /analyze-statement loop: one predict_proba per row.
+    """
+    probs = []
+    for _, row in df.iterrows():
+        try:
+            amount_val = float(row.get("amt", 0.0))
+        except ValueError:
+            amount_val = 0.0
+        X_sample = pd.DataFrame([{
+            "amt": amount_val,
+            "category": str(row.get("category", "")).lower().replace(" ", "_"),
+            "gender": row.get("gender", "U"),
+            "state": row.get("state", "XX"),
+            "city_pop": row.get("city_pop", 1000.0),
+            "hour": row.get("hour", 0),
+            "day_of_week": row.get("day_of_week", 0),
+            "distance": row.get("distance", 0.5),
+        }])
+        probs.append(model.predict_proba(X_sample)[0, 1])
+    return np.array(probs)
+
+
+def main():
+    model, threshold = load_benchmark_model()
+    results = []
+    for n in SIZES:
+        df = synthetic_statement(n)
+        # The per-row path is slow; time it once at the larger sizes
+        row_time, row_probs = timed(score_per_row, model, threshold, df, repeat=1 if n >= 1_000 else 3)
+        batch_time, scores = timed(score_transactions, model, threshold, df)
+        results.append({
+            "rows": n,
+            "per_row_sec": round(row_time, 4),
+            "batch_sec": round(batch_time, 4),
+            "speedup": round(row_time / batch_time, 1) if batch_time else None,
+            "identical_probabilities": bool(np.array_equal(row_probs, scores["probabilities"])),
+        })
+        print(json.dumps(results[-1]))
+
+    print(json.dumps({"status": "ok", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# backend/benchmarks/bench_startup.py
+"""
+API cold start and per-worker memory.
+
+  1) `import app.main` in a fresh interpreter: wall-clock time, max RSS, and which
+     heavy modules (parsers, sklearn, joblib) got imported.
+  2) For each inference engine, a process-mode WorkerPool with WORKER_POOL_SIZE
+     workers: time until the first statement is scored, then RSS and PSS of every
+     worker after scoring (PSS splits shared pages between the processes mapping
+     them, so memory-mapped forest arrays show up once, not once per worker).
+
+Pass --max-import-sec / --max-worker-pss-mb to exit non-zero on regressions.
+
+Run from backend/:
+    python -m benchmarks.bench_startup [--workers 2] [--max-import-sec 3] [--max-worker-pss-mb 300]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY_MODULES = ["cv2", "pdfplumber", "pytesseract", "sklearn", "imblearn", "joblib", "sendgrid"]
+
+IMPORT_SNIPPET = """
+import json, resource, sys, time
+start = time.perf_counter()
+import app.main
+print(json.dumps({
+    "import_sec": time.perf_counter() - start,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def _proc_memory_mb() -> dict:
+    """
+    RSS and PSS of the current process from /proc (Linux).
+    """
+    memory = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                memory["rss_mb"] = int(line.split()[1]) / 1024
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss_mb"] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return memory
+
+
+def _score_and_report(df):
+    """
+    Worker task: score df with the worker's model, report pid + memory.
+    """
+    from app.scoring import score_transactions
+    from app.workers import _get_model
+
+    model, threshold = _get_model()
+    score_transactions(model, threshold, df)
+    time.sleep(0.2)  # keep this worker busy so the other tasks land on other workers
+    return {"pid": os.getpid(), "engine": type(model).__name__, **_proc_memory_mb()}
+
+
+def run_workers(workers: int):
+    """
+    Child-process mode: start the pool configured by the environment and report.
+    """
+    from app.workers import WorkerPool
+    from benchmarks.common import synthetic_statement
+
+    df = synthetic_statement(100)
+    pool = WorkerPool(max_workers=workers, max_queue=workers * 4, mode="process")
+    start = time.perf_counter()
+    pool.start()
+    first = pool.submit(_score_and_report, df)
+    first.result()
+    first_scored_sec = time.perf_counter() - start
+    reports = [pool.submit(_score_and_report, df) for _ in range(workers * 3)]
+    per_worker = {}
+    for future in reports:
+        report = future.result()
+        per_worker[report["pid"]] = report
+    pool.shutdown()
+    print(json.dumps({
+        "first_scored_sec": first_scored_sec,
+        "workers": list(per_worker.values()),
+    }))
+
+
+def _run_json(cmd, env=None) -> dict:
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True, env=env)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-import-sec", type=float, default=None)
+    parser.add_argument("--max-worker-pss-mb", type=float, default=None)
+    parser.add_argument("--run-workers", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_workers:
+        run_workers(args.workers)
+        return
+
+    import joblib
+
+    from app.ml.train_model import save_compiled_model
+    from benchmarks.common import load_benchmark_model
+
+    imports = [_run_json([sys.executable, "-c", IMPORT_SNIPPET % HEAVY_MODULES]) for _ in range(3)]
+    api_import = min(imports, key=lambda r: r["import_sec"])
+    print(json.dumps({"api_import": api_import}))
+
+    results = {"api_import": api_import, "engines": {}}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model, threshold = load_benchmark_model()
+        model_path = os.path.join(tmp_dir, "rf_model.pkl")
+        joblib.dump({"model": model, "threshold": threshold}, model_path)
+        save_compiled_model(model, threshold, os.path.join(tmp_dir, "rf_model_compiled"), source_path=model_path)
+        results["pickle_mb"] = round(os.path.getsize(model_path) / 1024 / 1024, 2)
+
+        for engine in ("sklearn", "compiled"):
+            env = dict(os.environ, MODEL_PATH=model_path, INFERENCE_ENGINE=engine)
+            report = _run_json(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--run-workers", "--workers", str(args.workers)],
+                env=env,
+            )
+            workers = report["workers"]
+            results["engines"][engine] = {
+                "first_scored_sec": round(report["first_scored_sec"], 3),
+                "workers_seen": len(workers),
+                "model_class": workers[0]["engine"] if workers else None,
+                "avg_worker_rss_mb": round(sum(w["rss_mb"] for w in workers) / max(1, len(workers)), 1),
+                "avg_worker_pss_mb": round(sum(w.get("pss_mb", 0.0) for w in workers) / max(1, len(workers)), 1),
+            }
+            print(json.dumps({engine: results["engines"][engine]}))
+
+    failures = []
+    if args.max_import_sec is not None and api_import["import_sec"] > args.max_import_sec:
+        failures.append(f"import app.main took {api_import['import_sec']:.2f}s > {args.max_import_sec}s")
+    if args.max_worker_pss_mb is not None:
+        for engine, stats in results["engines"].items():
+            if stats["avg_worker_pss_mb"] > args.max_worker_pss_mb:
+                failures.append(f"{engine} workers use {stats['avg_worker_pss_mb']} MB PSS > {args.max_worker_pss_mb} MB")
+
+    results["status"] = "ok" if not failures else "regression"
+    results["failures"] = failures
+    print(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_thresholds.py
+"""
+Threshold tuning: the original loop (f1_score at 50 evenly spaced thresholds) vs.
+app/ml/thresholds.py (every distinct probability, one sort + cumulative sums).
+
+Test-set-sized synthetic labels/probabilities (0.6% fraud, scores with many ties
+like a forest's). Checks:
+  - F1 at the 50 grid thresholds equals sklearn's f1_score
+  - precision / recall at every threshold equal sklearn's precision_recall_curve
+  - the best F1 of the full sweep is >= the best F1 on the grid
+
+Run from backend/:
+    python -m benchmarks.bench_thresholds [--rows 260000]
+"""
+import argparse
+import json
+
+import numpy as np
+from sklearn.metrics import f1_score, precision_recall_curve
+
+from app.ml.thresholds import best_index, curve_metrics, index_for_threshold, point, threshold_curve
+from benchmarks.common import timed
+
+TOLERANCE = 1e-12
+
+
+def synthetic_scores(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.random(rows) < 0.006
+    # A 100-tree forest outputs multiples of 0.01; fraud skews high
+    probs = np.where(y, rng.beta(5, 2, rows), rng.beta(1, 12, rows))
+    probs = np.round(probs * 100) / 100
+    amounts = np.round(rng.gamma(2.0, 35.0, rows) * np.where(y, 4.0, 1.0), 2)
+    return y.astype(int), probs, amounts
+
+
+def legacy_best_threshold(y_test, probs):
+    """
+    The threshold loop main() used before (kept verbatim for comparison).
+    """
+    thresholds = np.linspace(0, 1, 50)
+    best_thr = 0.5
+    best_f1 = -1
+    for t in thresholds:
+        temp_pred = (probs >= t).astype(int)
+        f1 = f1_score(y_test, temp_pred)
+        if f1 > best_f1:
+            best_f1 = f1
+            best_thr = t
+    return best_thr, best_f1
+
+
+def vectorized_best_threshold(y_test, probs, amounts):
+    curve = threshold_curve(y_test, probs, amounts=amounts)
+    metrics = curve_metrics(curve)
+    best = point(metrics, best_index(metrics, "f1"))
+    return best["threshold"], best["f1"], curve, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=260_000)
+    args = parser.parse_args()
+
+    y, probs, amounts = synthetic_scores(args.rows)
+    legacy_sec, (legacy_thr, legacy_f1) = timed(legacy_best_threshold, y, probs, repeat=1)
+    fast_sec, (fast_thr, fast_f1, curve, metrics) = timed(vectorized_best_threshold, y, probs, amounts, repeat=5)
+
+    # F1 on the legacy grid, read off the curve
+    grid_diff = 0.0
+    for t in np.linspace(0, 1, 50):
+        expected = f1_score(y, (probs >= t).astype(int))
+        grid_diff = max(grid_diff, abs(expected - metrics["f1"][index_for_threshold(curve, t)]))
+
+    # precision_recall_curve: thresholds ascending, one per distinct score
+    precision, recall, pr_thresholds = precision_recall_curve(y, probs)
+    idx = np.array([index_for_threshold(curve, t) for t in pr_thresholds])
+    pr_diff = max(
+        float(np.max(np.abs(precision[:-1] - metrics["precision"][idx]))),
+        float(np.max(np.abs(recall[:-1] - metrics["recall"][idx]))),
+    )
+
+    cost = point(metrics, best_index(metrics, "cost"))
+    ok = grid_diff <= TOLERANCE and pr_diff <= TOLERANCE and fast_f1 >= legacy_f1 - TOLERANCE
+    print(json.dumps({
+        "status": "ok" if ok else "parity_failed",
+        "rows": args.rows,
+        "legacy": {"thresholds": 50, "sec": round(legacy_sec, 4), "threshold": round(float(legacy_thr), 4),
+                   "f1": round(float(legacy_f1), 4)},
+        "vectorized": {"thresholds": len(curve["thresholds"]), "sec": round(fast_sec, 4),
+                       "threshold": fast_thr, "f1": round(fast_f1, 4)},
+        "speedup": round(legacy_sec / fast_sec, 1),
+        "best_cost_point": cost,
+        "max_f1_diff_on_grid": grid_diff,
+        "max_pr_curve_diff": pr_diff,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
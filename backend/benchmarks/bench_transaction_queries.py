@@ -0,0 +1,211 @@
+# backend/benchmarks/bench_transaction_queries.py
+"""
+Latency of the per-customer history queries (app/queries.py) on a large table.
+
+Generates --rows synthetic transactions (default 10M) spread over --customers
+customers, plus one heavy customer with --heavy-rows rows, ~1% flagged, and
+times (median of --repeat runs):
+  - first_page        => list_transactions, newest 50
+  - deep_page_keyset  => the page --deep-rows rows down the heavy customer's history,
+                         via the cursor of the previous page
+  - deep_page_offset  => same page with LIMIT/OFFSET (what keyset pagination replaces)
+  - flagged_page      => flagged rows only (partial index)
+  - monthly_summary   => summarize_transactions, per month
+  - full_scan_page    => first page with the indexes disabled (NOT INDEXED)
+
+Also reports each query's plan, to check the indexes are used.
+Runs on a file-backed SQLite database (loaded with sqlite3 directly: the 10M rows
+take a few minutes and ~2 GB); --db keeps / reuses it between runs.
+
+Run from backend/:
+    python -m benchmarks.bench_transaction_queries [--rows 10000000] [--db /tmp/tx.sqlite]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from app.models import Base, Transaction
+from app.queries import encode_cursor, list_transactions, summarize_transactions
+
+HEAVY_CUSTOMER = "heavy@example.com"
+CATEGORIES = ["shopping_net", "grocery_pos", "gas_transport", "travel", "entertainment", "misc_pos"]
+INSERT_BATCH = 50_000
+START = datetime(2019, 1, 1)
+SPAN_SECONDS = 5 * 365 * 24 * 3600
+
+
+def _customer(i: int) -> str:
+    return f"customer{i}@example.com"
+
+
+def generate(path: str, rows: int, customers: int, heavy_rows: int, seed: int = 0):
+    """
+    Load the transactions table with sqlite3 (SQLAlchemy's DateTime format), then
+    build the indexes, as a bulk load would.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as db:
+        db.execute(CreateTable(Transaction.__table__))  # indexes come after the load
+    engine.dispose()
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    insert = (
+        "INSERT INTO transactions (id, date, merchant_name, merchant_category, transaction_amount, currency,"
+        " transaction_type, fraud_detected, explanation, probability, model_version, occurred_at,"
+        " statement_id, customer_key, created_at) VALUES (?, ?, ?, ?, ?, 'USD', 'Purchase', ?, NULL, ?, 'v1', ?, ?, ?, ?)"
+    )
+    start = time.perf_counter()
+    for offset in range(0, rows, INSERT_BATCH):
+        batch = []
+        for tx_id in range(offset + 1, min(rows, offset + INSERT_BATCH) + 1):
+            customer = HEAVY_CUSTOMER if tx_id <= heavy_rows else _customer(rng.randrange(customers))
+            occurred_at = START + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+            stamp = occurred_at.strftime("%Y-%m-%d %H:%M:%S.%f")
+            flagged = rng.random() < 0.01
+            batch.append((
+                tx_id, stamp[:19], f"Merchant {rng.randrange(5000)}", rng.choice(CATEGORIES),
+                round(rng.uniform(1, 1500), 2), int(flagged), rng.uniform(0.5, 1.0) if flagged else rng.uniform(0, 0.5),
+                stamp, f"stmt{tx_id // 40}", customer, stamp,
+            ))
+        conn.executemany(insert, batch)
+        conn.commit()
+    load_seconds = time.perf_counter() - start
+    conn.close()
+
+    start = time.perf_counter()
+    engine = create_engine(f"sqlite:///{path}")
+    for index in Transaction.__table__.indexes:
+        index.create(bind=engine)
+    with engine.begin() as db:
+        db.execute(text("ANALYZE"))
+    engine.dispose()
+    return {"load_seconds": round(load_seconds, 1), "index_seconds": round(time.perf_counter() - start, 1)}
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def offset_page(db: Session, customer: str, offset: int, limit: int) -> list:
+    return db.execute(
+        select(Transaction)
+        .where(Transaction.customer_key == customer, Transaction.occurred_at.is_not(None))
+        .order_by(Transaction.occurred_at.desc(), Transaction.id.desc())
+        .offset(offset)
+        .limit(limit)
+    ).scalars().all()
+
+
+def query_plan(db: Session, sql: str, params: dict) -> list:
+    return [row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--heavy-rows", type=int, default=200_000, help="rows of the heavy customer")
+    parser.add_argument("--deep-rows", type=int, default=100_000, help="depth of the deep page")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db", help="SQLite file to create (or reuse if it exists)")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    path = args.db
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "transactions.sqlite")
+    setup = {"reused": True}
+    if not os.path.exists(path):
+        setup = generate(path, args.rows, args.customers, min(args.heavy_rows, args.rows))
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    db = Session(engine)
+    table_rows = db.execute(text("SELECT max(id) FROM transactions")).scalar()
+    heavy_total = db.execute(
+        text("SELECT count(*) FROM transactions WHERE customer_key = :c"), {"c": HEAVY_CUSTOMER},
+    ).scalar()
+    customer = _customer(1)
+    limit = args.limit
+    deep = min(args.deep_rows, max(0, heavy_total - limit))
+
+    # Cursor of the row just above the deep page
+    above = offset_page(db, HEAVY_CUSTOMER, deep - 1, 1)[0] if deep else None
+    deep_cursor = encode_cursor(above.occurred_at, above.id) if above is not None else None
+    keyset_rows = [tx["id"] for tx in list_transactions(db, HEAVY_CUSTOMER, limit, deep_cursor)["items"]]
+    offset_rows = [tx.id for tx in offset_page(db, HEAVY_CUSTOMER, deep, limit)]
+    assert keyset_rows == offset_rows, "keyset and offset pages differ"
+
+    full_scan_sql = (
+        "SELECT id FROM transactions NOT INDEXED WHERE customer_key = :c AND occurred_at IS NOT NULL"
+        " ORDER BY occurred_at DESC, id DESC LIMIT :n"
+    )
+    latency_ms = {
+        "first_page": median_ms(lambda: list_transactions(db, customer, limit), args.repeat),
+        "first_page_heavy": median_ms(lambda: list_transactions(db, HEAVY_CUSTOMER, limit), args.repeat),
+        "deep_page_keyset": median_ms(lambda: list_transactions(db, HEAVY_CUSTOMER, limit, deep_cursor), args.repeat),
+        "deep_page_offset": median_ms(lambda: offset_page(db, HEAVY_CUSTOMER, deep, limit), max(3, args.repeat // 4)),
+        "flagged_page_heavy": median_ms(
+            lambda: list_transactions(db, HEAVY_CUSTOMER, limit, flagged_only=True), args.repeat,
+        ),
+        "monthly_summary": median_ms(lambda: summarize_transactions(db, customer), args.repeat),
+        "monthly_summary_heavy": median_ms(lambda: summarize_transactions(db, HEAVY_CUSTOMER), max(3, args.repeat // 4)),
+        "full_scan_page": median_ms(
+            lambda: db.execute(text(full_scan_sql), {"c": customer, "n": limit}).all(), min(3, args.repeat),
+        ),
+    }
+
+    plans = {
+        "deep_page_keyset": query_plan(
+            db,
+            "SELECT id FROM transactions WHERE customer_key = :c AND occurred_at IS NOT NULL"
+            " AND (occurred_at, id) < (:t, :i) ORDER BY occurred_at DESC, id DESC LIMIT :n",
+            {"c": HEAVY_CUSTOMER, "t": str(above.occurred_at) if above else "", "i": above.id if above else 0, "n": limit},
+        ),
+        "flagged_page": query_plan(
+            db,
+            "SELECT id FROM transactions WHERE customer_key = :c AND occurred_at IS NOT NULL"
+            " AND fraud_detected = 1 ORDER BY occurred_at DESC, id DESC LIMIT :n",
+            {"c": HEAVY_CUSTOMER, "n": limit},
+        ),
+    }
+    db.close()
+    engine.dispose()
+
+    print(json.dumps({
+        "status": "ok",
+        "database": "sqlite",
+        "table_rows": table_rows,
+        "heavy_customer_rows": heavy_total,
+        "deep_page_depth": deep,
+        "limit": limit,
+        "setup": setup,
+        "latency_ms": latency_ms,
+        "plans": plans,
+    }, indent=2))
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# backend/tests/conftest.py
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Make the `app` and `benchmarks` packages importable when run from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import Base  # noqa: E402
+from app.partitions import create_transactions_table  # noqa: E402
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    """
+    Session factory of a fresh file-backed SQLite database with every table.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    create_transactions_table(engine)
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
@@ -0,0 +1,181 @@
+# backend/tests/test_dedup.py
+"""
+Duplicate transactions (app/dedup.py) through the write path (app/pipeline.py),
+on SQLite: repeated and overlapping uploads, a concurrent upload that loses the
+fingerprint claim, re-uploads answered from the result cache, and DEDUP=0.
+"""
+import uuid
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+
+from app import pipeline
+from app.cache import ResultCache
+from app.dedup import FingerprintIndex, StatementDeduplicator
+from app.models import AlertOutbox, Transaction, TransactionFingerprint
+from app.pipeline import build_result_rows, cached_statement, store_and_notify
+from app.scoring import format_explanations
+from benchmarks.common import synthetic_statement
+
+EMAIL = "Jane@Example.com"
+CUSTOMER = "jane@example.com"
+FLAGGED_AMOUNT = 300.0
+
+
+def scores_for(df: pd.DataFrame) -> dict:
+    """
+    Scores as score_transactions returns them: rows above FLAGGED_AMOUNT are fraud.
+    """
+    amounts = df["amt"].to_numpy(dtype=float)
+    probabilities = np.where(amounts > FLAGGED_AMOUNT, 0.9, 0.1)
+    is_fraud = probabilities >= 0.5
+    return {
+        "probabilities": probabilities,
+        "is_fraud": is_fraud,
+        "explanations": format_explanations(probabilities, is_fraud, 0.5),
+        "threshold": 0.5,
+        "amounts": amounts,
+        "model_version": "test",
+    }
+
+
+def split(sessions, df, customer=CUSTOMER, enabled=True):
+    """
+    The worker side of an upload: (new rows, their fingerprints, duplicates),
+    looked up in the database (no cache shared with other uploads).
+    """
+    return StatementDeduplicator(customer, FingerprintIndex(0, sessions), enabled=enabled).split(df)
+
+
+def store(sessions, new_rows, fingerprints, customer=CUSTOMER, email=EMAIL):
+    """
+    The API side: build the rows and write them with their fingerprints and alert.
+    Returns the output rows.
+    """
+    output_rows, db_rows, fraud_details = build_result_rows(
+        new_rows, scores_for(new_rows), uuid.uuid4().hex, customer,
+    )
+    db = sessions()
+    try:
+        store_and_notify(db, output_rows, db_rows, fraud_details, email, None, "statement.pdf", fingerprints)
+    finally:
+        db.close()
+    return output_rows
+
+
+def upload(sessions, df, customer=CUSTOMER, email=EMAIL):
+    new_rows, fingerprints, duplicates = split(sessions, df, customer)
+    return store(sessions, new_rows, fingerprints, customer, email), duplicates
+
+
+def count(sessions, model) -> int:
+    with sessions() as db:
+        return db.scalar(select(func.count()).select_from(model))
+
+
+def alert_lines(sessions) -> list:
+    with sessions() as db:
+        return [len(details.splitlines()) for details in db.scalars(select(AlertOutbox.details).order_by(AlertOutbox.id))]
+
+
+def test_same_rows_uploaded_twice_are_reported_as_duplicates(sessions):
+    df = synthetic_statement(30, seed=1)
+    first, duplicates = upload(sessions, df)
+    assert len(first) == 30 and duplicates == []
+
+    again, duplicates = upload(sessions, df)
+    assert again == []
+    assert [d["duplicate_of"] for d in duplicates] == [row["id"] for row in first]
+    assert count(sessions, Transaction) == 30
+    assert count(sessions, TransactionFingerprint) == 30
+
+
+def test_overlapping_statement_only_stores_new_rows(sessions):
+    df = synthetic_statement(30, seed=1)
+    first, _ = upload(sessions, df)
+    overlap = pd.concat([df.iloc[15:], synthetic_statement(10, seed=2)], ignore_index=True)
+
+    stored, duplicates = upload(sessions, overlap)
+    assert len(stored) == 10
+    assert {d["duplicate_of"] for d in duplicates} == {row["id"] for row in first[15:]}
+    assert count(sessions, Transaction) == 40
+
+
+def test_other_customer_is_not_a_duplicate(sessions):
+    df = synthetic_statement(20, seed=1)
+    upload(sessions, df)
+    stored, duplicates = upload(sessions, df, customer="bob@example.com", email="bob@example.com")
+    assert len(stored) == 20 and duplicates == []
+
+
+def test_concurrent_upload_loses_the_claim(sessions):
+    df = synthetic_statement(30, seed=1)
+    fresh = synthetic_statement(10, seed=2)
+    fresh.loc[0, "amt"] = FLAGGED_AMOUNT * 3
+    overlap = pd.concat([df.iloc[:20], fresh], ignore_index=True)
+    # Both uploads are split before either is stored, so neither sees the other's rows
+    first_split = split(sessions, df)
+    second_split = split(sessions, overlap)
+    assert len(first_split[0]) == 30 and len(second_split[0]) == 30
+
+    first = store(sessions, first_split[0], first_split[1])
+    second = store(sessions, second_split[0], second_split[1])
+
+    lost = [row for row in second if "duplicate_of" in row]
+    assert len(lost) == 20
+    assert all(row["id"] is None for row in lost)
+    assert [row["duplicate_of"] for row in lost] == [row["id"] for row in first[:20]]
+    assert count(sessions, Transaction) == 40
+    assert count(sessions, TransactionFingerprint) == 40
+
+    # The second alert only lists the flagged rows it stored
+    flagged_first = int((first_split[0]["amt"] > FLAGGED_AMOUNT).sum())
+    flagged_fresh = int((fresh["amt"] > FLAGGED_AMOUNT).sum())
+    assert alert_lines(sessions) == [flagged_first, flagged_fresh]
+
+
+def test_cached_reupload_reports_every_row_as_duplicate(sessions):
+    df = synthetic_statement(30, seed=1)
+    upload(sessions, df.iloc[:10])
+    # What the API caches for the statement: its stored rows + the rows reported as duplicates
+    output_rows, duplicates = upload(sessions, df)
+    cache = ResultCache(use_db=False)
+    cache.put("statement", None, None, output_rows + duplicates)
+
+    rows, cached_duplicates = cached_statement(cache.get("statement")["rows"], CUSTOMER)
+    assert rows == []
+    assert len(cached_duplicates) == 30
+    with sessions() as db:
+        stored_ids = set(db.scalars(select(Transaction.id)))
+    assert {d["duplicate_of"] for d in cached_duplicates} == stored_ids
+    assert set(cached_duplicates[0]) == {"date", "merchant", "amount", "duplicate_of"}
+
+
+def test_cached_reupload_after_lost_claim_points_at_the_stored_rows(sessions):
+    df = synthetic_statement(20, seed=1)
+    first_split = split(sessions, df)
+    second_split = split(sessions, df)
+    first = store(sessions, first_split[0], first_split[1])
+    second = store(sessions, second_split[0], second_split[1])
+
+    _, cached_duplicates = cached_statement(second, CUSTOMER)
+    assert [d["duplicate_of"] for d in cached_duplicates] == [row["id"] for row in first]
+
+
+def test_cached_upload_without_customer_returns_the_rows(sessions):
+    output_rows, _ = upload(sessions, synthetic_statement(10, seed=1), customer=None, email=None)
+    assert cached_statement(output_rows, None) == (output_rows, [])
+
+
+def test_dedup_disabled(sessions, monkeypatch):
+    df = synthetic_statement(20, seed=1)
+    for _ in range(2):
+        new_rows, fingerprints, duplicates = split(sessions, df, enabled=False)
+        assert new_rows is df and fingerprints is None and duplicates == []
+        output_rows = store(sessions, new_rows, fingerprints)
+    assert count(sessions, Transaction) == 40
+    assert count(sessions, TransactionFingerprint) == 0
+
+    monkeypatch.setattr(pipeline, "DEDUP", False)
+    assert cached_statement(output_rows, CUSTOMER) == (output_rows, [])